@@ -33,7 +33,7 @@ class UsuarioAdmin(UserAdmin):
 
 @admin.register(Reporte)
 class ReporteAdmin(admin.ModelAdmin):
-    search_fields = ['titulo', 'descripcion', 'ubicacion', 'categoria', 'prioridad']
+    search_fields = ['titulo', 'descripcion', 'sala__nombre', 'categoria', 'prioridad']
     list_display = ['titulo', 'estado', 'asignado_a', 'created']
 
 @admin.register(HistorialAsignacion)
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+
+
+# ===========================================
+# Almacenamiento por contenido (SHA-256) para las imágenes de reportes
+# ===========================================
+# Reporte.imagen se guarda como <upload_to>/<ab>/<cd>/<sha256>.<ext>: la misma foto
+# subida por varios estudiantes es un solo archivo. El digest se calcula recorriendo
+# el contenido en chunks ANTES de escribir: si el archivo ya existe no se vuelve a escribir.
+# ArchivoImagen cuenta cuántos reportes apuntan a cada nombre (ver Reporte.save) y
+# `manage.py gc_imagenes` borra los que quedan sin referencias.
+
+EXTENSIONES = {".jpeg": ".jpg", ".jpe": ".jpg"}
+
+
+def digest_de(content):
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def es_nombre_por_contenido(nombre):
+    """True si `nombre` tiene la forma <carpeta>/<ab>/<cd>/<sha256>.<ext>."""
+    partes = nombre.split("/")
+    if len(partes) < 3:
+        return False
+    digest = posixpath.splitext(partes[-1])[0]
+    return (
+        len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+        and partes[-3] == digest[:2] and partes[-2] == digest[2:4]
+    )
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide _save a partir del contenido
+        return name
+
+    def _save(self, name, content):
+        digest = digest_de(content)
+        carpeta = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        extension = EXTENSIONES.get(extension, extension)
+        nombre = posixpath.join(carpeta, digest[:2], digest[2:4], f"{digest}{extension}")
+
+        ruta = self.path(nombre)
+        if os.path.exists(ruta):
+            # Ya está: no se escribe el contenido. Solo se renueva la fecha para que
+            # gc_imagenes no lo borre mientras esta subida aún no se guarda en la BD
+            os.utime(ruta)
+            return nombre
+
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(os.path.dirname(ruta), self.directory_permissions_mode)
+        # Temporal en la misma carpeta + os.replace: dos subidas simultáneas de la
+        # misma foto terminan en el mismo archivo completo, nunca en uno a medias
+        fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix=".subida-")
+        try:
+            with os.fdopen(fd, "wb") as destino:
+                for chunk in content.chunks():
+                    destino.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporal, self.file_permissions_mode)
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        return nombre
+
+
+def storage_imagenes():
+    """Storage de Reporte.imagen (alias "imagenes" de STORAGES)."""
+    return storages["imagenes"]
@@ -0,0 +1,204 @@
+import math
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, Subquery, When
+from django.utils import timezone
+
+from app.models import HistorialAsignacion, HistorialEstado, MarcaResumen, Reporte, ResumenDiario
+
+
+# ===========================================
+# Resúmenes diarios (ResumenDiario)
+# ===========================================
+# Por cada día y combinación edificio × categoría × prioridad × mantenedor:
+#   creados      reportes creados ese día (mantenedor: el que tenía al crearse)
+#   completados  pasos a 'completado' del historial de estados ese día, con
+#                p50/p90 e histograma de minutos desde la creación
+#   backlog      reportes abiertos al cierre del día (mantenedor: el de ese momento,
+#                según HistorialAsignacion)
+#
+# El historial solo se escribe con la hora actual, así que un día cerrado ya no
+# cambia: MarcaResumen guarda el primer día pendiente y cada corrida procesa desde
+# ahí hasta hoy (hoy queda pendiente, porque sigue abierto). Cada día se reescribe
+# completo en una transacción, así que repetir una corrida da el mismo resultado.
+#
+# Edificio, categoría y prioridad son los que el reporte tiene al momento de
+# resumir: recategorizar un reporte no reescribe los días ya cerrados.
+
+MARCA = "resumen_diario"
+
+# Límite superior (minutos) de cada tramo del histograma; el último tramo es "más de 30 días"
+TRAMOS_MINUTOS = [15, 30, 60, 120, 240, 480, 1440, 2880, 4320, 10080, 20160, 43200]
+
+
+def _limites(dia):
+    tz = timezone.get_current_timezone()
+    inicio = datetime.combine(dia, time.min, tzinfo=tz)
+    return inicio, datetime.combine(dia + timedelta(days=1), time.min, tzinfo=tz)
+
+
+def _asignaciones():
+    return HistorialAsignacion.objects.filter(reporte=OuterRef('pk'))
+
+
+def _mantenedor_inicial():
+    """Quién tenía el reporte al crearse: el 'desde' de la primera reasignación, o el actual."""
+    primera = _asignaciones().order_by('creado_en', 'id')
+    return Case(
+        When(Exists(primera), then=Subquery(primera.values('asignado_de')[:1])),
+        default=F('asignado_a'),
+        output_field=IntegerField(),
+    )
+
+
+def _mantenedor_al(momento):
+    """Quién tenía el reporte en `momento`, reconstruido desde HistorialAsignacion."""
+    antes = _asignaciones().filter(creado_en__lt=momento).order_by('-creado_en', '-id')
+    despues = _asignaciones().filter(creado_en__gte=momento).order_by('creado_en', 'id')
+    return Case(
+        When(Exists(antes), then=Subquery(antes.values('asignado_a')[:1])),
+        When(Exists(despues), then=Subquery(despues.values('asignado_de')[:1])),
+        default=F('asignado_a'),
+        output_field=IntegerField(),
+    )
+
+
+def _percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ordenada."""
+    return ordenados[max(math.ceil(p * len(ordenados)) - 1, 0)]
+
+
+def histograma(minutos):
+    hist = [0] * (len(TRAMOS_MINUTOS) + 1)
+    for m in minutos:
+        hist[bisect_left(TRAMOS_MINUTOS, m)] += 1
+    return hist
+
+
+def sumar_histogramas(histogramas):
+    total = [0] * (len(TRAMOS_MINUTOS) + 1)
+    for hist in histogramas:
+        for i, n in enumerate(hist):
+            total[i] += n
+    return total
+
+
+def percentil_histograma(hist, p):
+    """Cota superior (minutos) del tramo donde cae el percentil p; inf si es el último, None sin datos."""
+    total = sum(hist)
+    if not total:
+        return None
+    objetivo = max(math.ceil(p * total), 1)
+    acumulado = 0
+    for i, n in enumerate(hist):
+        acumulado += n
+        if acumulado >= objetivo:
+            return TRAMOS_MINUTOS[i] if i < len(TRAMOS_MINUTOS) else math.inf
+    return math.inf
+
+
+def formatear_minutos(minutos):
+    """Cota de un tramo para mostrar: '≤ 30 min', '≤ 4 h', '≤ 2 d', '> 30 d'."""
+    if minutos is None:
+        return "—"
+    if minutos == math.inf:
+        return f"> {TRAMOS_MINUTOS[-1] // 1440} d"
+    if minutos < 60:
+        return f"≤ {minutos:g} min"
+    if minutos < 1440:
+        return f"≤ {minutos / 60:g} h"
+    return f"≤ {minutos / 1440:g} d"
+
+
+def resumir_dia(dia):
+    """Filas de ResumenDiario (sin guardar) para `dia`."""
+    inicio, fin = _limites(dia)
+    filas = {}
+
+    def fila(edificio, categoria, prioridad, mantenedor):
+        clave = (edificio, categoria, prioridad, mantenedor)
+        if clave not in filas:
+            filas[clave] = {"creados": 0, "completados": 0, "backlog": 0, "minutos": []}
+        return filas[clave]
+
+    creados = (
+        Reporte.objects.filter(created__gte=inicio, created__lt=fin)
+        .annotate(mant=_mantenedor_inicial())
+        .values_list('sala__edificio', 'categoria', 'prioridad', 'mant')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for *clave, n in creados:
+        fila(*clave)["creados"] += n
+
+    # Un completado no se reasigna: su mantenedor actual es el que lo completó
+    completados = HistorialEstado.objects.filter(
+        estado_nuevo='completado', fecha_cambio__gte=inicio, fecha_cambio__lt=fin,
+    ).values_list(
+        'reporte__sala__edificio', 'reporte__categoria', 'reporte__prioridad', 'reporte__asignado_a',
+        'fecha_cambio', 'reporte__created',
+    )
+    for edificio, categoria, prioridad, mant, fecha, creado in completados:
+        datos = fila(edificio, categoria, prioridad, mant)
+        datos["completados"] += 1
+        datos["minutos"].append(max((fecha - creado).total_seconds() / 60, 0))
+
+    # Abiertos al cierre: los que hoy siguen abiertos más los completados después de `fin`
+    completados_despues = HistorialEstado.objects.filter(
+        estado_nuevo='completado', fecha_cambio__gte=fin,
+    ).values('reporte')
+    backlog = (
+        Reporte.objects.filter(created__lt=fin)
+        .filter(~Q(estado='completado') | Q(pk__in=completados_despues))
+        .annotate(mant=_mantenedor_al(fin))
+        .values_list('sala__edificio', 'categoria', 'prioridad', 'mant')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for *clave, n in backlog:
+        fila(*clave)["backlog"] += n
+
+    resultado = []
+    for (edificio, categoria, prioridad, mant), datos in filas.items():
+        minutos = sorted(datos["minutos"])
+        resultado.append(ResumenDiario(
+            dia=dia, edificio_id=edificio, categoria=categoria, prioridad=prioridad, mantenedor_id=mant,
+            creados=datos["creados"], completados=datos["completados"], backlog=datos["backlog"],
+            resolucion_p50=_percentil(minutos, 0.5) if minutos else None,
+            resolucion_p90=_percentil(minutos, 0.9) if minutos else None,
+            resolucion_hist=histograma(minutos),
+        ))
+    return resultado
+
+
+def actualizar(desde=None, hoy=None):
+    """
+    Resume los días desde la marca (o `desde`) hasta hoy inclusive y deja la marca en
+    hoy. Devuelve (días procesados, filas escritas).
+    """
+    hoy = hoy or timezone.localdate()
+    marca = MarcaResumen.objects.filter(nombre=MARCA).first()
+    if desde is None:
+        if marca is not None:
+            desde = marca.dia_pendiente
+        else:
+            primero = Reporte.objects.order_by('created').values_list('created', flat=True).first()
+            if primero is None:
+                return 0, 0
+            desde = timezone.localdate(primero)
+
+    dias = filas = 0
+    dia = desde
+    while dia <= hoy:
+        with transaction.atomic():
+            nuevas = resumir_dia(dia)
+            ResumenDiario.objects.filter(dia=dia).delete()
+            ResumenDiario.objects.bulk_create(nuevas)
+            # Avanza junto con cada día: si se corta a mitad, sigue desde ahí
+            MarcaResumen.objects.update_or_create(nombre=MARCA, defaults={"dia_pendiente": min(dia + timedelta(days=1), hoy)})
+        dias += 1
+        filas += len(nuevas)
+        dia += timedelta(days=1)
+    return dias, filas
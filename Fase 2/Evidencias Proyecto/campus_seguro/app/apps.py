@@ -5,5 +5,10 @@ class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
 
+    def ready(self):
+        from app import signals  # noqa: F401
+        # PRAGMA de SQLite (connection_created) desde la primera conexión
+        from app import bd  # noqa: F401
+
 
 
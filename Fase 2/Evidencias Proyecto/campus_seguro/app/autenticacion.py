@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+# ===========================================
+# Login por correo
+# ===========================================
+# Una sola consulta: WHERE LOWER(email) = ..., que usa el índice único funcional
+# usuario_email_lower_uniq (ver Usuario.Meta.constraints).
+# El hasher corre exactamente una vez por intento: con la contraseña guardada si el
+# correo existe, o con una contraseña descartable si no. Así el tiempo de respuesta no
+# delata qué correos están registrados.
+
+
+class EmailBackend(ModelBackend):
+    """
+    authenticate(request, email=..., password=...). Sin `email` no hace nada y deja
+    pasar a ModelBackend (login del admin de Django, por username).
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+
+        UserModel = get_user_model()
+        user = UserModel.objects.por_email(email).first()
+        if user is None:
+            # Mismo costo que una contraseña real (ver ModelBackend.authenticate)
+            UserModel().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+
+
+# ===========================================
+# Ajustes de las conexiones SQLite
+# ===========================================
+# Cada conexión SQLite nueva recibe los PRAGMA de settings.SQLITE_PRAGMAS
+# (connection_created). Los que importan con varios procesos escribiendo:
+#   - journal_mode=WAL: las lecturas no esperan a las escrituras ni al revés; solo
+#     un escritor a la vez. Queda guardado en el archivo de la base.
+#   - synchronous=NORMAL: con WAL no se pierde integridad, solo las últimas
+#     transacciones si se corta la luz; ahorra un fsync por commit.
+#   - busy_timeout: cuánto espera un escritor por el candado antes de "database is locked".
+#
+# Las vistas que escriben usan escritura() en vez de transaction.atomic: la
+# transacción empieza con BEGIN IMMEDIATE y toma el candado de escritura de entrada.
+# Con BEGIN (DEFERRED) la transacción lee primero y pide el candado al escribir; si
+# otro escritor hizo commit entremedio, SQLite falla en el acto, sin esperar
+# busy_timeout, porque la foto de la transacción ya no sirve. Por lo mismo, la lectura
+# que decide la escritura (cargar el reporte, validar su estado) va dentro de
+# escritura(), también en las vistas async (un solo sync_to_async para todo).
+#
+# bench_escrituras mide el efecto con varios procesos escribiendo a la vez.
+
+
+def aplicar_pragmas(connection):
+    if connection.vendor != "sqlite":
+        return
+    for nombre, valor in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+        # Directo a sqlite3: no pasa por los execute_wrappers ni por el log de consultas
+        connection.connection.execute(f"PRAGMA {nombre} = {valor}")
+
+
+def _al_conectar(sender, connection, **kwargs):
+    aplicar_pragmas(connection)
+
+
+connection_created.connect(_al_conectar, dispatch_uid="app.bd")
+
+
+@contextmanager
+def escritura(using=None):
+    """
+    transaction.atomic que en SQLite empieza con BEGIN IMMEDIATE (si
+    SQLITE_ESCRITURA_INMEDIATA). Dentro de otra transacción es un atomic común
+    (savepoint): el candado ya lo tomó la de afuera o la toma al escribir.
+    Sirve como decorador: @escritura().
+    """
+    conexion = transaction.get_connection(using)
+    if (
+        conexion.vendor != "sqlite"
+        or conexion.in_atomic_block
+        or not getattr(settings, "SQLITE_ESCRITURA_INMEDIATA", True)
+    ):
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # Al conectar, Django vuelve a leer transaction_mode de OPTIONS: primero la conexión.
+    # El modo solo se usa al abrir la transacción (BEGIN IMMEDIATE): se restaura enseguida
+    conexion.ensure_connection()
+    anterior = conexion.transaction_mode
+    conexion.transaction_mode = "IMMEDIATE"
+    try:
+        with transaction.atomic(using=using):
+            conexion.transaction_mode = anterior
+            yield
+    finally:
+        conexion.transaction_mode = anterior
@@ -0,0 +1,154 @@
+import re
+
+from django.db import connection
+from django.db.models import F, Q
+
+from app.models import Edificio, Reporte, ReporteBusqueda, Sala
+
+
+# ===========================================
+# Búsqueda de reportes con FTS5
+# ===========================================
+# app_reporte_fts guarda una copia del texto buscable de cada reporte:
+# titulo, descripcion, categoria y "ubicacion" (sala + edificio).
+# En PostgreSQL se usan índices GIN de trigramas (pg_trgm, migraciones 0014 a 0016)
+# sobre UPPER(titulo), UPPER(descripcion) y UPPER(categoria): no hay copia que mantener. En otros
+# motores, el camino LIKE.
+
+TABLA_FTS = ReporteBusqueda._meta.db_table
+
+_SELECT_FILAS = f"""
+    SELECT r.id, r.titulo, r.descripcion, r.categoria,
+           TRIM(COALESCE(s.codigo, '') || ' ' || COALESCE(s.nombre, '') || ' ' ||
+                COALESCE(e.nombre, '') || ' ' || COALESCE(e.codigo, ''))
+    FROM {Reporte._meta.db_table} r
+    LEFT JOIN {Sala._meta.db_table} s ON s.id = r.sala_id
+    LEFT JOIN {Edificio._meta.db_table} e ON e.id = s.edificio_id
+"""
+
+
+def disponible():
+    return connection.vendor == "sqlite"
+
+
+def _reindexar(condicion, params):
+    """Reescribe las filas del índice de los reportes que cumplen `condicion` (sobre r.*)."""
+    if not disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABLA_FTS} WHERE rowid IN "
+            f"(SELECT r.id FROM {Reporte._meta.db_table} r WHERE {condicion})",
+            params,
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS} (rowid, titulo, descripcion, categoria, ubicacion) "
+            f"{_SELECT_FILAS} WHERE {condicion}",
+            params,
+        )
+
+
+def indexar_reporte(reporte_id):
+    _reindexar("r.id = %s", [reporte_id])
+
+
+def indexar_sala(sala_id):
+    _reindexar("r.sala_id = %s", [sala_id])
+
+
+def indexar_salas(sala_ids, lote=500):
+    """indexar_sala para muchas salas a la vez (importación masiva)."""
+    sala_ids = list(sala_ids)
+    for i in range(0, len(sala_ids), lote):
+        parte = sala_ids[i:i + lote]
+        _reindexar(f"r.sala_id IN ({', '.join(['%s'] * len(parte))})", parte)
+
+
+def indexar_edificio(edificio_id):
+    _reindexar(f"r.sala_id IN (SELECT id FROM {Sala._meta.db_table} WHERE edificio_id = %s)", [edificio_id])
+
+
+def desindexar_reporte(reporte_id):
+    if not disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [reporte_id])
+
+
+def reconstruir_indice():
+    """Vacía y repuebla el índice completo. Devuelve la cantidad de reportes indexados."""
+    if not disponible():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS}")
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS} (rowid, titulo, descripcion, categoria, ubicacion) {_SELECT_FILAS}"
+        )
+        cursor.execute(f"INSERT INTO {TABLA_FTS} ({TABLA_FTS}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLA_FTS}")
+        return cursor.fetchone()[0]
+
+
+def consulta_fts(texto):
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura:
+    cada palabra como prefijo entre comillas ("fuga"* "agua"*), todas obligatorias.
+    """
+    palabras = re.findall(r"\w+", texto)
+    return " ".join(f'"{p}"*' for p in palabras)
+
+
+def buscar(reportes, texto):
+    """
+    Filtra `reportes` por `texto`. Devuelve (queryset, orden) donde `orden` es la
+    clave que debe usar KeysetPaginator: 'rank' (mejor coincidencia primero) con FTS5
+    o trigramas, '-created' con el camino LIKE.
+    """
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return reportes, "-created"
+
+    if connection.vendor == "postgresql":
+        return buscar_trigramas(reportes, texto), "rank"
+    if not disponible():
+        return buscar_like(reportes, texto), "-created"
+
+    reportes = reportes.filter(busqueda__indice__match=consulta).annotate(rank=F("busqueda__rank"))
+    return reportes, "rank"
+
+
+def buscar_trigramas(reportes, texto):
+    """
+    PostgreSQL: cada palabra tiene que aparecer en el título, la descripción, la categoría
+    o la ubicación. icontains se compila como UPPER(col::text) LIKE UPPER('%palabra%'), la
+    misma expresión de los índices GIN de trigramas (0015 y 0016); la ubicación se resuelve
+    antes a una lista de salas (tabla chica), así el OR sigue siendo un BitmapOr de
+    índices y no un recorrido de app_reporte.
+    El rank es la similitud de palabras con el título, negada: el mejor primero.
+    """
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    for palabra in re.findall(r"\w+", texto):
+        salas = list(
+            Sala.objects.filter(
+                Q(codigo__icontains=palabra) | Q(nombre__icontains=palabra) |
+                Q(edificio__nombre__icontains=palabra) | Q(edificio__codigo__icontains=palabra)
+            ).values_list("id", flat=True)
+        )
+        reportes = reportes.filter(
+            Q(titulo__icontains=palabra) | Q(descripcion__icontains=palabra) |
+            Q(categoria__icontains=palabra) | Q(sala_id__in=salas)
+        )
+    return reportes.annotate(rank=-TrigramWordSimilarity(texto, "titulo"))
+
+
+def buscar_like(reportes, texto):
+    """Camino anterior: LIKE '%texto%' sobre cada columna (recorre toda la tabla)."""
+    return reportes.filter(
+        Q(titulo__icontains=texto) |
+        Q(descripcion__icontains=texto) |
+        Q(categoria__icontains=texto) |
+        Q(sala__codigo__icontains=texto) |
+        Q(sala__nombre__icontains=texto) |
+        Q(sala__edificio__nombre__icontains=texto)
+    )
@@ -0,0 +1,74 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+# ===========================================
+# GET condicional (ETag / Last-Modified) para páginas HTML
+# ===========================================
+# Cada vista declara una "sonda": una consulta barata (un aggregate) que devuelve
+# (partes, ultima_modificacion). El ETag es un hash de esas partes más todo lo
+# demás que cambia el HTML sin tocar la BD:
+#   - el usuario (id, nombre, rol: salen en la barra superior),
+#   - el secreto CSRF (el HTML lleva el token; cambia al iniciar sesión),
+#   - la query string (filtros, búsqueda y cursor de paginación).
+# Si coincide con If-None-Match la respuesta es 304 sin renderizar ni correr las
+# consultas de la página. Con mensajes pendientes (messages) no hay ETag: la página
+# tiene que renderizarse para mostrarlos.
+#
+# Las sondas incluyen un COUNT junto al Max(updated): un reporte borrado o que sale
+# del filtro no mueve el máximo, pero sí el conteo. Last-Modified va de acompañante:
+# cuando llega If-None-Match, Django ignora If-Modified-Since y manda el ETag.
+
+def _calcular(request, sonda, args, kwargs):
+    if len(get_messages(request)):
+        return None, None
+    resultado = sonda(request, *args, **kwargs)
+    if resultado is None:
+        return None, None
+    partes, ultima_modificacion = resultado
+
+    # Asegura el secreto CSRF ya en la primera visita (si no, lo crea el render y el
+    # ETag de la segunda petición no coincidiría con el de la primera)
+    get_token(request)
+    user = request.user
+    huella = json.dumps(
+        [user.pk, user.get_full_name(), user.nombre_rol, request.META.get("CSRF_COOKIE"),
+         sorted(request.GET.lists()), partes],
+        default=str,
+    )
+    return hashlib.md5(huella.encode()).hexdigest(), ultima_modificacion
+
+
+def pagina_condicional(sonda):
+    """
+    Decorador para vistas GET que renderizan HTML. sonda(request, *args, **kwargs)
+    devuelve (partes serializables, datetime | None), o None para responder siempre
+    completo (p. ej. si el objeto no existe: la vista hará su 404).
+    Va debajo de login_required / rol_requerido: la sonda usa request.user.
+    """
+    def decorador(view_func):
+        def frescura(request, *args, **kwargs):
+            if not hasattr(request, "_frescura"):
+                request._frescura = _calcular(request, sonda, args, kwargs)
+            return request._frescura
+
+        condicional = condition(
+            etag_func=lambda request, *args, **kwargs: frescura(request, *args, **kwargs)[0],
+            last_modified_func=lambda request, *args, **kwargs: frescura(request, *args, **kwargs)[1],
+        )(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = condicional(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD") and getattr(request, "_frescura", (None,))[0]:
+                # Privada y siempre revalidada: el navegador pregunta con If-None-Match
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorador
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+from collections import deque
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# ===========================================
+# Eventos en vivo para los dashboards (SSE)
+# ===========================================
+# Reporte.save (vía signals) y las vistas de cambios en lote publican un evento por
+# reporte después del commit. /eventos/ (ASGI) los entrega a cada dashboard abierto,
+# filtrados por rol y mantenedor (visible_para).
+#
+# Evento: {"tipo": "creado" | "actualizado", "id": reporte_id,
+#          "estado": ..., "asignado_a": id | None,
+#          "antes": {"estado", "asignado_a"} | None, ...extras}
+#
+# El broker es intercambiable (EVENTOS_BROKER en settings). BrokerEnMemoria solo
+# reparte dentro del proceso: con varios workers hace falta uno compartido (Redis
+# pub/sub, LISTEN/NOTIFY…) con la misma interfaz que Broker.
+
+RECARGAR = {"tipo": "recargar"}
+
+
+class Broker:
+    """Interfaz: publicar() se llama desde código síncrono; escuchar() desde la vista async."""
+
+    def publicar(self, evento):
+        raise NotImplementedError
+
+    async def escuchar(self, ultimo_id=None, latido=15):
+        """
+        Itera (id, evento) desde ultimo_id (exclusivo) en adelante. Entrega None cada
+        `latido` segundos sin eventos y (id, RECARGAR) si no puede garantizar que no
+        se perdió nada: el cliente debe recargar la página.
+        """
+        raise NotImplementedError
+
+
+class BrokerEnMemoria(Broker):
+    """
+    Pub/sub dentro del proceso. Guarda los últimos HISTORIAL eventos para que una
+    reconexión con Last-Event-ID no pierda nada; una suscripción que se atrasa más de
+    COLA eventos recibe RECARGAR y se cierra.
+    """
+    HISTORIAL = 256
+    COLA = 512
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ultimo = 0
+        self._historial = deque(maxlen=self.HISTORIAL)
+        self._suscripciones = set()
+
+    def publicar(self, evento):
+        with self._lock:
+            self._ultimo += 1
+            item = (self._ultimo, evento)
+            self._historial.append(item)
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            loop, _ = suscripcion
+            try:
+                loop.call_soon_threadsafe(self._entregar, suscripcion, item)
+            except RuntimeError:
+                # El loop de esa conexión ya se cerró
+                with self._lock:
+                    self._suscripciones.discard(suscripcion)
+
+    @staticmethod
+    def _entregar(suscripcion, item):
+        cola = suscripcion[1]
+        try:
+            cola.put_nowait(item)
+        except asyncio.QueueFull:
+            cola.desbordada = True
+
+    def _pendientes(self, ultimo_id):
+        # Se llama con el lock tomado
+        if ultimo_id is None:
+            return []
+        primero = self._historial[0][0] if self._historial else self._ultimo + 1
+        if ultimo_id > self._ultimo or ultimo_id < primero - 1:
+            # Id de otro proceso (reinicio) o demasiado antiguo
+            return [(self._ultimo, RECARGAR)]
+        return [item for item in self._historial if item[0] > ultimo_id]
+
+    async def escuchar(self, ultimo_id=None, latido=15):
+        cola = asyncio.Queue(maxsize=self.COLA)
+        cola.desbordada = False
+        suscripcion = (asyncio.get_running_loop(), cola)
+        with self._lock:
+            # Bajo el mismo lock: lo que llegue a la cola es posterior a lo pendiente
+            self._suscripciones.add(suscripcion)
+            pendientes = self._pendientes(ultimo_id)
+        try:
+            for item in pendientes:
+                yield item
+                if item[1] is RECARGAR:
+                    return
+            while True:
+                try:
+                    item = await asyncio.wait_for(cola.get(), latido)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield item
+                if cola.desbordada:
+                    yield (item[0], RECARGAR)
+                    return
+        finally:
+            with self._lock:
+                self._suscripciones.discard(suscripcion)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, "EVENTOS_BROKER", "app.eventos.BrokerEnMemoria"))()
+        return _broker
+
+
+# ===========================================
+# Publicación
+# ===========================================
+def evento(tipo, reporte_id, antes, despues, **extras):
+    """antes/despues = (asignado_a_id, estado), como en ContadorEstado."""
+    return {
+        "tipo": tipo,
+        "id": reporte_id,
+        "asignado_a": despues[0],
+        "estado": despues[1],
+        "antes": {"asignado_a": antes[0], "estado": antes[1]} if antes else None,
+        **extras,
+    }
+
+
+def publicar(evento):
+    # Solo si la transacción se confirma; fuera de una transacción sale de inmediato
+    transaction.on_commit(partial(broker().publicar, evento))
+
+
+def visible_para(evento, user):
+    """Administración ve todo; un mantenedor, los reportes que tiene o que le quitaron."""
+    if evento is RECARGAR or user.nombre_rol == "administracion":
+        return True
+    if user.nombre_rol == "mantenimiento":
+        antes = evento.get("antes") or {}
+        return user.pk in (evento["asignado_a"], antes.get("asignado_a"))
+    return False
@@ -0,0 +1,198 @@
+import csv
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from app.models import Reporte
+
+
+# ===========================================
+# Exportación de reportes (CSV / XLSX) en streaming
+# ===========================================
+# Las filas salen de un solo values_list(...).iterator(chunk_size=LOTE): nunca hay
+# más de LOTE filas en memoria, ni instancias de modelos, ni el archivo completo.
+# Cada generador entrega bytes a medida que junta ~64 KB, así que la memoria es la
+# misma para 100 que para 1.000.000 de reportes.
+#
+# XLSX sin dependencias: el .xlsx es un zip; zipfile sabe escribir en un flujo sin
+# seek (con "data descriptors"), y la hoja usa cadenas inline en vez de la tabla de
+# cadenas compartidas, que obligaría a tener todos los textos en memoria.
+
+LOTE = 2000
+BLOQUE = 64 * 1024
+
+# (campo de values_list, encabezado)
+COLUMNAS = [
+    ("id", "ID"),
+    ("titulo", "Título"),
+    ("categoria", "Categoría"),
+    ("prioridad", "Prioridad"),
+    ("estado", "Estado"),
+    ("created", "Creado"),
+    ("updated", "Actualizado"),
+    ("usuario__username", "Reportado por"),
+    ("usuario__email", "Correo"),
+    ("sala__edificio__nombre", "Edificio"),
+    ("sala__codigo", "Sala"),
+    ("asignado_a__username", "Asignado a"),
+    ("fecha_asignacion", "Fecha asignación"),
+    ("descripcion", "Descripción"),
+]
+ENCABEZADOS = [titulo for _, titulo in COLUMNAS]
+ESTADOS = dict(Reporte.ESTADO_CHOICES)
+_I_ESTADO = [campo for campo, _ in COLUMNAS].index("estado")
+
+# Excel (y LibreOffice) toman como fórmula un texto que empieza así. Títulos y
+# descripciones los escribe cualquier alumno: se anteponen con ' (texto literal)
+_INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def filas(reportes):
+    """
+    Tuplas listas para escribir: estado legible, fechas en hora local sin tz y textos
+    que parecen fórmula escapados con '.
+    """
+    for fila in reportes.values_list(*(campo for campo, _ in COLUMNAS)).iterator(chunk_size=LOTE):
+        fila = list(fila)
+        fila[_I_ESTADO] = ESTADOS.get(fila[_I_ESTADO], fila[_I_ESTADO])
+        for i, valor in enumerate(fila):
+            if isinstance(valor, datetime):
+                fila[i] = timezone.localtime(valor).replace(tzinfo=None, microsecond=0)
+            elif isinstance(valor, str) and valor.startswith(_INICIO_FORMULA):
+                fila[i] = "'" + valor
+        yield fila
+
+
+class _Buffer:
+    """Destino de escritura que se vacía en cada yield (csv.writer y zipfile escriben aquí)."""
+
+    def __init__(self):
+        self.partes = []
+        self.tamano = 0
+
+    def write(self, datos):
+        if isinstance(datos, str):
+            datos = datos.encode()
+        self.partes.append(datos)
+        self.tamano += len(datos)
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b"".join(self.partes)
+        self.partes, self.tamano = [], 0
+        return datos
+
+
+# ===========================================
+# CSV
+# ===========================================
+def csv_stream(filas):
+    buffer = _Buffer()
+    # BOM: Excel abre el UTF-8 con tildes correctamente
+    buffer.write("﻿")
+    escritor = csv.writer(buffer)
+    escritor.writerow(ENCABEZADOS)
+    for fila in filas:
+        escritor.writerow(fila)
+        if buffer.tamano >= BLOQUE:
+            yield buffer.vaciar()
+    yield buffer.vaciar()
+
+
+# ===========================================
+# XLSX
+# ===========================================
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+PARTES_XLSX = {
+    "[Content_Types].xml": (
+        _XML + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        _XML + f'<Relationships xmlns="{_NS_PKG}">'
+        f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        _XML + f'<workbook {_NS} xmlns:r="{_NS_REL}">'
+        '<sheets><sheet name="Reportes" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        _XML + f'<Relationships xmlns="{_NS_PKG}">'
+        f'<Relationship Id="rId1" Type="{_NS_REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+        f'<Relationship Id="rId2" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Estilos: 0 = normal, 1 = fecha y hora (formato 22 integrado), 2 = negrita (encabezado)
+    "xl/styles.xml": (
+        _XML + f'<styleSheet {_NS}>'
+        '<fonts count="2"><font/><font><b/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="3"><xf/><xf numFmtId="22" applyNumberFormat="1"/><xf fontId="1" applyFont="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+# Caracteres de control que XML 1.0 no admite
+_INVALIDOS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+
+def _celda(valor, estilo=0):
+    if valor is None or valor == "":
+        return "<c/>"
+    if isinstance(valor, bool):
+        valor = str(valor)
+    if isinstance(valor, (int, float)):
+        return f"<c><v>{valor}</v></c>"
+    if isinstance(valor, datetime):
+        return f'<c s="1"><v>{(valor - _EPOCA_EXCEL).total_seconds() / 86400:.6f}</v></c>'
+    texto = escape(_INVALIDOS.sub("", str(valor)))
+    estilo = f' s="{estilo}"' if estilo else ""
+    return f'<c t="inlineStr"{estilo}><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila(valores, estilo=0):
+    return "<row>" + "".join(_celda(v, estilo) for v in valores) + "</row>"
+
+
+def xlsx_stream(filas):
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archivo:
+        for nombre, contenido in PARTES_XLSX.items():
+            archivo.writestr(nombre, contenido)
+        yield buffer.vaciar()
+
+        with archivo.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as hoja:
+            hoja.write((_XML + f"<worksheet {_NS}><sheetData>" + _fila(ENCABEZADOS, estilo=2)).encode())
+            pendiente = []
+            tamano = 0
+            for fila in filas:
+                xml = _fila(fila)
+                pendiente.append(xml)
+                tamano += len(xml)
+                if tamano >= BLOQUE:
+                    hoja.write("".join(pendiente).encode())
+                    pendiente, tamano = [], 0
+                    if buffer.tamano:
+                        yield buffer.vaciar()
+            hoja.write(("".join(pendiente) + "</sheetData></worksheet>").encode())
+    # Al cerrar, zipfile escribe el directorio central
+    yield buffer.vaciar()
@@ -2,6 +2,8 @@ from django import forms
 from app.models import Reporte, Categoria, Prioridad, Rol, Genero, Edificio, Piso, Sala
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
+from app import ubicaciones
+from app.subidas import procesar_imagen
 
 CATEGORIAS = [
     ("Infraestructura", "Infraestructura"),
@@ -15,6 +17,24 @@ PRIORIDADES = [
     ("Alta", "Alta"),
 ]
 
+class ImagenReporteField(forms.ImageField):
+    """ImageField que pasa la subida por app.subidas: valida, quita EXIF y reduce."""
+
+    def to_python(self, data):
+        if data in self.empty_values:
+            return None
+        if getattr(data, "error_subida", None):
+            raise forms.ValidationError(data.error_subida)
+        return super().to_python(procesar_imagen(data))
+
+VACIO = [("", "---------")]
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (ValueError, TypeError):
+        return None
+
 class ReporteForm(forms.ModelForm):
     categoria = forms.ChoiceField(
         choices=CATEGORIAS,
@@ -25,14 +45,15 @@ class ReporteForm(forms.ModelForm):
         widget=forms.Select(attrs={"class": "form__control"})
     )
 
-    edificio = forms.ModelChoiceField(
-        queryset=Edificio.objects.all(),
+    # Edificio y piso salen del árbol en caché (app.ubicaciones): sin consultas al renderizar
+    edificio = forms.TypedChoiceField(
+        coerce=int,
         required=True,
         label="Edificio",
         widget=forms.Select(attrs={"class": "form__control"})
     )
-    piso = forms.ModelChoiceField(
-        queryset=Piso.objects.none(),
+    piso = forms.TypedChoiceField(
+        coerce=int,
         required=True,
         label="Piso",
         widget=forms.Select(attrs={"class": "form__control"})
@@ -41,6 +62,7 @@ class ReporteForm(forms.ModelForm):
     class Meta:
         model = Reporte
         fields = ["titulo", "categoria", "prioridad", "descripcion", "imagen", "sala"]
+        field_classes = {"imagen": ImagenReporteField}
         labels = {
             "titulo": "Título",
             "categoria": "Categoría",
@@ -72,38 +94,29 @@ class ReporteForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.fields["piso"].queryset = Piso.objects.none()
-        self.fields["sala"].queryset = Sala.objects.none()
-
+        edificio_id = piso_id = None
         if "edificio" in self.data:
-            try:
-                edificio_id = int(self.data.get("edificio"))
-                self.fields["piso"].queryset = Piso.objects.filter(
-                    edificio_id=edificio_id
-                ).order_by("numero")
-            except (ValueError, TypeError):
-                pass
-
-        if "piso" in self.data:
-            try:
-                piso_id = int(self.data.get("piso"))
-                self.fields["sala"].queryset = Sala.objects.filter(
-                    piso_id=piso_id
-                ).order_by("codigo")
-            except (ValueError, TypeError):
-                pass
-
+            edificio_id = _entero(self.data.get("edificio"))
+            piso_id = _entero(self.data.get("piso"))
         elif self.instance.pk and self.instance.sala_id:
-            sala = self.instance.sala
             # Prellenar edificio y piso
-            self.fields["edificio"].initial = sala.edificio
-            self.fields["piso"].queryset = Piso.objects.filter(
-                edificio=sala.edificio
-            ).order_by("numero")
-            self.fields["piso"].initial = sala.piso
-            self.fields["sala"].queryset = Sala.objects.filter(
-                piso=sala.piso
-            ).order_by("codigo")
+            edificio_id, piso_id = ubicaciones.ubicar_sala(self.instance.sala_id)
+            self.fields["edificio"].initial = edificio_id
+            self.fields["piso"].initial = piso_id
+
+        self.fields["edificio"].choices = VACIO + ubicaciones.opciones_edificios()
+        self.fields["piso"].choices = VACIO + ubicaciones.opciones_pisos(edificio_id)
+        # El queryset solo se usa para obtener la sala elegida al validar;
+        # las opciones que se muestran vienen del árbol
+        self.fields["sala"].queryset = Sala.objects.all()
+        self.fields["sala"].choices = VACIO + ubicaciones.opciones_salas(piso_id)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        piso_id, sala = cleaned_data.get("piso"), cleaned_data.get("sala")
+        if piso_id and sala and sala.piso_id != piso_id:
+            self.add_error("sala", "La sala no pertenece al piso seleccionado.")
+        return cleaned_data
 
     def clean_titulo(self):
         titulo = self.cleaned_data["titulo"].strip()
@@ -111,16 +124,6 @@ class ReporteForm(forms.ModelForm):
             raise forms.ValidationError("El título debe tener al menos 4 caracteres.")
         return titulo
 
-    def clean_imagen(self):
-        img = self.cleaned_data.get("imagen")
-        if not img:
-            return img
-        if img.size > 5 * 1024 * 1024:
-            raise forms.ValidationError("La imagen no puede superar 5MB.")
-        if hasattr(img, "content_type") and not img.content_type.startswith("image/"):
-            raise forms.ValidationError("El archivo debe ser una imagen válida.")
-        return img
-
 User = get_user_model()
 
 class RegistroUsuarioForm(UserCreationForm):
@@ -186,7 +189,7 @@ class RegistroUsuarioForm(UserCreationForm):
         email = (self.cleaned_data.get("email") or "").lower()
         if not email.endswith("@duocuc.cl"):
             raise forms.ValidationError("El correo debe ser @duocuc.cl")
-        if User.objects.filter(email__iexact=email).exists():
+        if User.objects.por_email(email).exists():
             raise forms.ValidationError("Ya existe un usuario con este correo.")
         return email
 
@@ -251,4 +254,8 @@ class PisoForm(forms.ModelForm):
 class SalaForm(forms.ModelForm):
     class Meta:
         model = Sala
-        fields = ['piso', 'codigo', 'nombre']
\ No newline at end of file
+        fields = ['piso', 'codigo', 'nombre']
+
+class ImportarUbicacionesForm(forms.Form):
+    archivo = forms.FileField(label="Archivo CSV", help_text="Columnas: edificio,piso,etiqueta,sala_codigo,sala_nombre")
+    simular = forms.BooleanField(label="Solo validar (no guardar)", required=False)
@@ -0,0 +1,193 @@
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# Variantes de las imágenes de reportes
+# ===========================================
+# Por cada imagen subida se generan, junto al original:
+#   reportes/variantes/<nombre original>/miniatura.webp|jpg  (lado mayor 160 px)
+#   reportes/variantes/<nombre original>/media.webp|jpg      (lado mayor 1024 px)
+# Reporte.imagen_variantes guarda el nombre del original para el que ya existen;
+# mientras no coincida con Reporte.imagen los templates usan el original.
+#
+# El redimensionado corre en un pool de procesos (Pillow suelta poco el GIL).
+# Los procesos hijos solo ejecutan _redimensionar: no tocan Django ni la BD,
+# por eso este módulo importa los modelos dentro de las funciones.
+
+VARIANTES = {
+    "miniatura": 160,
+    "media": 1024,
+}
+FORMATOS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def nombre_variante(nombre_original, variante, formato):
+    carpeta, archivo = posixpath.split(nombre_original)
+    return posixpath.join(carpeta, "variantes", archivo, f"{variante}.{formato}")
+
+
+def _redimensionar(contenido):
+    """Corre en el proceso hijo: bytes del original → {(variante, formato): bytes}."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(contenido)) as original:
+        imagen = ImageOps.exif_transpose(original)
+        if imagen.mode not in ("RGB", "L"):
+            # Transparencia sobre blanco: JPEG no tiene canal alfa
+            fondo = Image.new("RGB", imagen.size, "white")
+            fondo.paste(imagen, mask=imagen.convert("RGBA").getchannel("A"))
+            imagen = fondo
+
+        resultado = {}
+        for variante, lado in VARIANTES.items():
+            copia = imagen.copy()
+            copia.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+            for formato, (formato_pil, opciones) in FORMATOS.items():
+                salida = io.BytesIO()
+                copia.save(salida, formato_pil, **opciones)
+                resultado[(variante, formato)] = salida.getvalue()
+        return resultado
+
+
+def _marcar(reporte_id, nombre_original):
+    """Marca el reporte como listo (si la imagen no cambió entretanto)."""
+    from app.models import Reporte
+
+    # update() directo: no pasa por Reporte.save, ni contadores ni índice FTS. updated sí
+    # cambia: es parte del ETag de los listados, que dejaron de mostrar el original
+    return Reporte.objects.filter(pk=reporte_id, imagen=nombre_original) \
+        .update(imagen_variantes=nombre_original, updated=timezone.now())
+
+
+def _guardar(reporte_id, nombre_original, variantes):
+    """Escribe las variantes (en default_storage) y marca el reporte."""
+    for (variante, formato), contenido in variantes.items():
+        destino = nombre_variante(nombre_original, variante, formato)
+        if default_storage.exists(destino):
+            default_storage.delete(destino)
+        default_storage.save(destino, ContentFile(contenido))
+    return _marcar(reporte_id, nombre_original)
+
+
+def _variantes_existen(nombre_original):
+    # Con el almacenamiento por contenido, la misma foto en otro reporte ya las tiene
+    return all(
+        default_storage.exists(nombre_variante(nombre_original, variante, formato))
+        for variante in VARIANTES for formato in FORMATOS
+    )
+
+
+def _leer(nombre_original):
+    from app.models import Reporte
+
+    with Reporte._meta.get_field("imagen").storage.open(nombre_original, "rb") as archivo:
+        return archivo.read()
+
+
+def procesos():
+    """IMAGENES_PROCESOS en settings; 0 genera las variantes en el mismo proceso."""
+    return getattr(settings, "IMAGENES_PROCESOS", 2)
+
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: el hijo no hereda conexiones ni hilos del servidor
+            _pool = ProcessPoolExecutor(max_workers=procesos(), mp_context=get_context("spawn"))
+        return _pool
+
+
+def generar(reporte_id, nombre_original):
+    """Genera las variantes en este proceso. Devuelve True si el reporte quedó marcado."""
+    return bool(_guardar(reporte_id, nombre_original, _redimensionar(_leer(nombre_original))))
+
+
+def encolar(reporte_id, nombre_original):
+    """
+    Manda a generar las variantes sin bloquear la petición. Devuelve el Future
+    (o None si se generaron en línea porque IMAGENES_PROCESOS = 0).
+    """
+    if _variantes_existen(nombre_original):
+        _marcar(reporte_id, nombre_original)
+        return None
+
+    if not procesos():
+        try:
+            generar(reporte_id, nombre_original)
+        except OSError:
+            logger.warning("No se pudieron generar las variantes del reporte %s", reporte_id, exc_info=True)
+        return None
+
+    try:
+        contenido = _leer(nombre_original)
+    except OSError:
+        logger.warning("Imagen %s del reporte %s no encontrada", nombre_original, reporte_id)
+        return None
+
+    futuro = _obtener_pool().submit(_redimensionar, contenido)
+    hilo = threading.current_thread()
+
+    def terminado(f):
+        # Normalmente corre en un hilo del pool, con su propia conexión a la BD
+        try:
+            _guardar(reporte_id, nombre_original, f.result())
+        except Exception:
+            logger.exception("No se pudieron generar las variantes del reporte %s", reporte_id)
+        finally:
+            if threading.current_thread() is not hilo:
+                connection.close()
+
+    futuro.add_done_callback(terminado)
+    return futuro
+
+
+def generar_lote(pendientes, n_procesos=None):
+    """
+    Para el backfill: pendientes = iterable de (reporte_id, nombre_original).
+    Redimensiona en un pool propio, con a lo más 4 imágenes por proceso en memoria,
+    y va entregando (reporte_id, error) con error = None si salió bien.
+    """
+    n_procesos = n_procesos or procesos() or 1
+    with ProcessPoolExecutor(max_workers=n_procesos, mp_context=get_context("spawn")) as pool:
+        en_vuelo = {}
+        pendientes = iter(pendientes)
+        while True:
+            for reporte_id, nombre in pendientes:
+                try:
+                    en_vuelo[pool.submit(_redimensionar, _leer(nombre))] = (reporte_id, nombre)
+                except OSError as e:
+                    yield reporte_id, e
+                    continue
+                if len(en_vuelo) >= n_procesos * 4:
+                    break
+            if not en_vuelo:
+                return
+
+            futuro = next(iter(en_vuelo))
+            reporte_id, nombre = en_vuelo.pop(futuro)
+            try:
+                _guardar(reporte_id, nombre, futuro.result())
+            except Exception as e:
+                yield reporte_id, e
+            else:
+                yield reporte_id, None
@@ -0,0 +1,200 @@
+import csv
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from app import busqueda, ubicaciones
+from app.models import Edificio, Piso, Sala
+
+
+# ===========================================
+# Importación masiva de ubicaciones desde CSV
+# ===========================================
+# Columnas: edificio,piso,etiqueta,sala_codigo,sala_nombre (etiqueta y sala_nombre
+# opcionales; vacías no pisan lo que ya había).
+#
+# `edificio` se busca por código o por nombre (sin distinguir mayúsculas); si no
+# existe se crea con ese nombre y su slug como código.
+#
+# Tres consultas cargan lo existente en diccionarios y todo se valida en memoria
+# (incluidas las UniqueConstraint, contra la BD y entre líneas del mismo archivo).
+# Si hay algún error no se escribe nada. Si no, se escribe por lotes con
+# bulk_create(update_conflicts=True): un INSERT ... ON CONFLICT DO UPDATE por lote.
+# Las salas llevan el edificio ya resuelto, así que no pasan por Sala.save.
+#
+# bulk_create no emite post_save: el árbol de ubicaciones y el índice de búsqueda
+# (salas renombradas) se actualizan aquí mismo.
+
+COLUMNAS = ["edificio", "piso", "etiqueta", "sala_codigo", "sala_nombre"]
+OBLIGATORIAS = ["edificio", "piso", "sala_codigo"]
+LOTE = 500
+
+
+def _largo(nombre_modelo, campo):
+    return nombre_modelo._meta.get_field(campo).max_length
+
+
+def importar(lineas, guardar=True):
+    """
+    Importa las filas del CSV `lineas` (archivo de texto o iterable de líneas).
+    Devuelve un dict con los conteos (edificios, pisos_nuevos, pisos_actualizados,
+    salas_nuevas, salas_actualizadas, filas) y "errores": [(línea, mensaje), ...].
+    Con errores, o con guardar=False, no escribe nada.
+    """
+    lector = csv.DictReader(lineas)
+    resultado = {
+        "filas": 0, "edificios": 0, "pisos_nuevos": 0, "pisos_actualizados": 0,
+        "salas_nuevas": 0, "salas_actualizadas": 0, "errores": [],
+    }
+    errores = resultado["errores"]
+    faltan = [c for c in OBLIGATORIAS if c not in (lector.fieldnames or [])]
+    if faltan:
+        errores.append((1, f"Faltan columnas: {', '.join(faltan)} (se esperan {','.join(COLUMNAS)})."))
+        return resultado
+
+    # Lo existente, una consulta por modelo
+    por_codigo, por_nombre = {}, {}
+    for pk, nombre, codigo in Edificio.objects.values_list("id", "nombre", "codigo"):
+        por_codigo[codigo.lower()] = pk
+        por_nombre[nombre.lower()] = pk
+    pisos = {(e, n): (pk, etiqueta) for pk, e, n, etiqueta in Piso.objects.values_list("id", "edificio_id", "numero", "etiqueta")}
+    salas = {(e, c): (pk, p, nombre) for pk, e, p, c, nombre in Sala.objects.values_list("id", "edificio_id", "piso_id", "codigo", "nombre")}
+
+    # Edificios: pk si existe, o su slug si se crea en esta importación
+    nuevos_edificios = {}
+    pisos_csv = {}   # (edificio, numero) → (etiqueta, línea)
+    salas_csv = {}   # (edificio, codigo) → (numero, nombre, línea)
+
+    for fila in lector:
+        linea = lector.line_num
+        resultado["filas"] += 1
+        valor = (fila.get("edificio") or "").strip()
+        etiqueta = (fila.get("etiqueta") or "").strip()
+        codigo = (fila.get("sala_codigo") or "").strip()
+        nombre = (fila.get("sala_nombre") or "").strip()
+
+        if not valor:
+            errores.append((linea, "Falta el edificio."))
+            continue
+        edificio = por_codigo.get(valor.lower()) or por_nombre.get(valor.lower())
+        if edificio is None:
+            slug = slugify(valor)[:_largo(Edificio, "codigo")]
+            if not slug:
+                errores.append((linea, f"No se puede derivar un código para el edificio «{valor}»."))
+                continue
+            if slug in por_codigo:
+                errores.append((linea, f"El edificio «{valor}» no existe y su código «{slug}» ya lo usa otro edificio."))
+                continue
+            if len(valor) > _largo(Edificio, "nombre"):
+                errores.append((linea, "El nombre del edificio es demasiado largo."))
+                continue
+            if nuevos_edificios.setdefault(slug, valor).lower() != valor.lower():
+                errores.append((linea, f"«{valor}» y «{nuevos_edificios[slug]}» tendrían el mismo código «{slug}»."))
+                continue
+            edificio = slug
+
+        try:
+            numero = int((fila.get("piso") or "").strip())
+        except ValueError:
+            errores.append((linea, f"Piso inválido: «{fila.get('piso')}»."))
+            continue
+        if not -5 <= numero <= 200:
+            errores.append((linea, "El piso debe estar entre -5 y 200."))
+            continue
+        if len(etiqueta) > _largo(Piso, "etiqueta"):
+            errores.append((linea, "La etiqueta del piso es demasiado larga."))
+            continue
+
+        anterior = pisos_csv.get((edificio, numero))
+        if anterior and etiqueta and anterior[0] and anterior[0] != etiqueta:
+            errores.append((linea, f"Etiqueta distinta para el mismo piso que en la línea {anterior[1]}."))
+            continue
+        if not anterior or (etiqueta and not anterior[0]):
+            pisos_csv[(edificio, numero)] = (etiqueta, linea)
+
+        if not codigo:
+            errores.append((linea, "Falta el código de la sala."))
+            continue
+        if len(codigo) > _largo(Sala, "codigo") or len(nombre) > _largo(Sala, "nombre"):
+            errores.append((linea, "El código o el nombre de la sala es demasiado largo."))
+            continue
+        # UniqueConstraint codigo_sala_unico_por_edificio, dentro del archivo
+        if (edificio, codigo) in salas_csv:
+            errores.append((linea, f"La sala «{codigo}» ya aparece en la línea {salas_csv[(edificio, codigo)][2]}."))
+            continue
+        salas_csv[(edificio, codigo)] = (numero, nombre, linea)
+
+    # Qué cambia respecto de la BD (para el resumen, también al simular)
+    pisos_a_escribir = {}
+    for clave, (etiqueta, _) in pisos_csv.items():
+        existente = pisos.get(clave)
+        if existente is None:
+            resultado["pisos_nuevos"] += 1
+            pisos_a_escribir[clave] = etiqueta
+        elif etiqueta and etiqueta != existente[1]:
+            resultado["pisos_actualizados"] += 1
+            pisos_a_escribir[clave] = etiqueta
+
+    salas_a_escribir = {}
+    for (edificio, codigo), (numero, nombre, _) in salas_csv.items():
+        existente = salas.get((edificio, codigo))
+        if existente is None:
+            resultado["salas_nuevas"] += 1
+            salas_a_escribir[(edificio, codigo)] = (numero, nombre)
+            continue
+        sala_id, piso_id, nombre_actual = existente
+        nombre = nombre or nombre_actual
+        if pisos.get((edificio, numero), (None,))[0] != piso_id or nombre != nombre_actual:
+            resultado["salas_actualizadas"] += 1
+            salas_a_escribir[(edificio, codigo)] = (numero, nombre)
+    resultado["edificios"] = len(nuevos_edificios)
+
+    if errores or not guardar:
+        return resultado
+
+    with transaction.atomic():
+        _escribir(nuevos_edificios, pisos_a_escribir, salas_a_escribir, salas)
+    return resultado
+
+
+def _escribir(nuevos_edificios, pisos_a_escribir, salas_a_escribir, salas):
+    ids = {}
+    if nuevos_edificios:
+        Edificio.objects.bulk_create(
+            [Edificio(nombre=nombre, codigo=slug) for slug, nombre in nuevos_edificios.items()],
+            batch_size=LOTE,
+        )
+        ids = dict(Edificio.objects.filter(codigo__in=list(nuevos_edificios)).values_list("codigo", "id"))
+
+    def edificio_id(referencia):
+        return ids[referencia] if isinstance(referencia, str) else referencia
+
+    Piso.objects.bulk_create(
+        [Piso(edificio_id=edificio_id(e), numero=n, etiqueta=etiqueta) for (e, n), etiqueta in pisos_a_escribir.items()],
+        batch_size=LOTE, update_conflicts=True, unique_fields=["edificio", "numero"], update_fields=["etiqueta"],
+    )
+
+    # Ids de los pisos (nuevos incluidos) de los edificios tocados
+    tocados = {edificio_id(e) for e, _ in salas_a_escribir}
+    piso_de = {
+        (e, n): pk
+        for pk, e, n in Piso.objects.filter(edificio_id__in=tocados).values_list("id", "edificio_id", "numero")
+    }
+    Sala.objects.bulk_create(
+        [
+            Sala(edificio_id=edificio_id(e), piso_id=piso_de[(edificio_id(e), numero)], codigo=codigo, nombre=nombre)
+            for (e, codigo), (numero, nombre) in salas_a_escribir.items()
+        ],
+        batch_size=LOTE, update_conflicts=True, unique_fields=["edificio", "codigo"], update_fields=["piso", "nombre"],
+    )
+
+    # Reportes de salas renombradas: su texto de ubicación en el índice cambió
+    renombradas = [
+        salas[clave][0] for clave, (_, nombre) in salas_a_escribir.items()
+        if clave in salas and salas[clave][2] != nombre
+    ]
+    if renombradas:
+        busqueda.indexar_salas(renombradas)
+
+    ubicaciones.invalidar()
+    transaction.on_commit(ubicaciones.invalidar)
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from app import analitica
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza los resúmenes diarios de la analítica (ResumenDiario) desde el último día "
+        "pendiente hasta hoy. Se puede correr las veces que sea (p. ej. cada hora por cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde",
+            type=date.fromisoformat,
+            help="Recalcula desde este día (AAAA-MM-DD) en vez de desde la marca guardada.",
+        )
+
+    def handle(self, *args, **options):
+        dias, filas = analitica.actualizar(desde=options["desde"])
+        self.stdout.write(f"Resúmenes actualizados: {dias} día(s), {filas} fila(s).")
@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import include, path, reverse
+
+from app import views, vistas_async
+from app.models import Edificio, Piso, Reporte, Sala, Usuario
+from app.urls import con_vistas
+
+CSRF = "benchbenchbenchbenchbenchbench12"
+HOST = "localhost"
+
+
+class UrlsSync:
+    urlpatterns = [path("", include(con_vistas(views)))]
+
+
+class UrlsAsync:
+    urlpatterns = [path("", include(con_vistas(vistas_async)))]
+
+
+# modo → (servidor, urlconf)
+MODOS = {
+    "wsgi": ("wsgi", UrlsSync),
+    "asgi_sync": ("asgi", UrlsSync),
+    "asgi_async": ("asgi", UrlsAsync),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide req/s y latencia (p50/p95) de los endpoints JSON calientes con N clientes "
+        "concurrentes: vistas síncronas bajo WSGI (pool de hilos), síncronas bajo ASGI y "
+        "async bajo ASGI. Llama a los handlers de Django en el mismo proceso, sin servidor "
+        "HTTP, sobre una base de prueba temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clientes", type=int, default=200)
+        parser.add_argument("--peticiones", type=int, default=10, help="Peticiones por cliente.")
+        parser.add_argument("--hilos", type=int, default=8, help="Hilos del servidor WSGI.")
+        parser.add_argument("--reportes", type=int, default=2000)
+        parser.add_argument("--latencia-ms", type=float, default=0,
+                            help="Espera agregada a cada consulta (simula una BD en red).")
+        parser.add_argument("--solo-lectura", action="store_true",
+                            help="Solo los GET: separa el modelo de concurrencia de los bloqueos de escritura de SQLite.")
+        parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+
+    def handle(self, *args, **options):
+        nombre_original = connection.settings_dict["NAME"]
+        # SQLite: base en archivo, la comparten los hilos del pool WSGI y el hilo de la BD de
+        # ASGI (PostgreSQL crea su base test_* de siempre)
+        carpeta = tempfile.mkdtemp()
+        if connection.vendor == "sqlite":
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(carpeta, "bench.sqlite3")
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        espera = options["latencia_ms"] / 1000
+
+        def demora(execute, sql, params, many, context):
+            time.sleep(espera)
+            return execute(sql, params, many, context)
+
+        def instalar(sender, connection, **kwargs):
+            # connection_created se repite en cada reconexión del mismo hilo (CONN_MAX_AGE=0)
+            if demora not in connection.execute_wrappers:
+                connection.execute_wrappers.append(demora)
+
+        try:
+            sesiones, reportes, ubicacion = self._poblar(options["reportes"])
+            if espera:
+                connection_created.connect(instalar)
+            self.stdout.write(
+                f"{options['clientes']} clientes x {options['peticiones']} peticiones, "
+                f"latencia BD {options['latencia_ms']:g} ms\n"
+            )
+            self.stdout.write(f"{'modo':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errores':>9}")
+            for modo in options["modos"]:
+                servidor, urlconf = MODOS[modo]
+                cache.clear()
+                connections.close_all()
+                # Los 500 se cuentan como errores; sin el traceback de cada uno en consola
+                logging.disable(logging.ERROR)
+                with override_settings(ROOT_URLCONF=urlconf, ALLOWED_HOSTS=[HOST]):
+                    peticiones = self._peticiones(sesiones, reportes, ubicacion, options["clientes"])
+                    if options["solo_lectura"]:
+                        peticiones = [[p for p in ciclo if p[0] == "GET"] for ciclo in peticiones]
+                    tiempos, errores, total = asyncio.run(
+                        self._correr(servidor, peticiones, options["peticiones"], options["hilos"])
+                    )
+                tiempos.sort()
+                self.stdout.write(
+                    f"{modo:<12}{len(tiempos) / total:>9.1f}{statistics.median(tiempos) * 1000:>9.1f}"
+                    f"{tiempos[int(len(tiempos) * 0.95)] * 1000:>9.1f}{errores:>9}"
+                )
+        finally:
+            logging.disable(logging.NOTSET)
+            connection_created.disconnect(instalar)
+            connections.close_all()
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            os.rmdir(carpeta)
+
+    # ------------------------------------------------------------------
+    def _poblar(self, n):
+        mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        for e in range(5):
+            edificio = Edificio.objects.create(nombre=f"Edificio {e}", codigo=f"e{e}")
+            for p in range(4):
+                piso = Piso.objects.create(edificio=edificio, numero=p)
+                Sala.objects.bulk_create(Sala(edificio=edificio, piso=piso, codigo=f"{e}{p}{s:02}", nombre="Sala") for s in range(10))
+        Reporte.objects.bulk_create(
+            Reporte(titulo=f"Reporte {i}", categoria="Infraestructura", prioridad="Media", descripcion="-",
+                    imagen="", usuario=alumno, asignado_a=mant, estado="en_proceso")
+            for i in range(n)
+        )
+        # ContadorEstado se mantiene en save(); bulk_create no pasa por ahí
+        call_command("reconciliar_contadores", stdout=StringIO())
+
+        sesiones = {}
+        for usuario in (mant, admin):
+            cliente = Client()
+            cliente.force_login(usuario)
+            sesiones[usuario.nombre_rol] = cliente.cookies["sessionid"].value
+        reportes = list(Reporte.objects.values_list("pk", flat=True))
+        return sesiones, reportes, (edificio.pk, piso.pk)
+
+    @staticmethod
+    def _peticiones(sesiones, reportes, ubicacion, clientes):
+        """Por cliente, un ciclo de (método, ruta, query, cuerpo, sesión) que mezcla lecturas y escrituras."""
+        edificio, piso = ubicacion
+        ciclos = []
+        for c in range(clientes):
+            propio = reportes[c % len(reportes)]
+            ciclos.append([
+                ("GET", reverse("contadores-dashboard"), "", b"", sesiones["mantenimiento"]),
+                ("GET", reverse("cargar-pisos"), urlencode({"edificio_id": edificio}), b"", sesiones["administracion"]),
+                ("GET", reverse("cargar-salas"), urlencode({"piso_id": piso}), b"", sesiones["administracion"]),
+                ("POST", reverse("actualizar_estado_reporte"), "",
+                 urlencode({"reporte_id": propio, "nuevo_estado": "pausado" if c % 2 else "en_proceso"}).encode(),
+                 sesiones["mantenimiento"]),
+                ("POST", reverse("asignar-mantenedor", args=[reportes[-1 - c % len(reportes)]]), "",
+                 urlencode({"asignado_a": ""}).encode(), sesiones["administracion"]),
+            ])
+        return ciclos
+
+    async def _correr(self, servidor, ciclos, por_cliente, hilos):
+        if servidor == "wsgi":
+            handler, pool = WSGIHandler(), ThreadPoolExecutor(hilos)
+            loop = asyncio.get_running_loop()
+
+            async def llamar(peticion):
+                return await loop.run_in_executor(pool, _wsgi, handler, peticion)
+        else:
+            handler = ASGIHandler()
+
+            async def llamar(peticion):
+                return await _asgi(handler, peticion)
+
+        tiempos, errores = [], 0
+
+        async def cliente(ciclo):
+            nonlocal errores
+            for i in range(por_cliente):
+                inicio = time.perf_counter()
+                estado = await llamar(ciclo[i % len(ciclo)])
+                tiempos.append(time.perf_counter() - inicio)
+                errores += estado != 200
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(ciclo) for ciclo in ciclos))
+        total = time.perf_counter() - inicio
+        if servidor == "wsgi":
+            pool.shutdown()
+        return tiempos, errores, total
+
+
+def _cabeceras(sesion):
+    return {
+        "cookie": f"sessionid={sesion}; csrftoken={CSRF}",
+        "x-csrftoken": CSRF,
+        "content-type": "application/x-www-form-urlencoded",
+    }
+
+
+def _wsgi(handler, peticion):
+    metodo, ruta, query, cuerpo, sesion = peticion
+    environ = {
+        "REQUEST_METHOD": metodo, "PATH_INFO": ruta, "QUERY_STRING": query, "SCRIPT_NAME": "",
+        "SERVER_NAME": HOST, "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1", "REMOTE_ADDR": "127.0.0.1",
+        "CONTENT_LENGTH": str(len(cuerpo)), "wsgi.input": BytesIO(cuerpo), "wsgi.url_scheme": "http",
+        "wsgi.errors": BytesIO(), "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    for nombre, valor in _cabeceras(sesion).items():
+        clave = nombre.upper().replace("-", "_")
+        environ[clave if clave == "CONTENT_TYPE" else "HTTP_" + clave] = valor
+
+    estado = []
+    respuesta = handler(environ, lambda status, headers: estado.append(int(status.split()[0])))
+    try:
+        b"".join(respuesta)
+    finally:
+        respuesta.close()
+    return estado[0]
+
+
+async def _asgi(handler, peticion):
+    metodo, ruta, query, cuerpo, sesion = peticion
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": metodo,
+        "scheme": "http", "path": ruta, "raw_path": ruta.encode(), "query_string": query.encode(),
+        "root_path": "", "client": ("127.0.0.1", 1), "server": (HOST, 80),
+        "headers": [(b"host", HOST.encode())]
+        + [(nombre.encode(), valor.encode()) for nombre, valor in _cabeceras(sesion).items()],
+    }
+    recibido = False
+
+    async def receive():
+        nonlocal recibido
+        if not recibido:
+            recibido = True
+            return {"type": "http.request", "body": cuerpo, "more_body": False}
+        # El cliente no se desconecta: Django cancela esta espera al terminar
+        await asyncio.Future()
+
+    estado = []
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            estado.append(mensaje["status"])
+
+    await handler(scope, receive, send)
+    return estado[0]
@@ -0,0 +1,114 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+
+from app import busqueda
+from app.models import Edificio, Piso, Reporte, Sala, Usuario
+from app.paginacion import KeysetPaginator
+from app.views import _contar_por_estado
+
+PALABRAS = (
+    "fuga agua baño luz ampolleta enchufe proyector computador mesa silla puerta ventana "
+    "vidrio roto sucio basura olor humedad techo gotera piso resbaloso escalera ascensor "
+    "aire acondicionado calefacción wifi red impresora pizarra plumón cortina llave chapa"
+).split()
+CATEGORIAS = ["Infraestructura", "Limpieza", "Tecnología"]
+PRIORIDADES = ["Baja", "Media", "Alta"]
+ESTADOS = ["pendiente", "en_proceso", "pausado", "completado"]
+# Palabras frecuentes, combinaciones, sin tilde, ubicación y nada
+# (_medir agrega además un código de inventario puntual)
+TERMINOS = ["fuga", "proyector roto", "baño", "calefaccion", "edificio 3", "xyz"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda FTS5 con el camino LIKE '%…%' sobre una base de prueba "
+        "temporal con N reportes (no toca la base configurada)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reportes", type=int, default=100_000)
+        parser.add_argument("--repeticiones", type=int, default=5)
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("El benchmark de FTS5 requiere SQLite.")
+
+        nombre_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._poblar(options["reportes"], random.Random(options["semilla"]))
+            self._medir(options["repeticiones"])
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+    def _poblar(self, n, rnd):
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            usuario = Usuario.objects.create_user("bench", "bench@duocuc.cl", "bench")
+            salas = []
+            for e in range(5):
+                edificio = Edificio.objects.create(nombre=f"Edificio {e}", codigo=f"e{e}")
+                for p in range(4):
+                    piso = Piso.objects.create(edificio=edificio, numero=p)
+                    for s in range(10):
+                        salas.append(Sala.objects.create(piso=piso, codigo=f"{p}{s:02d}", nombre=f"Sala {p}{s:02d}"))
+
+            lote = []
+            for i in range(n):
+                lote.append(Reporte(
+                    titulo=" ".join(rnd.sample(PALABRAS, 3)).capitalize(),
+                    descripcion=" ".join(rnd.choices(PALABRAS, k=10)) + f" inventario {i * 7919 % 1_000_003}",
+                    categoria=rnd.choice(CATEGORIAS),
+                    prioridad=rnd.choice(PRIORIDADES),
+                    estado=rnd.choice(ESTADOS),
+                    imagen="reportes/bench.jpg",
+                    usuario=usuario,
+                    sala=rnd.choice(salas),
+                ))
+                if len(lote) == 5000:
+                    Reporte.objects.bulk_create(lote)
+                    lote = []
+            Reporte.objects.bulk_create(lote)
+            busqueda.reconstruir_indice()
+
+        self.stdout.write(f"{n} reportes e índice FTS5 creados en {time.perf_counter() - inicio:.1f} s\n")
+
+    def _medir(self, repeticiones):
+        self.stdout.write(f"{'término':<20}{'coincid.':>10}{'LIKE ms':>10}{'FTS5 ms':>10}{'x':>8}")
+        base = Reporte.objects.filter(prioridad="Alta")
+        codigo = base.order_by("id").values_list("descripcion", flat=True).first().split()[-1]
+        for termino in [*TERMINOS, f"inventario {codigo}"]:
+            # Lo que hace el dashboard: contadores + primera página
+            def like():
+                qs = busqueda.buscar_like(base, termino)
+                contadores = _contar_por_estado(qs)
+                list(KeysetPaginator(qs, 10).get_page(QueryDict()))
+                return contadores["total"]
+
+            def fts():
+                qs, orden = busqueda.buscar(base, termino)
+                contadores = _contar_por_estado(qs)
+                list(KeysetPaginator(qs, 10, orden=orden).get_page(QueryDict()))
+                return contadores["total"]
+
+            t_like, n_like = self._tiempo(like, repeticiones)
+            t_fts, n_fts = self._tiempo(fts, repeticiones)
+            self.stdout.write(
+                f"{termino:<20}{n_fts:>10}{t_like:>10.1f}{t_fts:>10.1f}{t_like / max(t_fts, 0.001):>8.1f}"
+                + ("" if n_like == n_fts else f"  (LIKE encontró {n_like})")
+            )
+
+    @staticmethod
+    def _tiempo(funcion, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos), resultado
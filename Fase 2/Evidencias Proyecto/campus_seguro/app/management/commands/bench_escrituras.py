@@ -0,0 +1,231 @@
+import argparse
+import io
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from app import semilla
+from app.models import Reporte, Usuario
+
+# modo → (journal_mode del archivo, ajustes de los procesos)
+MODOS = {
+    # Como antes de app.bd: diario de rollback, PRAGMA por defecto, transacciones DEFERRED
+    "antes": ("DELETE", {"SQLITE_PRAGMAS": {}, "SQLITE_ESCRITURA_INMEDIATA": False}),
+    # settings.SQLITE_PRAGMAS (WAL, ...) y BEGIN IMMEDIATE en las vistas que escriben
+    "despues": ("WAL", {}),
+}
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p * len(valores)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de escrituras concurrentes sobre una base temporal (en SQLite, un archivo): N procesos "
+        "llaman a actualizar_estado_reporte (mantenedores) y asignar-mantenedor (administradores) "
+        "mientras otros leen la página admin. Informa escrituras por segundo, errores "
+        "\"database is locked\" y latencias. En SQLite compara los ajustes anteriores a app.bd con los "
+        "actuales; con otro motor mide la configuración actual."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mantenedores", type=int, default=4, help="Procesos que cambian estados.")
+        parser.add_argument("--administradores", type=int, default=4, help="Procesos que asignan.")
+        parser.add_argument("--lectores", type=int, default=2, help="Procesos que leen la página admin.")
+        parser.add_argument("--segundos", type=float, default=10)
+        parser.add_argument("--reportes", type=int, default=3000, help="Reportes del campus sintético.")
+        parser.add_argument("--modo", choices=MODOS, action="append", help="Solo este modo (repetible, SQLite).")
+        parser.add_argument("--json", dest="salida_json", help="Escribe el informe en este archivo JSON.")
+        parser.add_argument("--trabajador", help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["trabajador"]:
+            self.stdout.write(json.dumps(self._trabajar(json.loads(options["trabajador"]))))
+            return
+
+        sqlite = connection.vendor == "sqlite"
+        if not sqlite and options["modo"]:
+            raise CommandError("Los modos comparan ajustes de SQLite.")
+        modos = (options["modo"] or list(MODOS)) if sqlite else [connection.vendor]
+        informe = {}
+        nombre_original = connection.settings_dict["NAME"]
+        nombre_prueba = connection.settings_dict["TEST"].get("NAME")
+        with tempfile.TemporaryDirectory() as carpeta:
+            if sqlite:
+                # Varios procesos: la base temporal tiene que ser un archivo, no :memory:
+                connection.settings_dict["TEST"]["NAME"] = os.path.join(carpeta, "bench_escrituras.sqlite3")
+            base = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.stdout.write(f"Sembrando campus: {options['reportes']} reportes…")
+                trabajos = self._preparar(options)
+                connection.close()
+                self.stdout.write(
+                    f"{options['mantenedores']} mantenedor(es), {options['administradores']} administrador(es) y "
+                    f"{options['lectores']} lector(es) durante {options['segundos']:g} s por modo\n"
+                )
+                for modo in modos:
+                    informe[modo] = self._correr(base, modo, trabajos, options["segundos"])
+            finally:
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+                connection.settings_dict["TEST"]["NAME"] = nombre_prueba
+
+        self.stdout.write(
+            f"{'modo':<11}{'escr./s':>9}{'bloqueos':>10}{'otros':>7}{'escr. p50':>11}{'escr. p95':>11}"
+            f"{'lect./s':>9}{'lect. p95':>11}"
+        )
+        for modo, r in informe.items():
+            self.stdout.write(
+                f"{modo:<11}{r['escrituras_por_segundo']:>9.1f}{r['bloqueos']:>10}{r['otros_errores']:>7}"
+                f"{r['escritura_p50_ms']:>9.1f}ms{r['escritura_p95_ms']:>9.1f}ms"
+                f"{r['lecturas_por_segundo']:>9.1f}{r['lectura_p95_ms']:>9.1f}ms"
+            )
+        if options["salida_json"]:
+            with open(options["salida_json"], "w", encoding="utf-8") as archivo:
+                json.dump({"opciones": {k: options[k] for k in ("mantenedores", "administradores", "lectores", "segundos", "reportes")},
+                           "modos": informe}, archivo, indent=2)
+
+    # ===========================================
+    # Preparación (proceso principal)
+    # ===========================================
+    def _preparar(self, options):
+        n_mant, n_admin = options["mantenedores"], options["administradores"]
+        if n_mant + n_admin < 1:
+            raise CommandError("Se necesita al menos un proceso que escriba.")
+        # Dos mantenedores más: entre ellos van y vienen las asignaciones de los administradores
+        semilla.sembrar(edificios=1, pisos=2, salas=5, alumnos=50, mantenedores=n_mant + 2,
+                        administradores=max(n_admin, 1), reportes=options["reportes"], dias=60)
+        mantenedores = list(Usuario.objects.filter(nombre_rol="mantenimiento").order_by("id").values_list("id", flat=True))
+        administradores = list(Usuario.objects.filter(nombre_rol="administracion").order_by("id").values_list("id", flat=True))
+        ids = list(Reporte.objects.order_by("id").values_list("id", flat=True))
+        por_trabajo = len(ids) // (n_mant + n_admin)
+        if por_trabajo < 1:
+            raise CommandError("No hay reportes suficientes para repartir.")
+
+        # Cada proceso trabaja sobre sus propios reportes, abiertos y con el dueño que corresponde
+        trabajos = []
+        tramos = (ids[i * por_trabajo:(i + 1) * por_trabajo][:50] for i in range(n_mant + n_admin))
+        for mantenedor, tramo in zip(mantenedores[:n_mant], tramos):
+            Reporte.objects.filter(pk__in=tramo).update(asignado_a_id=mantenedor, estado="en_proceso")
+            trabajos.append({"rol": "mantenimiento", "usuario": mantenedor, "reportes": tramo})
+        for i, tramo in zip(range(n_admin), tramos):
+            Reporte.objects.filter(pk__in=tramo).update(asignado_a_id=mantenedores[-1], estado="en_proceso")
+            trabajos.append({"rol": "administracion", "usuario": administradores[i], "reportes": tramo,
+                             "mantenedores": mantenedores[-2:]})
+        for _ in range(options["lectores"]):
+            trabajos.append({"rol": "lector", "usuario": administradores[0]})
+        # update() no pasa por los signals de los contadores
+        call_command("reconciliar_contadores", stdout=io.StringIO())
+        return trabajos
+
+    def _correr(self, base, modo, trabajos, segundos):
+        diario, _ = MODOS.get(modo, (None, {}))
+        if diario:
+            with sqlite3.connect(base) as conexion:
+                conexion.execute(f"PRAGMA journal_mode = {diario}")
+            conexion.close()
+
+        # Todos empiezan a la vez, después de que cada proceso cargó Django e inició sesión
+        inicio = time.time() + 3 + 0.3 * len(trabajos)
+        procesos = [
+            subprocess.Popen(
+                [sys.executable, sys.argv[0], "bench_escrituras", "--trabajador",
+                 json.dumps({**t, "base": base, "modo": modo, "inicio": inicio, "segundos": segundos})],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            )
+            for t in trabajos
+        ]
+        resultados = []
+        for proceso in procesos:
+            salida, errores = proceso.communicate()
+            if proceso.returncode:
+                raise CommandError(f"Falló un proceso de {modo}:\n{errores}")
+            resultados.append(json.loads(salida.strip().splitlines()[-1]))
+
+        escrituras = [r for r in resultados if r["rol"] != "lector"]
+        lecturas = [r for r in resultados if r["rol"] == "lector"]
+        latencias_escritura = [x for r in escrituras for x in r["latencias"]]
+        latencias_lectura = [x for r in lecturas for x in r["latencias"]]
+        return {
+            "escrituras": sum(r["ok"] for r in escrituras),
+            "escrituras_por_segundo": sum(r["ok"] for r in escrituras) / segundos,
+            "bloqueos": sum(r["bloqueos"] for r in resultados),
+            "otros_errores": sum(r["otros"] for r in resultados),
+            "escritura_p50_ms": statistics.median(latencias_escritura) * 1000 if latencias_escritura else 0.0,
+            "escritura_p95_ms": _percentil(latencias_escritura, 0.95) * 1000,
+            "escritura_max_ms": max(latencias_escritura, default=0) * 1000,
+            "lecturas": sum(r["ok"] for r in lecturas),
+            "lecturas_por_segundo": sum(r["ok"] for r in lecturas) / segundos,
+            "lectura_p95_ms": _percentil(latencias_lectura, 0.95) * 1000,
+        }
+
+    # ===========================================
+    # Trabajador (un proceso por trabajo)
+    # ===========================================
+    def _trabajar(self, trabajo):
+        _, ajustes = MODOS.get(trabajo["modo"], (None, {}))
+        connection.close()
+        connection.settings_dict["NAME"] = trabajo["base"]
+        # Los 4xx, las peticiones lentas y los errores se cuentan, no se muestran
+        logging.disable(logging.CRITICAL)
+        with override_settings(ALLOWED_HOSTS=["testserver"], **ajustes):
+            cliente = Client()
+            cliente.force_login(Usuario.objects.get(pk=trabajo["usuario"]))
+            peticiones = self._peticiones(trabajo)
+            time.sleep(max(0.0, trabajo["inicio"] - time.time()))
+            fin = trabajo["inicio"] + trabajo["segundos"]
+
+            ok = bloqueos = otros = 0
+            latencias = []
+            while time.time() < fin:
+                metodo, url, datos = next(peticiones)
+                t0 = time.perf_counter()
+                try:
+                    respuesta = getattr(cliente, metodo)(url, datos)
+                except OperationalError as e:
+                    # SQLite: "database is locked"; PostgreSQL: deadlocks, tiempo de espera del pool, ...
+                    if "locked" in str(e):
+                        bloqueos += 1
+                    else:
+                        otros += 1
+                else:
+                    if respuesta.status_code == 200:
+                        ok += 1
+                    else:
+                        otros += 1
+                latencias.append(time.perf_counter() - t0)
+        return {"rol": trabajo["rol"], "ok": ok, "bloqueos": bloqueos, "otros": otros, "latencias": latencias}
+
+    @staticmethod
+    def _peticiones(trabajo):
+        """Peticiones sin fin; cada vuelta deja los reportes en otro estado o con otro mantenedor."""
+        if trabajo["rol"] == "lector":
+            url = reverse("admin")
+            while True:
+                yield "get", url, {}
+        elif trabajo["rol"] == "mantenimiento":
+            url = reverse("actualizar_estado_reporte")
+            for estado in itertools.cycle(["pausado", "en_proceso"]):
+                for reporte in trabajo["reportes"]:
+                    yield "post", url, {"reporte_id": reporte, "nuevo_estado": estado}
+        else:
+            for mantenedor in itertools.cycle(trabajo["mantenedores"]):
+                for reporte in trabajo["reportes"]:
+                    yield "post", reverse("asignar-mantenedor", args=[reporte]), {"asignado_a": mantenedor}
@@ -0,0 +1,118 @@
+import statistics
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from app.models import Usuario
+
+CONTRASENA = "clave-de-prueba"
+
+
+def login_anterior(email, password):
+    # Lo que hacía login_view: buscar por iexact y autenticar por username
+    u = Usuario.objects.filter(email__iexact=email).first()
+    if u:
+        return authenticate(None, username=u.username, password=password)
+    return None
+
+
+def login_nuevo(email, password):
+    return authenticate(None, email=email, password=password)
+
+
+CAMINOS = {"anterior": login_anterior, "nuevo": login_nuevo}
+# Intentos que se reparten por igual: correcto, contraseña mala y correo inexistente
+CASOS = {
+    "ok": ("Bench@DuocUC.cl", CONTRASENA),
+    "clave mala": ("bench@duocuc.cl", "otra"),
+    "sin cuenta": ("nadie@duocuc.cl", CONTRASENA),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide logins por segundo (y consultas por login) del camino anterior de login_view "
+        "y de EmailBackend, con distintas iteraciones de PBKDF2, sobre una base de prueba "
+        "temporal con N usuarios (no toca la base configurada)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=20_000)
+        parser.add_argument("--intentos", type=int, default=30, help="Intentos por caso y camino.")
+        parser.add_argument("--hilos", type=int, default=4)
+        parser.add_argument(
+            "--iteraciones", type=int, nargs="+",
+            default=[100_000, 600_000, PBKDF2PasswordHasher.iterations],
+        )
+
+    def handle(self, *args, **options):
+        nombre_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._poblar(options["usuarios"])
+            self.stdout.write(
+                f"{'iteraciones':>11}  {'camino':<9}{'consultas':>10}"
+                + "".join(f"{caso + ' ms':>16}" for caso in CASOS)
+                + f"{'logins/s ' + str(options['hilos']) + ' hilos':>20}"
+            )
+            for iteraciones in options["iteraciones"]:
+                with mock.patch.object(PBKDF2PasswordHasher, "iterations", iteraciones):
+                    # La contraseña guardada con las mismas iteraciones: sin re-hash al entrar
+                    usuario = Usuario.objects.get(username="bench")
+                    usuario.set_password(CONTRASENA)
+                    usuario.save(update_fields=["password"])
+                    for nombre, login in CAMINOS.items():
+                        self._medir(iteraciones, nombre, login, options["intentos"], options["hilos"])
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+    def _poblar(self, n):
+        # Contraseña sin usar para el relleno: solo importa el tamaño de la tabla
+        Usuario.objects.bulk_create(
+            [Usuario(username=f"u{i}", email=f"u{i}@duocuc.cl", password="!") for i in range(n)],
+            batch_size=2000,
+        )
+        Usuario.objects.create_user("bench", "bench@duocuc.cl", CONTRASENA)
+
+    def _medir(self, iteraciones, nombre, login, intentos, hilos):
+        tiempos = {}
+        with CaptureQueriesContext(connection) as consultas:
+            login(*CASOS["ok"])
+        for caso, (email, password) in CASOS.items():
+            muestras = []
+            for _ in range(intentos):
+                inicio = time.perf_counter()
+                login(email, password)
+                muestras.append(time.perf_counter() - inicio)
+            tiempos[caso] = statistics.median(muestras) * 1000
+
+        self.stdout.write(
+            f"{iteraciones:>11}  {nombre:<9}{len(consultas):>10}"
+            + "".join(f"{tiempos[caso]:>16.1f}" for caso in CASOS)
+            + f"{self._rendimiento(login, intentos, hilos):>20.1f}"
+        )
+
+    @staticmethod
+    def _rendimiento(login, intentos, hilos):
+        # PBKDF2 suelta el GIL: con varios hilos se ve el techo real del servidor
+        barrera = threading.Barrier(hilos)
+
+        def trabajar():
+            barrera.wait()
+            for _ in range(intentos):
+                login(*CASOS["ok"])
+            connection.close()
+
+        inicio = time.perf_counter()
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+        for t in trabajadores:
+            t.start()
+        for t in trabajadores:
+            t.join()
+        return hilos * intentos / (time.perf_counter() - inicio)
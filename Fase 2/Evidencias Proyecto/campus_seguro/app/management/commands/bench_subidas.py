@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import load_handler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from app.subidas import procesar_imagen
+
+HANDLERS_DJANGO = [
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+HANDLERS_NUEVOS = ["app.subidas.ImagenUploadHandler", *HANDLERS_DJANGO]
+
+# modo → (handlers, procesar, reducir_al_decodificar)
+MODOS = {
+    "anterior": (HANDLERS_DJANGO, False, False),
+    "sin_draft": (HANDLERS_NUEVOS, True, False),
+    "nuevo": (HANDLERS_NUEVOS, True, True),
+}
+
+
+def _rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el pico de memoria (RSS) de N subidas concurrentes de una foto de 12 MP: "
+        "camino anterior (se guarda tal cual), ingesta decodificando completa y la ingesta "
+        "nueva con draft(). Cada modo corre en un proceso aparte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrentes", type=int, default=8)
+        parser.add_argument("--modo", choices=MODOS)
+        parser.add_argument("--foto", help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["modo"]:
+            resultado = self._correr(options["modo"], options["foto"], options["concurrentes"])
+            self.stdout.write(json.dumps(resultado))
+            return
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            foto = os.path.join(carpeta, "foto.jpg")
+            self._generar_foto(foto)
+            self.stdout.write(
+                f"Foto 4032x3024, {os.path.getsize(foto) / 1e6:.1f} MB, "
+                f"{options['concurrentes']} subidas concurrentes\n"
+            )
+            self.stdout.write(f"{'modo':<12}{'pico MB':>10}{'seg.':>8}{'guardado MB':>14}")
+            for modo in MODOS:
+                salida = subprocess.run(
+                    [sys.executable, sys.argv[0], "bench_subidas", "--modo", modo, "--foto", foto,
+                     "--concurrentes", str(options["concurrentes"])],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                r = json.loads(salida.strip().splitlines()[-1])
+                self.stdout.write(f"{modo:<12}{r['pico_mb']:>10.1f}{r['segundos']:>8.2f}{r['guardado_mb']:>14.2f}")
+
+    @staticmethod
+    def _generar_foto(ruta):
+        # Ruido + degradado: comprime como una foto real (~4 MB a calidad 90)
+        from PIL import Image
+
+        ruido = Image.effect_noise((4032, 3024), 24)
+        degradado = Image.linear_gradient("L").resize((4032, 3024))
+        foto = Image.merge("RGB", (ruido, degradado, Image.blend(ruido, degradado, 0.5)))
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        foto.save(ruta, "JPEG", quality=90, exif=exif)
+
+    def _correr(self, modo, foto, n):
+        handlers, procesar, reducir = MODOS[modo]
+        with open(foto, "rb") as f:
+            contenido = f.read()
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            # El cuerpo multipart de cada petición queda en memoria: es parte de la base
+            peticiones = []
+            for _ in range(n):
+                request = RequestFactory().post("/", {"imagen": SimpleUploadedFile("foto.jpg", contenido)})
+                request.upload_handlers = [load_handler(h, request) for h in handlers]
+                peticiones.append(request)
+
+            base = _rss()
+            pico = [base]
+            corriendo = threading.Event()
+            corriendo.set()
+
+            def muestrear():
+                while corriendo.is_set():
+                    pico[0] = max(pico[0], _rss())
+                    time.sleep(0.002)
+
+            barrera = threading.Barrier(n)
+            guardados = []
+
+            def subir(request):
+                barrera.wait()
+                archivo = request.FILES["imagen"]
+                if procesar:
+                    archivo = procesar_imagen(archivo, reducir_al_decodificar=reducir)
+                nombre = default_storage.save("reportes/bench.jpg", archivo)
+                guardados.append(default_storage.size(nombre))
+
+            muestreo = threading.Thread(target=muestrear, daemon=True)
+            muestreo.start()
+            inicio = time.perf_counter()
+            hilos = [threading.Thread(target=subir, args=(r,)) for r in peticiones]
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+            segundos = time.perf_counter() - inicio
+            corriendo.clear()
+            muestreo.join()
+
+        return {
+            "pico_mb": (pico[0] - base) / 2**20,
+            "segundos": segundos,
+            "guardado_mb": sum(guardados) / len(guardados) / 1e6,
+        }
@@ -0,0 +1,101 @@
+import json
+import logging
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from app import analitica, medicion_vistas, semilla
+
+# Campus de referencia del presupuesto; `hasta` fijo para que los datos no cambien con la fecha
+DATASET = {
+    "semilla": 42, "edificios": 4, "pisos": 4, "salas": 10, "alumnos": 500, "mantenedores": 20,
+    "administradores": 3, "reportes": 5000, "dias": 90, "hasta": "2026-01-01",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Recorre todas las URLs de app/urls.py con el cliente de pruebas sobre un campus sintético "
+        "(base temporal) y mide p50/p95 de tiempo, consultas SQL y filas leídas por vista. Compara "
+        "contra app/presupuesto_vistas.json y termina con error si alguna vista se pasa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--presupuesto", help="Por defecto, el del motor en uso (medicion_vistas.ruta_presupuesto).")
+        parser.add_argument("--json", dest="salida_json", help="Escribe el informe completo en este archivo JSON.")
+        parser.add_argument("--repeticiones", type=int, default=20)
+        parser.add_argument("--holgura-latencia", type=float, default=1.0,
+                            help="Multiplica los presupuestos de latencia (máquinas más lentas, CI).")
+        parser.add_argument("--casos", nargs="+", choices=medicion_vistas.CASOS, help="Solo estos casos.")
+        parser.add_argument("--actualizar-presupuesto", action="store_true",
+                            help="Reescribe el presupuesto con esta medición en vez de compararla.")
+
+    def handle(self, *args, **options):
+        options["presupuesto"] = options["presupuesto"] or str(medicion_vistas.ruta_presupuesto())
+        presupuesto = {}
+        if not options["actualizar_presupuesto"]:
+            try:
+                presupuesto = medicion_vistas.cargar_presupuesto(options["presupuesto"])
+            except FileNotFoundError:
+                raise CommandError(f"No existe {options['presupuesto']}; genérelo con --actualizar-presupuesto.")
+        dataset = presupuesto.get("dataset", DATASET)
+
+        nombre_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"Sembrando campus: {dataset['reportes']} reportes…")
+            semilla.sembrar(**{**dataset, "hasta": date.fromisoformat(dataset["hasta"])})
+            analitica.actualizar(hoy=date.fromisoformat(dataset["hasta"]))
+            # Los 403/404 se ven en el estado de cada caso; sin el log de cada uno en consola
+            logging.disable(logging.WARNING)
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                resultados = medicion_vistas.medir(
+                    medicion_vistas.contexto(), options["casos"], repeticiones=options["repeticiones"],
+                )
+        finally:
+            logging.disable(logging.NOTSET)
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        if options["actualizar_presupuesto"]:
+            with open(options["presupuesto"], "w", encoding="utf-8") as archivo:
+                json.dump(medicion_vistas.presupuesto_desde(resultados, dataset), archivo, indent=2, ensure_ascii=False)
+                archivo.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"Presupuesto reescrito: {options['presupuesto']}"))
+            return
+
+        if options["casos"]:
+            # Un subconjunto no cubre todas las rutas: solo se comparan los casos pedidos
+            presupuesto = {**presupuesto, "vistas": {k: v for k, v in presupuesto.get("vistas", {}).items() if k in resultados}}
+            fallas = [f for f in medicion_vistas.comparar(resultados, presupuesto, options["holgura_latencia"]) if f[0] in resultados]
+        else:
+            fallas = medicion_vistas.comparar(resultados, presupuesto, options["holgura_latencia"])
+
+        limites = presupuesto.get("vistas", {})
+        self.stdout.write(f"\n{'caso':<30}{'p50 ms':>9}{'p95 ms':>9}{'/ppto':>7}{'consultas':>11}{'/ppto':>7}{'filas':>8}{'/ppto':>7}")
+        for nombre, medido in resultados.items():
+            limite = limites.get(nombre, {})
+            self.stdout.write(
+                f"{nombre:<30}{medido['p50_ms']:>9.1f}{medido['p95_ms']:>9.1f}{limite.get('p95_ms', '-'):>7}"
+                f"{medido['consultas']:>11}{limite.get('consultas', '-'):>7}{medido['filas']:>8}{limite.get('filas', '-'):>7}"
+            )
+
+        if options["salida_json"]:
+            informe = {
+                "dataset": dataset,
+                "repeticiones": options["repeticiones"],
+                "holgura_latencia": options["holgura_latencia"],
+                "vistas": {
+                    nombre: {**medido, "presupuesto": limites.get(nombre)} for nombre, medido in resultados.items()
+                },
+                "fallas": [{"caso": caso, "motivo": motivo} for caso, motivo in fallas],
+            }
+            with open(options["salida_json"], "w", encoding="utf-8") as archivo:
+                json.dump(informe, archivo, indent=2, ensure_ascii=False)
+
+        if fallas:
+            for caso, motivo in fallas:
+                self.stderr.write(f"✗ {caso}: {motivo}")
+            raise CommandError(f"{len(fallas)} presupuesto(s) excedido(s).")
+        self.stdout.write(self.style.SUCCESS(f"\n{len(resultados)} caso(s) dentro del presupuesto."))
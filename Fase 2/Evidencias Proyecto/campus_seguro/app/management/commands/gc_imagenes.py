@@ -0,0 +1,114 @@
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from app import imagenes
+from app.almacenamiento import es_nombre_por_contenido, storage_imagenes
+from app.models import ArchivoImagen, Reporte
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las imágenes de reportes que ningún reporte usa (referencias en 0) y los "
+        "archivos por contenido que quedaron sin fila, junto con sus variantes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--gracia", type=int, default=60,
+            help="Minutos sin cambios antes de borrar (protege subidas en curso). Por defecto 60.",
+        )
+        parser.add_argument("--reconciliar", action="store_true",
+                            help="Recalcula las referencias desde Reporte antes de borrar.")
+        parser.add_argument("--simular", action="store_true", help="Solo informa, no borra.")
+
+    def handle(self, *args, **options):
+        storage = storage_imagenes()
+        limite = timezone.now() - timedelta(minutes=options["gracia"])
+
+        if options["reconciliar"]:
+            self._reconciliar()
+
+        candidatos = set(
+            ArchivoImagen.objects.filter(referencias__lte=0, actualizado__lt=limite)
+            .values_list("nombre", flat=True)
+        )
+        # Archivos escritos por una transacción que después se revirtió: sin fila
+        con_fila = set(ArchivoImagen.objects.values_list("nombre", flat=True))
+        carpeta = Reporte._meta.get_field("imagen").upload_to.strip("/")
+        for nombre in self._archivos_por_contenido(storage, carpeta):
+            if nombre not in con_fila and storage.get_modified_time(nombre) < limite:
+                candidatos.add(nombre)
+
+        # Última verificación contra los reportes (bulk_create y SQL directo no cuentan referencias)
+        candidatos = sorted(candidatos)
+        usados = set()
+        for i in range(0, len(candidatos), 500):
+            usados.update(Reporte.objects.filter(imagen__in=candidatos[i:i + 500]).values_list("imagen", flat=True))
+        huerfanos = [n for n in candidatos if n not in usados]
+
+        liberados = 0
+        borrados = []
+        for nombre in huerfanos:
+            if not storage.exists(nombre):
+                borrados.append(nombre)
+                continue
+            # Una subida idéntica reciente renueva la fecha del archivo: se respeta
+            if storage.get_modified_time(nombre) >= limite:
+                continue
+            liberados += storage.size(nombre)
+            if not options["simular"]:
+                storage.delete(nombre)
+                self._borrar_variantes(nombre)
+            borrados.append(nombre)
+
+        if not options["simular"]:
+            ArchivoImagen.objects.filter(nombre__in=borrados, referencias__lte=0).delete()
+
+        verbo = "Se borrarían" if options["simular"] else "Borrados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verbo} {len(borrados)} archivo(s), {liberados / 2**20:.1f} MB."
+        ))
+
+    def _reconciliar(self):
+        reales = dict(
+            Reporte.objects.exclude(imagen="").exclude(imagen__isnull=True)
+            .values_list("imagen").annotate(n=Count("id")).values_list("imagen", "n")
+        )
+        with transaction.atomic():
+            ArchivoImagen.objects.exclude(nombre__in=list(reales)).update(referencias=0)
+            for nombre, n in reales.items():
+                ArchivoImagen.objects.update_or_create(nombre=nombre, defaults={"referencias": n})
+        self.stdout.write(f"Referencias recalculadas: {len(reales)} archivo(s) en uso.")
+
+    @staticmethod
+    def _archivos_por_contenido(storage, carpeta):
+        """<carpeta>/<ab>/<cd>/<sha256>.<ext>; ignora variantes y archivos antiguos."""
+        if not storage.exists(carpeta):
+            return
+        nivel1, _ = storage.listdir(carpeta)
+        for ab in nivel1:
+            if len(ab) != 2:
+                continue
+            nivel2, _ = storage.listdir(f"{carpeta}/{ab}")
+            for cd in nivel2:
+                _, archivos = storage.listdir(f"{carpeta}/{ab}/{cd}")
+                for archivo in archivos:
+                    nombre = f"{carpeta}/{ab}/{cd}/{archivo}"
+                    if es_nombre_por_contenido(nombre):
+                        yield nombre
+
+    @staticmethod
+    def _borrar_variantes(nombre):
+        for variante in imagenes.VARIANTES:
+            for formato in imagenes.FORMATOS:
+                default_storage.delete(imagenes.nombre_variante(nombre, variante, formato))
+        try:
+            os.rmdir(default_storage.path(os.path.dirname(imagenes.nombre_variante(nombre, "media", "jpg"))))
+        except (OSError, NotImplementedError):
+            pass
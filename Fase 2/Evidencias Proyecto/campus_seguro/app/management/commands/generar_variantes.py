@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from app import imagenes
+from app.models import Reporte
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las miniaturas y variantes medianas (WebP/JPEG) de las imágenes de "
+        "reportes que aún no las tienen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--todas", action="store_true", help="Regenera también las que ya existen.")
+        parser.add_argument("--procesos", type=int, default=None)
+
+    def handle(self, *args, **options):
+        reportes = Reporte.objects.exclude(imagen="")
+        if not options["todas"]:
+            reportes = reportes.exclude(imagen_variantes=F("imagen"))
+        # (id, nombre) es poco: se lista entero para no leer y escribir a la vez en la BD
+        pendientes = list(reportes.order_by("pk").values_list("pk", "imagen"))
+
+        total = len(pendientes)
+        self.stdout.write(f"{total} imagen(es) por procesar…")
+        listas = errores = 0
+        for reporte_id, error in imagenes.generar_lote(pendientes, options["procesos"]):
+            if error is None:
+                listas += 1
+            else:
+                errores += 1
+                self.stderr.write(f"  Reporte {reporte_id}: {error}")
+            if (listas + errores) % 100 == 0:
+                self.stdout.write(f"  {listas + errores}/{total}")
+
+        estilo = self.style.SUCCESS if not errores else self.style.WARNING
+        self.stdout.write(estilo(f"Variantes generadas: {listas}. Con error: {errores}."))
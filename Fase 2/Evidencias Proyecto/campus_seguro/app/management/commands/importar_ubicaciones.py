@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa edificios, pisos y salas desde un CSV con las columnas "
+        "edificio,piso,etiqueta,sala_codigo,sala_nombre. Crea lo que falta y actualiza "
+        "etiquetas, nombres y pisos de lo existente. Si alguna línea tiene errores no importa nada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del CSV (UTF-8).")
+        parser.add_argument("--simular", action="store_true", help="Valida y muestra el resumen sin escribir.")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            with open(options["archivo"], encoding="utf-8-sig", newline="") as archivo:
+                resultado = importacion.importar(archivo, guardar=not options["simular"])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+
+        for linea, mensaje in resultado["errores"]:
+            self.stderr.write(f"Línea {linea}: {mensaje}")
+        if resultado["errores"]:
+            raise CommandError(f"{len(resultado['errores'])} error(es); no se importó nada.")
+
+        verbo = "Se importarían" if options["simular"] else "Importado"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verbo}: {resultado['filas']} fila(s) en {time.perf_counter() - inicio:.2f} s — "
+            f"{resultado['edificios']} edificio(s) nuevo(s), "
+            f"{resultado['pisos_nuevos']} piso(s) nuevo(s) y {resultado['pisos_actualizados']} actualizado(s), "
+            f"{resultado['salas_nuevas']} sala(s) nueva(s) y {resultado['salas_actualizadas']} actualizada(s)."
+        ))
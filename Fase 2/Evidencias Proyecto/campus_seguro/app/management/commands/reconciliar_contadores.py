@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from app.models import ContadorEstado, Reporte
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la tabla ContadorEstado desde Reporte e informa las diferencias encontradas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--solo-verificar",
+            action="store_true",
+            help="Solo informa las diferencias, sin reescribir la tabla.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            esperado = self._contar_reportes()
+            actual = {
+                (c.ambito, c.asignado_a_id, c.estado): c.cantidad
+                for c in ContadorEstado.objects.select_for_update()
+            }
+
+            diferencias = [
+                (clave, actual.get(clave, 0), esperado.get(clave, 0))
+                for clave in sorted(set(esperado) | set(actual), key=str)
+                if actual.get(clave, 0) != esperado.get(clave, 0)
+            ]
+
+            for (ambito, asignado_id, estado), tenia, deberia in diferencias:
+                self.stdout.write(self.style.WARNING(
+                    f"Desfase {ambito}:{asignado_id or '-'} {estado}: tabla={tenia} real={deberia}"
+                ))
+
+            if not diferencias:
+                self.stdout.write(self.style.SUCCESS("Contadores al día, sin diferencias."))
+                return
+
+            if options["solo_verificar"]:
+                self.stdout.write(f"{len(diferencias)} diferencia(s) encontradas (no se modificó nada).")
+                return
+
+            ContadorEstado.objects.all().delete()
+            ContadorEstado.objects.bulk_create([
+                ContadorEstado(ambito=ambito, asignado_a_id=asignado_id, estado=estado, cantidad=n)
+                for (ambito, asignado_id, estado), n in esperado.items()
+            ])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Contadores reconstruidos: {len(diferencias)} diferencia(s) corregidas."
+        ))
+
+    def _contar_reportes(self):
+        cantidades = {}
+        for fila in Reporte.objects.order_by().values("asignado_a", "estado").annotate(n=Count("id")):
+            asignado_id, estado, n = fila["asignado_a"], fila["estado"], fila["n"]
+            ambito = "sin_asignar" if asignado_id is None else "mantenedor"
+            for clave in (("global", None, estado), (ambito, asignado_id, estado)):
+                cantidades[clave] = cantidades.get(clave, 0) + n
+        return cantidades
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app import busqueda
+
+
+class Command(BaseCommand):
+    help = "Repuebla desde cero el índice FTS5 de búsqueda de reportes."
+
+    def handle(self, *args, **options):
+        if not busqueda.disponible():
+            raise CommandError("El índice FTS5 solo existe en SQLite.")
+
+        with transaction.atomic():
+            total = busqueda.reconstruir_indice()
+
+        self.stdout.write(self.style.SUCCESS(f"Índice de búsqueda reconstruido: {total} reporte(s)."))
@@ -0,0 +1,305 @@
+import json
+import math
+import statistics
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import connection
+from django.db.backends.utils import CursorWrapper
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+
+from app import urls as app_urls
+from app.models import Categoria, Genero, Prioridad, Reporte, Rol, Sala, Usuario
+
+
+# ===========================================
+# Benchmark de vistas con presupuestos (bench_vistas)
+# ===========================================
+# Cada URL de app/urls.py tiene al menos un "caso": con qué rol se pide, cómo se
+# arman sus argumentos y, si es POST, con qué cuerpos (se alternan para que la
+# escritura deje los datos como estaban). Por caso se mide, con el cliente de
+# pruebas de Django:
+#   - tiempo de pared (p50 / p95 / máx. de N repeticiones, tras un calentamiento),
+#   - consultas SQL por petición,
+#   - filas leídas de la BD por petición (fetchone/fetchmany/fetchall/iteración).
+#
+# El presupuesto (presupuesto_vistas.json, versionado) fija para cada caso el máximo
+# de consultas, de filas y de p95 en ms, y el tamaño del campus sintético sobre el
+# que valen. Las consultas y filas son deterministas: cualquier aumento es una
+# regresión. La latencia depende de la máquina: el presupuesto deja margen y
+# --holgura-latencia lo escala. Una URL sin caso o un caso sin presupuesto también
+# cuentan como falla, para que nada nuevo quede sin medir.
+
+PRESUPUESTO = Path(__file__).with_name("presupuesto_vistas.json")
+
+
+def ruta_presupuesto():
+    """
+    Presupuesto del motor en uso: presupuesto_vistas.json para SQLite y
+    presupuesto_vistas_<motor>.json para los demás. Consultas y filas cambian con el
+    motor (BEGIN explícito de SQLite, FTS5 frente a trigramas, ...).
+    """
+    if connection.vendor == "sqlite":
+        return PRESUPUESTO
+    return PRESUPUESTO.with_name(f"presupuesto_vistas_{connection.vendor}.json")
+
+
+def _con_pk(nombre, clave):
+    return lambda ctx: reverse(nombre, args=[ctx[clave]])
+
+
+# nombre del caso → dict(url=nombre de la ruta, rol, ruta(ctx), metodo, query(ctx), cuerpos(ctx), estado, sesion_nueva)
+# rol None = anónimo. cuerpos: lista de dicts (form) o ("json", datos); se usan por turnos.
+CASOS = {
+    "login": dict(rol=None),
+    "login_alias": dict(rol=None),
+    "home": dict(rol=None),
+    "logout": dict(rol="usuario", estado=302, sesion_nueva=True),
+    "usuario_principal": dict(rol="usuario"),
+    "formulario-reporte": dict(rol="usuario"),
+    "mantenimiento": dict(rol="mantenimiento"),
+    "mantenimiento:filtros": dict(url="mantenimiento", rol="mantenimiento",
+                                  query=lambda ctx: {"estado": "en_proceso", "prioridad": "Alta"}),
+    "contadores-dashboard": dict(rol="mantenimiento"),
+    "actualizar_estado_reporte": dict(
+        rol="mantenimiento", metodo="POST",
+        cuerpos=lambda ctx: [{"reporte_id": ctx["reporte"], "nuevo_estado": e} for e in ("pausado", "en_proceso")],
+    ),
+    "actualizar_estados_reportes": dict(
+        rol="mantenimiento", metodo="POST",
+        cuerpos=lambda ctx: [("json", [{"reporte_id": ctx["reporte"], "nuevo_estado": e}]) for e in ("pausado", "en_proceso")],
+    ),
+    "eventos-dashboard": dict(rol="administracion", estado=204),
+    "ver_historial_reporte": dict(rol="mantenimiento", ruta=_con_pk("ver_historial_reporte", "reporte")),
+    "ver_historial_asignacion": dict(rol="administracion", ruta=_con_pk("ver_historial_asignacion", "reporte")),
+    "admin": dict(rol="administracion"),
+    "admin:busqueda": dict(url="admin", rol="administracion", query=lambda ctx: {"busqueda": "fuga agua"}),
+    "asignar-mantenedor": dict(
+        rol="administracion", metodo="POST", ruta=_con_pk("asignar-mantenedor", "reporte_asignable"),
+        cuerpos=lambda ctx: [{"asignado_a": m} for m in ctx["mantenedores"]],
+    ),
+    "asignar-mantenedor-masivo": dict(
+        rol="administracion", metodo="POST",
+        cuerpos=lambda ctx: [{"ids": ",".join(map(str, ctx["reportes_lote"])), "asignado_a": m} for m in ctx["mantenedores"]],
+    ),
+    "exportar-reportes": dict(rol="administracion", query=lambda ctx: {"formato": "csv", "estado": "pendiente"}),
+    "panel-admin": dict(rol="administracion"),
+    "panel-admin-ubicacion": dict(rol="administracion"),
+    "importar-ubicaciones": dict(rol="administracion"),
+    "panel-analitica": dict(rol="administracion"),
+    "perfiles": dict(rol="administracion"),
+    "api-ubicaciones": dict(rol="usuario"),
+    "cargar-pisos": dict(rol="usuario", query=lambda ctx: {"edificio_id": ctx["edificio"]}),
+    "cargar-salas": dict(rol="usuario", query=lambda ctx: {"piso_id": ctx["piso"]}),
+}
+
+# Mantenedores del panel: listado, alta, edición y confirmación de borrado (GET)
+for _modelo, _clave in [("genero", "genero"), ("categoria", "categoria"), ("prioridad", "prioridad"),
+                        ("rol", "rol"), ("edificio", "edificio"), ("piso", "piso"), ("sala", "sala"),
+                        ("reporte", "reporte"), ("usuario", "usuario")]:
+    CASOS[f"{_modelo}-list"] = dict(rol="administracion")
+    CASOS[f"{_modelo}-create"] = dict(rol="administracion")
+    CASOS[f"{_modelo}-update"] = dict(rol="administracion", ruta=_con_pk(f"{_modelo}-update", _clave))
+    CASOS[f"{_modelo}-delete"] = dict(rol="administracion", ruta=_con_pk(f"{_modelo}-delete", _clave))
+
+
+def nombres_de_rutas(patrones=None):
+    """Nombres de todas las rutas de app/urls.py (incluidas las de include())."""
+    nombres = []
+    for patron in app_urls.urlpatterns if patrones is None else patrones:
+        if isinstance(patron, URLResolver):
+            nombres += nombres_de_rutas(patron.url_patterns)
+        elif isinstance(patron, URLPattern) and patron.name:
+            nombres.append(patron.name)
+    return nombres
+
+
+def rutas_sin_caso():
+    cubiertas = {caso.get("url", nombre) for nombre, caso in CASOS.items()}
+    return [nombre for nombre in nombres_de_rutas() if nombre not in cubiertas]
+
+
+def contexto():
+    """Usuarios por rol e ids de ejemplo sobre los datos ya sembrados."""
+    # Un reporte en curso: su mantenedor es el de los casos de mantenimiento
+    reporte = Reporte.objects.filter(estado="en_proceso").order_by("id").first()
+    mant = reporte.asignado_a
+    mantenedores = list(
+        Usuario.objects.filter(nombre_rol="mantenimiento").exclude(pk=mant.pk).order_by("id").values_list("id", flat=True)[:2]
+    )
+    abiertos = list(
+        Reporte.objects.exclude(estado="completado").exclude(pk=reporte.pk).order_by("-id").values_list("id", flat=True)[:6]
+    )
+    sala = Sala.objects.order_by("id").first()
+    return {
+        "usuarios": {
+            "administracion": Usuario.objects.filter(nombre_rol="administracion").order_by("id").first(),
+            "mantenimiento": mant,
+            "usuario": Usuario.objects.filter(nombre_rol="usuario").order_by("id").first(),
+        },
+        "reporte": reporte.pk,
+        "reporte_asignable": abiertos[0],
+        "reportes_lote": abiertos[1:],
+        "mantenedores": mantenedores,
+        "usuario": Usuario.objects.filter(nombre_rol="usuario").order_by("-id").values_list("id", flat=True).first(),
+        "edificio": sala.edificio_id,
+        "piso": sala.piso_id,
+        "sala": sala.pk,
+        # Catálogos que el campus sintético no trae
+        "genero": Genero.objects.get_or_create(genero="Otro")[0].pk,
+        "categoria": Categoria.objects.get_or_create(nombre="Infraestructura")[0].pk,
+        "prioridad": Prioridad.objects.get_or_create(nivel="Alta")[0].pk,
+        "rol": Rol.objects.get_or_create(nombre_rol="mantenimiento")[0].pk,
+    }
+
+
+@contextmanager
+def contar_filas():
+    """Cuenta las filas que devuelven los cursores de Django mientras dura el bloque."""
+    contador = {"filas": 0}
+    originales = {nombre: CursorWrapper.__dict__.get(nombre) for nombre in ("fetchone", "fetchmany", "fetchall", "__iter__")}
+
+    def fetchone(self):
+        fila = self.cursor.fetchone()
+        contador["filas"] += fila is not None
+        return fila
+
+    def fetchmany(self, *args, **kwargs):
+        filas = self.cursor.fetchmany(*args, **kwargs)
+        contador["filas"] += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self.cursor.fetchall()
+        contador["filas"] += len(filas)
+        return filas
+
+    def iterar(self):
+        with self.db.wrap_database_errors:
+            for fila in self.cursor:
+                contador["filas"] += 1
+                yield fila
+
+    CursorWrapper.fetchone, CursorWrapper.fetchmany, CursorWrapper.fetchall = fetchone, fetchmany, fetchall
+    CursorWrapper.__iter__ = iterar
+    try:
+        yield contador
+    finally:
+        for nombre, original in originales.items():
+            if original is None:
+                delattr(CursorWrapper, nombre)
+            else:
+                setattr(CursorWrapper, nombre, original)
+
+
+def _percentil(ordenados, p):
+    return ordenados[max(math.ceil(p * len(ordenados)) - 1, 0)]
+
+
+def _peticion(cliente, caso, ruta, query, cuerpo):
+    if caso.get("metodo", "GET") == "GET":
+        response = cliente.get(ruta, query)
+    elif isinstance(cuerpo, tuple):
+        response = cliente.post(ruta, json.dumps(cuerpo[1]), content_type="application/json")
+    else:
+        response = cliente.post(ruta, cuerpo)
+    # Las respuestas en streaming se generan al consumirlas: cuentan en la medición
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
+
+
+def medir(ctx, casos=None, repeticiones=20, calentamiento=2):
+    """Mide cada caso. Devuelve {caso: {ruta, estado, p50_ms, p95_ms, max_ms, consultas, filas}}."""
+    clientes = {}
+
+    def cliente_para(caso):
+        # Los casos que cierran la sesión tienen su propio cliente
+        clave = (caso.get("rol"), bool(caso.get("sesion_nueva")))
+        if clave not in clientes:
+            cliente = Client()
+            if clave[0]:
+                cliente.force_login(ctx["usuarios"][clave[0]])
+            clientes[clave] = cliente
+        return clientes[clave]
+
+    resultados = {}
+    for nombre in casos or CASOS:
+        caso = CASOS[nombre]
+        url = caso.get("url", nombre)
+        ruta = caso["ruta"](ctx) if "ruta" in caso else reverse(url)
+        query = caso["query"](ctx) if "query" in caso else {}
+        cuerpos = caso["cuerpos"](ctx) if "cuerpos" in caso else [None]
+
+        tiempos, consultas, filas, estados = [], [], [], set()
+        for i in range(calentamiento + repeticiones):
+            cliente = cliente_para(caso)
+            if caso.get("sesion_nueva"):
+                # La vista cierra la sesión: una nueva en cada vuelta, fuera de la medición
+                cliente.force_login(ctx["usuarios"][caso["rol"]])
+            with CaptureQueriesContext(connection) as capturadas, contar_filas() as contador:
+                inicio = time.perf_counter()
+                response = _peticion(cliente, caso, ruta, query, cuerpos[i % len(cuerpos)])
+                transcurrido = time.perf_counter() - inicio
+            if i < calentamiento:
+                continue
+            tiempos.append(transcurrido * 1000)
+            consultas.append(len(capturadas))
+            filas.append(contador["filas"])
+            estados.add(response.status_code)
+
+        tiempos.sort()
+        resultados[nombre] = {
+            "ruta": ruta,
+            "estado": sorted(estados),
+            "estado_esperado": caso.get("estado", 200),
+            "p50_ms": round(statistics.median(tiempos), 2),
+            "p95_ms": round(_percentil(tiempos, 0.95), 2),
+            "max_ms": round(tiempos[-1], 2),
+            "consultas": max(consultas),
+            "filas": max(filas),
+        }
+    return resultados
+
+
+def cargar_presupuesto(ruta=None):
+    with open(ruta or ruta_presupuesto(), encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def comparar(resultados, presupuesto, holgura_latencia=1.0):
+    """Lista de (caso, motivo) con cada presupuesto excedido; vacía si todo está en regla."""
+    fallas = [(nombre, "la ruta no tiene caso en app/medicion_vistas.py") for nombre in rutas_sin_caso()]
+    limites = presupuesto.get("vistas", {})
+    for nombre, medido in resultados.items():
+        if medido["estado"] != [medido["estado_esperado"]]:
+            fallas.append((nombre, f"respondió {medido['estado']} (se esperaba {medido['estado_esperado']})"))
+        limite = limites.get(nombre)
+        if limite is None:
+            fallas.append((nombre, "sin presupuesto"))
+            continue
+        for clave in ("consultas", "filas"):
+            if clave in limite and medido[clave] > limite[clave]:
+                fallas.append((nombre, f"{medido[clave]} {clave} (presupuesto {limite[clave]})"))
+        if "p95_ms" in limite and medido["p95_ms"] > limite["p95_ms"] * holgura_latencia:
+            fallas.append((nombre, f"p95 {medido['p95_ms']:.1f} ms (presupuesto {limite['p95_ms'] * holgura_latencia:.0f} ms)"))
+    return fallas
+
+
+def presupuesto_desde(resultados, dataset):
+    """Presupuesto nuevo a partir de una medición: consultas y filas exactas, latencia con margen."""
+    return {
+        "dataset": dataset,
+        "vistas": {
+            nombre: {
+                "consultas": medido["consultas"],
+                "filas": medido["filas"],
+                # 3x el p95 medido (mínimo +25 ms): solo atrapa regresiones grandes
+                "p95_ms": math.ceil(max(medido["p95_ms"] * 3, medido["p95_ms"] + 25)),
+            }
+            for nombre, medido in sorted(resultados.items())
+        },
+    }
@@ -0,0 +1,103 @@
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+
+from app import perfilador, tiempos
+from app.usuario_cache import aobtener_usuario, obtener_usuario
+
+
+# ===========================================
+# Middleware de la app
+# ===========================================
+class UsuarioCacheadoMiddleware(AuthenticationMiddleware):
+    """
+    Reemplaza a django.contrib.auth.middleware.AuthenticationMiddleware: request.user
+    y request.auser() (vistas async) salen de la foto en caché (app.usuario_cache) y
+    no de una consulta a Usuario.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: obtener_usuario(request))
+        request.auser = partial(_auser, request)
+
+
+async def _auser(request):
+    if not hasattr(request, "_acached_user"):
+        request._acached_user = await aobtener_usuario(request)
+    return request._acached_user
+
+
+class TiemposMiddleware:
+    """
+    Mide SQL, plantillas y tiempo total de cada petición (app.tiempos): cabecera
+    Server-Timing y log de peticiones lentas. Va primero en MIDDLEWARE para cubrir
+    también las consultas de sesión y autenticación. Sync y async: no agrega un
+    cambio de hilo a las vistas async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # La conexión de este hilo pudo abrirse antes de importar app.tiempos
+        tiempos.instalar(connection)
+        medicion, token = tiempos.iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            tiempos.terminar(token)
+        tiempos.reportar(request, response, medicion)
+        return response
+
+    async def __acall__(self, request):
+        medicion, token = tiempos.iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            tiempos.terminar(token)
+        tiempos.reportar(request, response, medicion)
+        return response
+
+
+class PerfiladorMiddleware:
+    """
+    Perfila la vista (cProfile + tracemalloc, app.perfilador) cuando la petición trae
+    su propia firma de administrador. Va último en MIDDLEWARE: su process_view corre después
+    del de CsrfViewMiddleware y es el que termina llamando a la vista.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django adapta process_view según sea corrutina o no: así no cambia de hilo
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        firma = perfilador.firma_de(request)
+        if firma is None or iscoroutinefunction(view_func):
+            return None
+        return perfilador.perfilar(request, firma, view_func, view_args, view_kwargs)
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        firma = perfilador.firma_de(request)
+        if firma is None or iscoroutinefunction(view_func):
+            return None
+        return await sync_to_async(perfilador.perfilar)(request, firma, view_func, view_args, view_kwargs)
@@ -0,0 +1,14 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_historialestado'),
+        ('app', '0005_remove_reporte_ubicacion_reporte_sala'),
+    ]
+
+    operations = [
+    ]
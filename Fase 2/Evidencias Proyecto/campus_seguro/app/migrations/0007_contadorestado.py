@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def poblar_contadores(apps, schema_editor):
+    Reporte = apps.get_model('app', 'Reporte')
+    ContadorEstado = apps.get_model('app', 'ContadorEstado')
+
+    cantidades = {}
+    for fila in Reporte.objects.values('asignado_a', 'estado').annotate(n=models.Count('id')):
+        asignado_id, estado, n = fila['asignado_a'], fila['estado'], fila['n']
+        ambito = 'sin_asignar' if asignado_id is None else 'mantenedor'
+        for clave in (('global', None, estado), (ambito, asignado_id, estado)):
+            cantidades[clave] = cantidades.get(clave, 0) + n
+
+    ContadorEstado.objects.bulk_create([
+        ContadorEstado(ambito=ambito, asignado_a_id=asignado_id, estado=estado, cantidad=n)
+        for (ambito, asignado_id, estado), n in cantidades.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_merge_20261018_0419'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ambito', models.CharField(choices=[('global', 'Global'), ('sin_asignar', 'Sin asignar'), ('mantenedor', 'Mantenedor')], max_length=12)),
+                ('estado', models.CharField(max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('asignado_a', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contadores_estado', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Contador de Estado',
+                'verbose_name_plural': 'Contadores de Estado',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('asignado_a__isnull', False)), fields=('asignado_a', 'estado'), name='contador_unico_por_mantenedor'), models.UniqueConstraint(condition=models.Q(('asignado_a__isnull', True)), fields=('ambito', 'estado'), name='contador_unico_por_ambito')],
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
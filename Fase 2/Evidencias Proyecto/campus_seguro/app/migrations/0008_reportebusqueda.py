@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:05
+
+import app.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def crear_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS app_reporte_fts USING fts5("
+        "titulo, descripcion, categoria, ubicacion, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO app_reporte_fts (rowid, titulo, descripcion, categoria, ubicacion) "
+        "SELECT r.id, r.titulo, r.descripcion, r.categoria, "
+        "TRIM(COALESCE(s.codigo, '') || ' ' || COALESCE(s.nombre, '') || ' ' || "
+        "COALESCE(e.nombre, '') || ' ' || COALESCE(e.codigo, '')) "
+        "FROM app_reporte r "
+        "LEFT JOIN app_sala s ON s.id = r.sala_id "
+        "LEFT JOIN app_edificio e ON e.id = s.edificio_id"
+    )
+
+
+def eliminar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS app_reporte_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_contadorestado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteBusqueda',
+            fields=[
+                ('reporte', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='app.reporte')),
+                ('indice', app.models.IndiceFTSField(db_column='app_reporte_fts')),
+                ('rank', models.FloatField()),
+                ('titulo', models.TextField()),
+                ('descripcion', models.TextField()),
+                ('categoria', models.TextField()),
+                ('ubicacion', models.TextField()),
+            ],
+            options={
+                'db_table': 'app_reporte_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(crear_indice_fts, eliminar_indice_fts),
+    ]
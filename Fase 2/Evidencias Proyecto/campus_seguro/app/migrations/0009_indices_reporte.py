@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_reportebusqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historialestado',
+            index=models.Index(fields=['reporte', 'fecha_cambio'], name='historial_reporte_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['created'], name='reporte_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['usuario', 'created'], name='reporte_usuario_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['asignado_a', 'created'], name='reporte_asignado_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['asignado_a', 'estado', 'created'], name='reporte_asig_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['estado', 'created'], name='reporte_estado_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['prioridad', 'created'], name='reporte_prioridad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['prioridad', 'created'], name='reporte_pendiente_prio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(condition=models.Q(('estado', 'en_proceso')), fields=['prioridad', 'created'], name='reporte_en_proceso_prio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(condition=models.Q(('estado', 'pausado')), fields=['prioridad', 'created'], name='reporte_pausado_prio_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_indices_reporte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporte',
+            name='imagen_variantes',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+    ]
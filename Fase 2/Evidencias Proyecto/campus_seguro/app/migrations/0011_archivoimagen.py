@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:40
+
+import app.almacenamiento
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def contar_referencias(apps, schema_editor):
+    Reporte = apps.get_model('app', 'Reporte')
+    ArchivoImagen = apps.get_model('app', 'ArchivoImagen')
+    filas = (
+        Reporte.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        .values('imagen').annotate(n=Count('id'))
+    )
+    ArchivoImagen.objects.bulk_create([
+        ArchivoImagen(nombre=f['imagen'], referencias=f['n']) for f in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_reporte_imagen_variantes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoImagen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('referencias', models.IntegerField(default=0)),
+                ('actualizado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Archivo de Imagen',
+                'verbose_name_plural': 'Archivos de Imagen',
+                'indexes': [models.Index(fields=['referencias', 'actualizado'], name='archivo_imagen_huerfano_idx')],
+            },
+        ),
+        # Solo cambia el storage (no toca la columna): se conserva null/blank de 0001
+        migrations.AlterField(
+            model_name='reporte',
+            name='imagen',
+            field=models.ImageField(blank=True, null=True, storage=app.almacenamiento.storage_imagenes, upload_to='reportes/'),
+        ),
+        migrations.RunPython(contar_referencias, migrations.RunPython.noop),
+    ]
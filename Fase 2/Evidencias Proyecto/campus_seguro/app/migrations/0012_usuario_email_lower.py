@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:10
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_archivoimagen'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='usuario',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='usuario_email_lower_uniq'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_usuario_email_lower'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historialestado',
+            index=models.Index(condition=models.Q(('estado_nuevo', 'completado')), fields=['fecha_cambio'], name='historial_completado_idx'),
+        ),
+        migrations.CreateModel(
+            name='MarcaResumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('dia_pendiente', models.DateField()),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('categoria', models.CharField(max_length=100)),
+                ('prioridad', models.CharField(max_length=100)),
+                ('creados', models.IntegerField(default=0)),
+                ('completados', models.IntegerField(default=0)),
+                ('backlog', models.IntegerField(default=0)),
+                ('resolucion_p50', models.FloatField(blank=True, null=True)),
+                ('resolucion_p90', models.FloatField(blank=True, null=True)),
+                ('resolucion_hist', models.JSONField(blank=True, default=list)),
+                ('edificio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.edificio')),
+                ('mantenedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario',
+                'verbose_name_plural': 'Resúmenes Diarios',
+                'indexes': [models.Index(fields=['dia'], name='resumen_diario_dia_idx')],
+            },
+        ),
+    ]
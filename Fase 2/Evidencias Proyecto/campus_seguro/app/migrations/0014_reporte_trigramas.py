@@ -0,0 +1,39 @@
+# Índices de trigramas (pg_trgm) para la búsqueda de reportes en PostgreSQL.
+# En SQLite la búsqueda usa FTS5 (0008_reportebusqueda) y esta migración no hace nada.
+
+from django.db import migrations
+
+
+INDICES = {
+    'reporte_titulo_trgm_idx': 'titulo',
+    'reporte_descripcion_trgm_idx': 'descripcion',
+}
+
+
+def crear_indices_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # pg_trgm es "trusted" desde PostgreSQL 13: basta con ser dueño de la base
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for nombre, columna in INDICES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {nombre} ON app_reporte USING gin ({columna} gin_trgm_ops)"
+        )
+
+
+def eliminar_indices_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre in INDICES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {nombre}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_resumenes_analitica'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_trigramas, eliminar_indices_trigramas),
+    ]
@@ -0,0 +1,54 @@
+# Los índices de 0014 eran sobre las columnas tal cual, pero Django compila
+# titulo__icontains en PostgreSQL como UPPER("titulo"::text) LIKE UPPER(%s): el
+# planificador solo usa un índice de expresión con esa misma forma.
+# En SQLite esta migración no hace nada.
+
+from django.db import migrations
+
+
+ANTERIORES = {
+    'reporte_titulo_trgm_idx': 'titulo',
+    'reporte_descripcion_trgm_idx': 'descripcion',
+}
+
+INDICES = {
+    'reporte_titulo_upper_trgm_idx': 'titulo',
+    'reporte_descripcion_upper_trgm_idx': 'descripcion',
+}
+
+
+def _crear(schema_editor, indices, expresion):
+    for nombre, columna in indices.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {nombre} ON app_reporte USING gin ({expresion.format(columna)} gin_trgm_ops)"
+        )
+
+
+def _eliminar(schema_editor, indices):
+    for nombre in indices:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {nombre}")
+
+
+def indices_upper(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _eliminar(schema_editor, ANTERIORES)
+    _crear(schema_editor, INDICES, "(UPPER({}::text))")
+
+
+def indices_columna(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _eliminar(schema_editor, INDICES)
+    _crear(schema_editor, ANTERIORES, "{}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_reporte_trigramas'),
+    ]
+
+    operations = [
+        migrations.RunPython(indices_upper, indices_columna),
+    ]
@@ -0,0 +1,34 @@
+# La búsqueda de PostgreSQL (busqueda.buscar_trigramas) también compara cada palabra
+# con la categoría, como FTS5 y el camino LIKE. Mismo índice de expresión que 0015,
+# para que el OR de columnas siga siendo un BitmapOr de índices.
+# En SQLite esta migración no hace nada.
+
+from django.db import migrations
+
+
+INDICE = 'reporte_categoria_upper_trgm_idx'
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDICE} ON app_reporte USING gin ((UPPER(categoria::text)) gin_trgm_ops)"
+    )
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDICE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_reporte_trigramas_upper'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
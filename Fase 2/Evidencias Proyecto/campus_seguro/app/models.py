@@ -1,7 +1,13 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Lookup, Q, Value, When
+from django.db.models.functions import Lower
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from app.almacenamiento import storage_imagenes
+from app.imagenes import nombre_variante
 from django.core.exceptions import ValidationError
 
 
@@ -28,6 +34,11 @@ class HistorialEstado(models.Model):
         ordering = ['-fecha_cambio']
         verbose_name = "Historial de Estado"
         verbose_name_plural = "Historiales de Estado"
+        indexes = [
+            models.Index(fields=['reporte', 'fecha_cambio'], name='historial_reporte_fecha_idx'),
+            # Completados por día (app.analitica) sin recorrer todo el historial
+            models.Index(fields=['fecha_cambio'], condition=Q(estado_nuevo='completado'), name='historial_completado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.reporte.titulo} - {self.estado_anterior} → {self.estado_nuevo}"
@@ -38,7 +49,9 @@ class Reporte(models.Model):
     categoria = models.CharField(max_length=100)
     prioridad = models.CharField(max_length=100)
     descripcion = models.TextField()
-    imagen = models.ImageField(upload_to='reportes/')
+    imagen = models.ImageField(upload_to='reportes/', storage=storage_imagenes)
+    # Nombre del original para el que ya existen miniaturas (ver app/imagenes.py)
+    imagen_variantes = models.CharField(max_length=100, blank=True, default='', editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
@@ -81,29 +94,184 @@ class Reporte(models.Model):
         related_name='reportes'
     )
 
+    # Estados que siguen en la cola de trabajo (índices parciales más abajo)
+    ESTADOS_ABIERTOS = ('pendiente', 'en_proceso', 'pausado')
+
+    class Meta:
+        # Un índice por cada acceso caliente de las vistas; todos terminan en created
+        # (+ rowid implícito = id) para que la paginación por cursor no ordene en memoria.
+        indexes = [
+            models.Index(fields=['created'], name='reporte_created_idx'),
+            models.Index(fields=['usuario', 'created'], name='reporte_usuario_created_idx'),
+            models.Index(fields=['asignado_a', 'created'], name='reporte_asignado_created_idx'),
+            models.Index(fields=['asignado_a', 'estado', 'created'], name='reporte_asig_estado_idx'),
+            models.Index(fields=['estado', 'created'], name='reporte_estado_created_idx'),
+            models.Index(fields=['prioridad', 'created'], name='reporte_prioridad_idx'),
+            # estado + prioridad solo para la cola abierta: los completados son la mayoría
+            # de la tabla y con (estado, created) basta para filtrarlos por prioridad.
+            models.Index(fields=['prioridad', 'created'], condition=Q(estado='pendiente'), name='reporte_pendiente_prio_idx'),
+            models.Index(fields=['prioridad', 'created'], condition=Q(estado='en_proceso'), name='reporte_en_proceso_prio_idx'),
+            models.Index(fields=['prioridad', 'created'], condition=Q(estado='pausado'), name='reporte_pausado_prio_idx'),
+        ]
+
+    # ===========================================
+    # Estado cargado: (asignado_a_id, estado) tal como vino de la BD
+    # ===========================================
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._recordar_estado_cargado()
+        return instancia
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._recordar_estado_cargado()
+
+    def _recordar_estado_cargado(self):
+        # Si alguno de los campos vino diferido no sabemos el valor original
+        if 'estado' in self.__dict__ and 'asignado_a_id' in self.__dict__:
+            self._cargado = (self.asignado_a_id, self.estado)
+        else:
+            self._cargado = None
+        self._imagen_cargada = (self.imagen.name or '') if 'imagen' in self.__dict__ else None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # 🚫 Guardia de reporte completado en el mismo UPDATE (… AND estado <> 'completado'),
+        # así no depende de un SELECT previo ni de que el estado cargado siga vigente.
+        escritos = {campo.attname for campo, _, _ in values}
+        protegido = False
+        if 'estado' in escritos and self.estado != 'completado':
+            base_qs = base_qs.exclude(estado='completado')
+            protegido = True
+        elif 'asignado_a_id' in escritos:
+            base_qs = base_qs.exclude(Q(estado='completado') & ~Q(asignado_a_id=self.asignado_a_id))
+            protegido = True
+
+        actualizado = super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if not actualizado and protegido and type(self)._base_manager.using(using).filter(pk=pk_val).exists():
+            raise ValidationError("Reporte completado: no se pueden modificar estado ni mantenedor.")
+        return actualizado
+
     def save(self, *args, **kwargs):
-        # Verificamos si es una actualización (no un objeto nuevo)
-        if self.pk:
-            original = type(self).objects.only('estado', 'asignado_a').get(pk=self.pk)
-            if original.estado == 'completado':
-                if (self.estado != original.estado) or (self.asignado_a_id != original.asignado_a_id):
-                    raise ValidationError("Reporte completado: no se pueden modificar estado ni mantenedor.")
-            
+        update_fields = kwargs.get('update_fields')
+        escribe_imagen = update_fields is None or 'imagen' in update_fields
+        with transaction.atomic():
+            anterior = None
+            imagen_anterior = ''
+            # Verificamos si es una actualización (no un objeto nuevo)
+            if not self._state.adding and self.pk:
+                anterior = getattr(self, '_cargado', None)
+                imagen_anterior = getattr(self, '_imagen_cargada', None)
+                if anterior is None or (escribe_imagen and imagen_anterior is None):
+                    # Instancia armada a mano o con campos diferidos: no hay estado cargado
+                    original = type(self).objects.only('estado', 'asignado_a', 'imagen').get(pk=self.pk)
+                    anterior = anterior or (original.asignado_a_id, original.estado)
+                    imagen_anterior = original.imagen.name or ''
+
+                if anterior[1] == 'completado':
+                    if (self.estado != anterior[1]) or (self.asignado_a_id != anterior[0]):
+                        raise ValidationError("Reporte completado: no se pueden modificar estado ni mantenedor.")
+
+            # Lo leen los signals de post_save (eventos en vivo)
+            self._estado_previo = anterior
+            super().save(*args, **kwargs)
+
+            nuevo = self.estado_escrito(anterior, update_fields)
+
             # 👇 NUEVO: Solo creamos un registro en el historial si el estado ha cambiado
-            if self.estado != original.estado:
+            if anterior is not None and nuevo[1] != anterior[1]:
                 HistorialEstado.objects.create(
                     reporte=self,
-                    estado_anterior=original.estado,
-                    estado_nuevo=self.estado,
-                    cambiado_por=self.asignado_a  # O podrías usar el usuario que realiza la acción desde la vista
+                    estado_anterior=anterior[1],
+                    estado_nuevo=nuevo[1],
+                    cambiado_por_id=self.asignado_a_id  # O podrías usar el usuario que realiza la acción desde la vista
                 )
-        
-        super().save(*args, **kwargs)
+
+            # 👇 Contadores materializados
+            ContadorEstado.objects.registrar_cambio(anterior, nuevo)
+            self._cargado = nuevo
+
+            # 👇 Referencias al archivo de imagen (almacenamiento por contenido)
+            if escribe_imagen:
+                ArchivoImagen.objects.cambiar_referencia(imagen_anterior, self.imagen.name or '')
+                self._imagen_cargada = self.imagen.name or ''
+
+    def estado_escrito(self, anterior, update_fields):
+        """(asignado_a_id, estado) que quedó en la BD: solo cuenta lo que realmente se escribió."""
+        nuevo = (self.asignado_a_id, self.estado)
+        if anterior is not None and update_fields is not None:
+            nuevo = (
+                nuevo[0] if 'asignado_a' in update_fields else anterior[0],
+                nuevo[1] if 'estado' in update_fields else anterior[1],
+            )
+        return nuevo
+
+    # ===========================================
+    # Variantes de la imagen (miniatura / media)
+    # ===========================================
+    @property
+    def variantes_listas(self):
+        return bool(self.imagen) and self.imagen_variantes == self.imagen.name
+
+    def url_variante(self, variante, formato='jpg'):
+        """URL de la variante, o la del original mientras no se haya generado."""
+        if not self.variantes_listas:
+            return self.imagen.url
+        return default_storage.url(nombre_variante(self.imagen.name, variante, formato))
+
+    @property
+    def imagen_miniatura_url(self):
+        return self.url_variante('miniatura')
+
+    @property
+    def imagen_media_url(self):
+        return self.url_variante('media')
 
     def __str__(self):
         return self.titulo
 
 
+# ===========================================
+# Índice de búsqueda FTS5 (tabla virtual app_reporte_fts, solo SQLite)
+# ===========================================
+class IndiceFTSField(models.TextField):
+    """Columna oculta con el nombre de la tabla FTS5: es la que recibe el MATCH."""
+
+
+@IndiceFTSField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class ReporteBusqueda(models.Model):
+    """
+    Fila del índice FTS5 de un reporte (rowid = id del reporte).
+    La tabla la crea la migración 0008 y la mantienen las señales de app/signals.py.
+    """
+    reporte = models.OneToOneField(
+        Reporte,
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='busqueda'
+    )
+    indice = IndiceFTSField(db_column='app_reporte_fts')
+    rank = models.FloatField()
+    titulo = models.TextField()
+    descripcion = models.TextField()
+    categoria = models.TextField()
+    ubicacion = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'app_reporte_fts'
+
+
 class HistorialAsignacion(models.Model):
     reporte = models.ForeignKey('Reporte', on_delete=models.CASCADE, related_name='historial_asignaciones')
 
@@ -149,6 +317,244 @@ class HistorialAsignacion(models.Model):
         return f"[{self.creado_en:%Y-%m-%d %H:%M}] {self.reporte_id}: {de} → {a}"
 
 
+# ===========================================
+# Contadores materializados por (asignado_a, estado)
+# ===========================================
+class ContadorEstadoManager(models.Manager):
+    # estado → clave que usan los dashboards y el JSON de contadores
+    CLAVES = {
+        'pendiente': 'pendientes',
+        'en_proceso': 'en_proceso',
+        'pausado': 'pausados',
+        'completado': 'completados',
+    }
+
+    @staticmethod
+    def _ambito(asignado_id):
+        if asignado_id is None:
+            return {'ambito': 'sin_asignar', 'asignado_a_id': None}
+        return {'ambito': 'mantenedor', 'asignado_a_id': asignado_id}
+
+    def registrar_cambio(self, anterior, nuevo):
+        """
+        Aplica el paso de un reporte de `anterior` a `nuevo`, ambos tuplas
+        (asignado_a_id, estado) o None si el reporte no existía / se eliminó.
+        Debe llamarse dentro de la misma transacción que escribe el reporte.
+        """
+        self.registrar_cambios([(anterior, nuevo)])
+
+    def registrar_cambios(self, cambios):
+        """Como registrar_cambio, para una lista de pares (anterior, nuevo) en un solo UPDATE."""
+        deltas = {}
+        for anterior, nuevo in cambios:
+            for par, signo in ((anterior, -1), (nuevo, 1)):
+                if par is None:
+                    continue
+                asignado_id, estado = par
+                for clave in (('global', None, estado), (*self._ambito(asignado_id).values(), estado)):
+                    deltas[clave] = deltas.get(clave, 0) + signo
+
+        deltas = {clave: delta for clave, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        # Un solo UPDATE … SET cantidad = cantidad + CASE … para todas las filas afectadas
+        filas = Q()
+        casos = []
+        for (ambito, asignado_id, estado), delta in deltas.items():
+            fila = Q(ambito=ambito, asignado_a_id=asignado_id, estado=estado)
+            filas |= fila
+            casos.append(When(fila, then=Value(delta)))
+        actualizados = self.filter(filas).update(cantidad=F('cantidad') + Case(*casos, default=Value(0)))
+
+        # Primera vez que aparece una combinación: se crea su fila
+        if actualizados < len(deltas):
+            existentes = set(self.filter(filas).values_list('ambito', 'asignado_a_id', 'estado'))
+            for (ambito, asignado_id, estado), delta in deltas.items():
+                if (ambito, asignado_id, estado) not in existentes and delta > 0:
+                    self.create(ambito=ambito, asignado_a_id=asignado_id, estado=estado, cantidad=delta)
+
+    def _ajustar(self, ambito, asignado_id, estado, delta):
+        filtro = {'ambito': ambito, 'asignado_a_id': asignado_id, 'estado': estado}
+        actualizados = self.filter(**filtro).update(cantidad=F('cantidad') + delta)
+        # Los decrementos nunca crean filas (p. ej. el mantenedor ya fue eliminado)
+        if not actualizados and delta > 0:
+            self.create(cantidad=delta, **filtro)
+
+    def traspasar_a_sin_asignar(self, asignado_id):
+        """Mueve los contadores de un mantenedor a 'sin_asignar' (p. ej. al eliminarlo)."""
+        for estado, cantidad in self.filter(ambito='mantenedor', asignado_a_id=asignado_id).values_list('estado', 'cantidad'):
+            if cantidad:
+                self._ajustar('sin_asignar', None, estado, cantidad)
+        self.filter(ambito='mantenedor', asignado_a_id=asignado_id).delete()
+
+    def resumen(self, mantenedor=None):
+        """
+        Devuelve {'total', 'pendientes', 'en_proceso', 'pausados', 'completados'}
+        con una sola consulta: global si `mantenedor` es None, o del mantenedor indicado.
+        """
+        return self._sumar(self._filas_resumen(mantenedor))
+
+    async def aresumen(self, mantenedor=None):
+        """resumen() para vistas async: la misma consulta, iterada con el ORM async."""
+        return self._sumar([fila async for fila in self._filas_resumen(mantenedor)])
+
+    def _filas_resumen(self, mantenedor):
+        if mantenedor is None:
+            filas = self.filter(ambito='global', asignado_a__isnull=True)
+        else:
+            filas = self.filter(asignado_a=mantenedor)
+        return filas.values_list('estado', 'cantidad')
+
+    def _sumar(self, filas):
+        contadores = {'total': 0, **{clave: 0 for clave in self.CLAVES.values()}}
+        for estado, cantidad in filas:
+            if estado in self.CLAVES:
+                contadores[self.CLAVES[estado]] = cantidad
+            contadores['total'] += cantidad
+        return contadores
+
+
+class ContadorEstado(models.Model):
+    """
+    Cantidad de reportes por (asignado_a, estado), más una fila global por estado.
+    La mantienen Reporte.save y las señales de borrado; `reconciliar_contadores` la reconstruye.
+    """
+    AMBITO_CHOICES = [
+        ('global', 'Global'),
+        ('sin_asignar', 'Sin asignar'),
+        ('mantenedor', 'Mantenedor'),
+    ]
+
+    ambito = models.CharField(max_length=12, choices=AMBITO_CHOICES)
+    asignado_a = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='contadores_estado'
+    )
+    estado = models.CharField(max_length=20)
+    cantidad = models.IntegerField(default=0)
+
+    objects = ContadorEstadoManager()
+
+    class Meta:
+        verbose_name = "Contador de Estado"
+        verbose_name_plural = "Contadores de Estado"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['asignado_a', 'estado'],
+                condition=Q(asignado_a__isnull=False),
+                name='contador_unico_por_mantenedor',
+            ),
+            models.UniqueConstraint(
+                fields=['ambito', 'estado'],
+                condition=Q(asignado_a__isnull=True),
+                name='contador_unico_por_ambito',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.ambito}:{self.asignado_a_id or '-'} {self.estado} = {self.cantidad}"
+
+
+# ===========================================
+# Referencias a los archivos de imagen
+# ===========================================
+class ArchivoImagenManager(models.Manager):
+
+    def cambiar_referencia(self, anterior, nuevo):
+        """Un reporte dejó de apuntar a `anterior` y ahora apunta a `nuevo` ('' = sin imagen)."""
+        if anterior == nuevo:
+            return
+        ahora = timezone.now()
+        if anterior:
+            self.filter(nombre=anterior).update(referencias=F('referencias') - 1, actualizado=ahora)
+        if nuevo:
+            if self.filter(nombre=nuevo).update(referencias=F('referencias') + 1, actualizado=ahora):
+                return
+            try:
+                with transaction.atomic():
+                    self.create(nombre=nuevo, referencias=1)
+            except IntegrityError:
+                # Otra subida de la misma foto creó la fila entremedio
+                self.filter(nombre=nuevo).update(referencias=F('referencias') + 1, actualizado=ahora)
+
+
+class ArchivoImagen(models.Model):
+    """
+    Cuántos reportes apuntan a cada archivo de imagen. Con el almacenamiento por
+    contenido una misma foto puede ser de varios reportes; `gc_imagenes` borra
+    los archivos que quedan en 0.
+    """
+    nombre = models.CharField(max_length=100, unique=True)
+    referencias = models.IntegerField(default=0)
+    actualizado = models.DateTimeField(default=timezone.now)
+
+    objects = ArchivoImagenManager()
+
+    class Meta:
+        verbose_name = "Archivo de Imagen"
+        verbose_name_plural = "Archivos de Imagen"
+        indexes = [
+            models.Index(fields=['referencias', 'actualizado'], name='archivo_imagen_huerfano_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias})"
+
+
+# ===========================================
+# Resúmenes diarios para la analítica
+# ===========================================
+class ResumenDiario(models.Model):
+    """
+    Una fila por día × edificio × categoría × prioridad × mantenedor con lo que pasó ese
+    día. La escribe app.analitica (comando `actualizar_resumenes`); la página de
+    analítica solo lee esta tabla.
+    """
+    dia = models.DateField()
+    edificio = models.ForeignKey('Edificio', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    categoria = models.CharField(max_length=100)
+    prioridad = models.CharField(max_length=100)
+    mantenedor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+'
+    )
+
+    creados = models.IntegerField(default=0)
+    completados = models.IntegerField(default=0)
+    # Reportes abiertos al cierre del día
+    backlog = models.IntegerField(default=0)
+    # Minutos desde la creación hasta completado, de los completados ese día
+    resolucion_p50 = models.FloatField(null=True, blank=True)
+    resolucion_p90 = models.FloatField(null=True, blank=True)
+    # Cantidad por tramo de app.analitica.TRAMOS_MINUTOS: permite combinar días y filas
+    resolucion_hist = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        verbose_name = "Resumen Diario"
+        verbose_name_plural = "Resúmenes Diarios"
+        indexes = [
+            models.Index(fields=['dia'], name='resumen_diario_dia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.categoria}/{self.prioridad}: +{self.creados} -{self.completados} ({self.backlog})"
+
+
+class MarcaResumen(models.Model):
+    """Hasta dónde llegaron los resúmenes: el primer día que falta (o que hay que recalcular)."""
+    nombre = models.CharField(max_length=50, unique=True)
+    dia_pendiente = models.DateField()
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.nombre}: {self.dia_pendiente}"
+
+
 class UsuarioManager(BaseUserManager):
     use_in_migrations = True
 
@@ -174,6 +580,10 @@ class UsuarioManager(BaseUserManager):
 
         return self.create_user(username, email, password, **extra_fields)
 
+    def por_email(self, email):
+        # LOWER(email) = ... usa el índice único usuario_email_lower_uniq; iexact (LIKE) no
+        return self.alias(email_lower=Lower("email")).filter(email_lower=(email or "").strip().lower())
+
 
 class Usuario(AbstractUser):
     GENERO_CHOICES = [
@@ -198,6 +608,10 @@ class Usuario(AbstractUser):
     class Meta:
         verbose_name = "Usuario"
         verbose_name_plural = "Usuarios"
+        constraints = [
+            # Un correo por persona sin importar mayúsculas; también es el índice del login
+            models.UniqueConstraint(Lower("email"), name="usuario_email_lower_uniq"),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
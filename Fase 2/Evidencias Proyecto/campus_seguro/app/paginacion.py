@@ -0,0 +1,149 @@
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+# ===========================================
+# Paginación por cursor (keyset) sobre (clave, id)
+# ===========================================
+# Orden de los dashboards: más nuevos primero → ORDER BY created DESC, id DESC.
+# Con búsqueda FTS5 la clave es el rank (mejor coincidencia primero) → rank ASC, id ASC.
+# Cada página filtra por la clave del último/primer elemento visto, así que la
+# página 500 cuesta lo mismo que la 1 (sin OFFSET ni COUNT(*)).
+
+def _codificar_cursor(direccion, campo=None, objeto=None):
+    datos = [direccion]
+    if objeto is not None:
+        valor = getattr(objeto, campo)
+        if isinstance(valor, datetime):
+            valor = {"dt": valor.isoformat()}
+        datos += [valor, objeto.pk]
+    return urlsafe_base64_encode(json.dumps(datos, separators=(",", ":")).encode())
+
+
+def _decodificar_cursor(token):
+    """Devuelve (direccion, valor, id) o None si el cursor no es válido."""
+    try:
+        datos = json.loads(urlsafe_base64_decode(token))
+        direccion = datos[0]
+        if direccion == "ultima":
+            return direccion, None, None
+        if direccion in ("sig", "ant"):
+            valor = datos[1]
+            if isinstance(valor, dict):
+                valor = datetime.fromisoformat(valor["dt"])
+            elif not isinstance(valor, (int, float)):
+                return None
+            return direccion, valor, int(datos[2])
+    except (ValueError, TypeError, IndexError, KeyError):
+        pass
+    return None
+
+
+class CursorPage:
+    """Página compatible con lo que usan los templates: iterable, len, has_next/has_previous."""
+
+    def __init__(self, object_list, has_next, has_previous, params, campo, total=None):
+        self.object_list = object_list
+        self.campo = campo
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self._params = params
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def _querystring(self, cursor=None):
+        params = self._params.copy()
+        params.pop("cursor", None)
+        params.pop("page", None)
+        if cursor:
+            params["cursor"] = cursor
+        return params.urlencode()
+
+    # Una página vacía (cursor obsoleto) no tiene clave propia: se vuelve a los extremos
+    @property
+    def next_querystring(self):
+        if not self.object_list:
+            return self.last_querystring
+        return self._querystring(_codificar_cursor("sig", self.campo, self.object_list[-1]))
+
+    @property
+    def previous_querystring(self):
+        if not self.object_list:
+            return self.first_querystring
+        return self._querystring(_codificar_cursor("ant", self.campo, self.object_list[0]))
+
+    @property
+    def first_querystring(self):
+        return self._querystring()
+
+    @property
+    def last_querystring(self):
+        return self._querystring(_codificar_cursor("ultima"))
+
+
+class KeysetPaginator:
+    """
+    Reemplazo de Paginator para querysets de Reporte.
+    `orden` es '-created' (por defecto) o una anotación como 'rank'; el desempate es siempre id.
+    `total` es opcional: los dashboards ya lo tienen gracias a ContadorEstado.
+    """
+
+    def __init__(self, queryset, per_page, total=None, orden="-created"):
+        self.queryset = queryset.order_by()
+        self.per_page = per_page
+        self.total = total
+        self.descendente = orden.startswith("-")
+        self.campo = orden.lstrip("-")
+
+    def _orden(self, invertido=False):
+        signo = "-" if self.descendente != invertido else ""
+        return (f"{signo}{self.campo}", f"{signo}id")
+
+    def _despues_de(self, valor, pk, invertido=False):
+        # (clave, id) < (valor, pk) escrito como "clave <= valor AND (clave < valor OR id < pk)":
+        # el primer término le da a SQLite un rango sobre el índice en vez de un SCAN.
+        op = "lt" if self.descendente != invertido else "gt"
+        return Q(**{f"{self.campo}__{op}e": valor}) & (
+            Q(**{f"{self.campo}__{op}": valor}) | Q(**{f"id__{op}": pk})
+        )
+
+    def _pagina(self, filas, has_next, has_previous, params):
+        return CursorPage(filas, has_next, has_previous, params, self.campo, self.total)
+
+    def get_page(self, params):
+        cursor = _decodificar_cursor(params.get("cursor", "")) if params.get("cursor") else None
+        n = self.per_page
+
+        if cursor is None:
+            filas = list(self.queryset.order_by(*self._orden())[:n + 1])
+            return self._pagina(filas[:n], len(filas) > n, False, params)
+
+        direccion, valor, pk = cursor
+        if direccion == "sig":
+            filas = list(self.queryset.filter(self._despues_de(valor, pk)).order_by(*self._orden())[:n + 1])
+            return self._pagina(filas[:n], len(filas) > n, True, params)
+
+        if direccion == "ant":
+            qs = self.queryset.filter(self._despues_de(valor, pk, invertido=True))
+        else:  # "ultima": el final del orden, leído al revés
+            qs = self.queryset
+        filas = list(qs.order_by(*self._orden(invertido=True))[:n + 1])
+        pagina = filas[:n][::-1]
+        return self._pagina(pagina, direccion == "ant", len(filas) > n, params)
@@ -0,0 +1,238 @@
+import cProfile
+import json
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# Perfilador bajo demanda (cProfile + tracemalloc)
+# ===========================================
+# Un administrador genera una firma en la página de perfiles (vista `perfiles`) y la
+# agrega a la petición que quiere perfilar, como ?perfilar=<firma> o en la cabecera
+# X-Perfilar. PerfiladorMiddleware (último en MIDDLEWARE, para que la CSRF y demás
+# process_view ya hayan corrido) ejecuta entonces la vista, y el render de su
+# TemplateResponse, dentro de cProfile y entre dos fotos de tracemalloc.
+#
+# En PERFILADOR_DIR quedan, por perfil:
+#   <nombre>.prof  estadísticas de cProfile (pstats, snakeviz, ...),
+#   <nombre>.json  resumen para la página: petición, duración, funciones con más
+#                  tiempo acumulado y líneas que más memoria asignaron.
+# Se guardan los PERFILADOR_MAX más recientes.
+#
+# La firma vale PERFILADOR_VALIDEZ segundos y lleva el id del administrador que la
+# pidió. Solo perfila peticiones de ese mismo usuario, con sesión iniciada y el rol
+# administracion vigente: una URL con ?perfilar= que se filtra por un Referer o un log
+# no le sirve a nadie más, y quitarle el rol la anula. Sin firma el costo es leer un
+# parámetro y una cabecera. Un perfil a la vez
+# por proceso (cProfile y tracemalloc son globales); si llega otro mientras tanto,
+# esa petición se atiende sin perfilar. Las vistas async no se perfilan: cProfile
+# solo sigue al hilo que lo activó.
+
+PARAMETRO = "perfilar"
+CABECERA = "HTTP_X_PERFILAR"
+_SAL = "app.perfilador"
+_NOMBRE = re.compile(r"^[\w-]+$")
+_ocupado = threading.Lock()
+
+
+def _ajuste(nombre, defecto):
+    return getattr(settings, f"PERFILADOR_{nombre}", defecto)
+
+
+def directorio():
+    return Path(_ajuste("DIR", Path(settings.BASE_DIR) / "perfiles"))
+
+
+# ===========================================
+# Firma
+# ===========================================
+def firmar(usuario):
+    return signing.TimestampSigner(salt=_SAL).sign(str(usuario.pk))
+
+
+def firma_de(request):
+    """La firma que trae la petición (sin validar), o None."""
+    return request.GET.get(PARAMETRO) or request.META.get(CABECERA)
+
+
+def verificar(firma):
+    """Id del administrador que firmó, o None si la firma no vale o expiró."""
+    try:
+        return int(signing.TimestampSigner(salt=_SAL).unsign(firma, max_age=_ajuste("VALIDEZ", 3600)))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def autorizado(request, solicitante):
+    """El usuario de la petición es quien firmó y sigue siendo administrador."""
+    user = request.user
+    return user.is_authenticated and user.pk == solicitante and user.nombre_rol == "administracion"
+
+
+# ===========================================
+# Perfilar
+# ===========================================
+def perfilar(request, firma, view_func, view_args, view_kwargs):
+    """
+    Ejecuta la vista perfilada y devuelve su respuesta, o None (firma inválida o ajena,
+    u otro perfil en curso) para que Django la ejecute como siempre.
+    """
+    solicitante = verificar(firma)
+    if solicitante is None:
+        logger.warning("Firma de perfilador inválida o expirada en %s", request.path)
+        return None
+    if not autorizado(request, solicitante):
+        logger.warning("Firma de perfilador del usuario %s usada por otro usuario en %s", solicitante, request.path)
+        return None
+    if not _ocupado.acquire(blocking=False):
+        logger.info("Perfil en curso: %s se atiende sin perfilar", request.path)
+        return None
+    try:
+        return _perfilar(request, solicitante, view_func, view_args, view_kwargs)
+    finally:
+        _ocupado.release()
+
+
+def _perfilar(request, solicitante, view_func, view_args, view_kwargs):
+    propio = not tracemalloc.is_tracing()
+    if propio:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    antes = tracemalloc.take_snapshot()
+    perfil = cProfile.Profile()
+    inicio = time.perf_counter()
+    response = None
+    try:
+        perfil.enable()
+        try:
+            response = view_func(request, *view_args, **view_kwargs)
+            if hasattr(response, "render") and callable(response.render):
+                response = response.render()
+        finally:
+            perfil.disable()
+            duracion = time.perf_counter() - inicio
+            despues = tracemalloc.take_snapshot()
+            pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        if propio:
+            tracemalloc.stop()
+    _guardar(request, response, solicitante, perfil, antes, despues, duracion, pico)
+    return response
+
+
+def _guardar(request, response, solicitante, perfil, antes, despues, duracion, pico):
+    carpeta = directorio()
+    carpeta.mkdir(parents=True, exist_ok=True)
+    ahora = timezone.now()
+    match = request.resolver_match
+    ruta = match.view_name if match else ""
+    sufijo = re.sub(r"[^\w-]", "_", ruta) or "vista"
+    nombre = f"{ahora:%Y%m%d-%H%M%S-%f}-{sufijo}"
+
+    perfil.dump_stats(carpeta / f"{nombre}.prof")
+    filas = _ajuste("FILAS", 25)
+    resumen = {
+        "nombre": nombre,
+        "fecha": ahora.isoformat(),
+        "ruta": ruta,
+        "metodo": request.method,
+        "path": request.get_full_path(),
+        "estado": getattr(response, "status_code", None),
+        "solicitado_por": solicitante,
+        "duracion_ms": round(duracion * 1000, 1),
+        "pico_kb": round(pico / 1024, 1),
+        "funciones": _funciones(pstats.Stats(perfil), filas),
+        "asignaciones": _asignaciones(antes, despues, filas),
+    }
+    (carpeta / f"{nombre}.json").write_text(json.dumps(resumen, ensure_ascii=False), encoding="utf-8")
+    _podar(carpeta)
+
+
+def _ruta_corta(archivo):
+    """Ruta relativa al proyecto o a site-packages, para que la tabla se pueda leer."""
+    for base in [str(settings.BASE_DIR), *sorted(sys.path, key=len, reverse=True)]:
+        if base and archivo.startswith(base + "/"):
+            return archivo[len(base) + 1:]
+    return archivo
+
+
+def _funciones(estadisticas, filas):
+    # pstats: (archivo, línea, función) → (primitivas, llamadas, propio, acumulado, llamadores)
+    mayores = sorted(estadisticas.stats.items(), key=lambda e: e[1][3], reverse=True)[:filas]
+    return [
+        {
+            "funcion": f"{_ruta_corta(archivo)}:{linea}({funcion})" if linea else funcion,
+            "llamadas": llamadas,
+            "propio_ms": round(propio * 1000, 2),
+            "acumulado_ms": round(acumulado * 1000, 2),
+        }
+        for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in mayores
+    ]
+
+
+def _asignaciones(antes, despues, filas):
+    excluir = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    diferencias = despues.filter_traces(excluir).compare_to(antes.filter_traces(excluir), "lineno")
+    return [
+        {
+            "sitio": f"{_ruta_corta(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+            "kb": round(d.size_diff / 1024, 1),
+            "bloques": d.count_diff,
+        }
+        for d in diferencias[:filas]
+        if d.size_diff > 0
+    ]
+
+
+def _podar(carpeta):
+    resumenes = sorted(carpeta.glob("*.json"), reverse=True)
+    for viejo in resumenes[_ajuste("MAX", 50):]:
+        viejo.unlink(missing_ok=True)
+        viejo.with_suffix(".prof").unlink(missing_ok=True)
+
+
+# ===========================================
+# Lectura (página de perfiles)
+# ===========================================
+def _leer(archivo):
+    try:
+        resumen = json.loads(archivo.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    resumen["fecha"] = parse_datetime(resumen["fecha"])
+    return resumen
+
+
+def recientes():
+    """Resúmenes guardados, del más nuevo al más viejo (sin funciones ni asignaciones)."""
+    carpeta = directorio()
+    if not carpeta.is_dir():
+        return []
+    perfiles = []
+    for archivo in sorted(carpeta.glob("*.json"), reverse=True):
+        resumen = _leer(archivo)
+        if resumen is not None:
+            resumen.pop("funciones", None)
+            resumen.pop("asignaciones", None)
+            perfiles.append(resumen)
+    return perfiles
+
+
+def cargar(nombre):
+    """Resumen completo de un perfil, o None si el nombre no es válido o no existe."""
+    if not nombre or not _NOMBRE.match(nombre):
+        return None
+    return _leer(directorio() / f"{nombre}.json")
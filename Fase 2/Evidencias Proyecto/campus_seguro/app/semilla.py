@@ -0,0 +1,254 @@
+import random
+import string
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from app import busqueda, ubicaciones
+from app.forms import CATEGORIAS
+from app.models import Edificio, HistorialAsignacion, HistorialEstado, Piso, Reporte, Sala, Usuario
+
+
+# ===========================================
+# Campus sintético para pruebas de carga y benchmarks
+# ===========================================
+# Todo sale de un random.Random(semilla): con la misma semilla, los mismos parámetros
+# y la misma fecha `hasta`, sobre una base vacía, se obtienen exactamente las mismas
+# filas (ids incluidos).
+#
+# Los reportes se reparten al azar (uniforme) en los `dias` días, generados ya en
+# orden de fecha para que los ids sigan el tiempo como en producción. Cada uno recorre el mismo ciclo que producen las vistas, con demoras aleatorias:
+#   asignación (admin: pendiente → en_proceso, HistorialAsignacion + HistorialEstado),
+#   pausas y reanudaciones (mantenedor), a veces una reasignación, y el cierre
+#   (en_proceso → completado), más rápido cuanto más alta la prioridad.
+# Un paso que caería después de `hasta` no ocurre: los reportes recientes quedan
+# abiertos, los antiguos casi todos completados.
+#
+# Escritura: bulk_create por lotes, cada lote en su transacción. bulk_create no pasa
+# por save() ni por las señales, así que al final se reconstruyen los contadores, el
+# índice de búsqueda y la versión del árbol de ubicaciones. La contraseña se hashea
+# una sola vez (PBKDF2 cuesta ~0,5 s por hash) y todas las cuentas comparten el hash.
+
+DOMINIO = "semilla.duocuc.cl"
+LOTE = 5000
+
+NOMBRES = ["Ana", "Benjamín", "Camila", "Diego", "Elena", "Felipe", "Gabriela", "Hugo", "Isidora", "Joaquín",
+           "Javiera", "Martín", "Sofía", "Tomás", "Valentina", "Vicente", "Antonia", "Matías", "Catalina", "Lucas"]
+APELLIDOS = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez", "Sepúlveda",
+             "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres", "Araya", "Flores", "Espinoza", "Valenzuela"]
+TIPOS_SALA = ["Sala de clases", "Laboratorio", "Baño", "Pasillo", "Oficina", "Auditorio", "Biblioteca", "Casino"]
+PROBLEMAS = {
+    "Infraestructura": ["Filtración en el techo", "Puerta no cierra", "Silla rota", "Ventana trizada", "Fuga de agua"],
+    "Limpieza": ["Basurero lleno", "Piso sucio", "Baño sin papel", "Derrame en el pasillo", "Mal olor"],
+    "Tecnología": ["Proyector no enciende", "Sin conexión wifi", "Computador no inicia", "Enchufe sin corriente",
+                   "Parlantes no funcionan"],
+}
+PRIORIDADES = [("Baja", 4), ("Media", 4), ("Alta", 2)]
+# Tiempo medio (horas) de trabajo hasta completar, según prioridad
+HORAS_RESOLUCION = {"Alta": 8, "Media": 36, "Baja": 96}
+
+
+@contextmanager
+def _fechas_explicitas(*modelos):
+    """Desactiva auto_now/auto_now_add para que bulk_create respete las fechas generadas."""
+    campos = [
+        (campo, campo.auto_now, campo.auto_now_add)
+        for modelo in modelos for campo in modelo._meta.concrete_fields
+        if getattr(campo, "auto_now", False) or getattr(campo, "auto_now_add", False)
+    ]
+    for campo, _, _ in campos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in campos:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+def _letras(i):
+    """0 → A, 25 → Z, 26 → AA…"""
+    texto = ""
+    i += 1
+    while i:
+        i, resto = divmod(i - 1, 26)
+        texto = string.ascii_uppercase[resto] + texto
+    return texto
+
+
+def sembrar(semilla=42, edificios=5, pisos=4, salas=10, alumnos=2000, mantenedores=50, administradores=5,
+            reportes=10000, dias=365, hasta=None, password="campus123", lote=LOTE, progreso=None):
+    """
+    Crea el campus y devuelve un dict con la cantidad de filas por modelo.
+    `progreso(reportes_creados)` se llama después de cada lote.
+    """
+    rng = random.Random(semilla)
+    tz = timezone.get_current_timezone()
+    fin = datetime.combine(hasta or timezone.localdate(), time.min, tzinfo=tz)
+    inicio = fin - timedelta(days=dias)
+    hash_password = make_password(password, salt=f"semilla{semilla}")
+
+    with transaction.atomic():
+        salas_ids = _ubicaciones(rng, edificios, pisos, salas)
+        usuarios = _usuarios(rng, alumnos, mantenedores, administradores, hash_password, inicio)
+
+    cantidades = {"edificios": edificios, "pisos": edificios * pisos, "salas": len(salas_ids),
+                  "usuarios": sum(len(ids) for ids in usuarios.values()),
+                  "reportes": 0, "historial_estados": 0, "historial_asignaciones": 0}
+    if reportes:
+        with _fechas_explicitas(Reporte, HistorialEstado, HistorialAsignacion):
+            _reportes(rng, reportes, usuarios, salas_ids, inicio, fin, lote, cantidades, progreso)
+
+    call_command("reconciliar_contadores", stdout=StringIO())
+    with transaction.atomic():
+        busqueda.reconstruir_indice()
+    ubicaciones.invalidar()
+    return cantidades
+
+
+def _ubicaciones(rng, edificios, pisos, salas):
+    creados = Edificio.objects.bulk_create(
+        Edificio(nombre=f"Edificio {_letras(e)}", codigo=f"sem-{_letras(e).lower()}") for e in range(edificios)
+    )
+    por_codigo = dict(Edificio.objects.filter(codigo__in=[e.codigo for e in creados]).values_list("codigo", "id"))
+    Piso.objects.bulk_create(
+        Piso(edificio_id=por_codigo[e.codigo], numero=p, etiqueta=f"Piso {p}") for e in creados for p in range(1, pisos + 1)
+    )
+    nuevas = []
+    for edificio_id, numero, piso_id, codigo in (
+        Piso.objects.filter(edificio_id__in=por_codigo.values())
+        .order_by("edificio__codigo", "numero")
+        .values_list("edificio_id", "numero", "id", "edificio__codigo")
+    ):
+        letra = codigo.removeprefix("sem-").upper()
+        nuevas += [
+            Sala(edificio_id=edificio_id, piso_id=piso_id, codigo=f"{letra}{numero}{s:02}", nombre=rng.choice(TIPOS_SALA))
+            for s in range(1, salas + 1)
+        ]
+    Sala.objects.bulk_create(nuevas, batch_size=LOTE)
+    return list(Sala.objects.filter(edificio_id__in=por_codigo.values()).order_by("id").values_list("id", flat=True))
+
+
+def _usuarios(rng, alumnos, mantenedores, administradores, hash_password, inicio):
+    roles = [("administracion", "admin", administradores), ("mantenimiento", "mant", mantenedores), ("usuario", "alumno", alumnos)]
+    nuevos = []
+    for rol, prefijo, n in roles:
+        for i in range(1, n + 1):
+            username = f"{prefijo}{i:06}"
+            nuevos.append(Usuario(
+                username=username, email=f"{username}@{DOMINIO}", password=hash_password, nombre_rol=rol,
+                first_name=rng.choice(NOMBRES), last_name=rng.choice(APELLIDOS),
+                edad=rng.randint(18, 35) if rol == "usuario" else rng.randint(25, 65),
+                genero=rng.choice(Usuario.GENERO_CHOICES)[0], is_staff=rol == "administracion",
+                date_joined=inicio,
+            ))
+    Usuario.objects.bulk_create(nuevos, batch_size=LOTE)
+    ids = {}
+    for pk, rol in Usuario.objects.filter(email__endswith=f"@{DOMINIO}").order_by("id").values_list("id", "nombre_rol"):
+        ids.setdefault(rol, []).append(pk)
+    return ids
+
+
+def _ciclo(rng, reporte, creado, fin, admins, mantenedores):
+    """Historial del reporte desde `creado`; deja en `reporte` el estado alcanzado antes de `fin`."""
+    estados, asignaciones = [], []
+    t = creado
+
+    def paso(horas):
+        nonlocal t
+        t += timedelta(hours=rng.expovariate(1 / horas))
+        return t < fin
+
+    # ~5 % queda sin atender (nunca se asigna)
+    if not mantenedores or not admins or rng.random() < 0.05 or not paso(6):
+        return estados, asignaciones
+    mant = rng.choice(mantenedores)
+    asignaciones.append(HistorialAsignacion(
+        asignado_de_id=None, asignado_a_id=mant, estado_de="pendiente", estado_a="en_proceso",
+        cambiado_por_id=rng.choice(admins), motivo="Asignación", creado_en=t,
+    ))
+    estados.append(HistorialEstado(estado_anterior="pendiente", estado_nuevo="en_proceso", cambiado_por_id=mant, fecha_cambio=t))
+    reporte.asignado_a_id, reporte.estado, reporte.fecha_asignacion = mant, "en_proceso", t
+
+    horas = HORAS_RESOLUCION[reporte.prioridad]
+    while True:
+        if rng.random() < 0.15:  # pausa (falta un repuesto, acceso cerrado…) y reanuda
+            if not paso(horas / 2):
+                break
+            estados.append(HistorialEstado(estado_anterior="en_proceso", estado_nuevo="pausado", cambiado_por_id=mant, fecha_cambio=t))
+            reporte.estado = "pausado"
+            if not paso(24):
+                break
+            estados.append(HistorialEstado(estado_anterior="pausado", estado_nuevo="en_proceso", cambiado_por_id=mant, fecha_cambio=t))
+            reporte.estado = "en_proceso"
+        elif rng.random() < 0.1 and len(mantenedores) > 1:  # reasignación
+            if not paso(horas / 2):
+                break
+            nuevo = mantenedores[(mantenedores.index(mant) + rng.randrange(1, len(mantenedores))) % len(mantenedores)]
+            asignaciones.append(HistorialAsignacion(
+                asignado_de_id=mant, asignado_a_id=nuevo, estado_de="en_proceso", estado_a="en_proceso",
+                cambiado_por_id=rng.choice(admins), motivo="Reasignación", creado_en=t,
+            ))
+            mant = reporte.asignado_a_id = nuevo
+            reporte.fecha_asignacion = t
+        else:
+            if paso(horas):
+                estados.append(HistorialEstado(estado_anterior="en_proceso", estado_nuevo="completado", cambiado_por_id=mant, fecha_cambio=t))
+                reporte.estado = "completado"
+            break
+    return estados, asignaciones
+
+
+def _reportes(rng, total, usuarios, salas_ids, inicio, fin, lote, cantidades, progreso):
+    alumnos, mantenedores, admins = (usuarios.get(rol, []) for rol in ("usuario", "mantenimiento", "administracion"))
+    segundos = (fin - inicio).total_seconds()
+    fraccion = 0.0
+    prioridades, pesos = zip(*PRIORIDADES)
+    categorias = [c for c, _ in CATEGORIAS]
+
+    creados = 0
+    while creados < total:
+        nuevos, historias = [], []
+        for _ in range(min(lote, total - creados)):
+            # Siguiente de `total` uniformes ordenados, sin guardarlos: el mínimo de los
+            # k que faltan cae en (1 - U^(1/k)) del tramo restante
+            fraccion += (1 - fraccion) * (1 - rng.random() ** (1 / (total - creados - len(nuevos))))
+            t = inicio + timedelta(seconds=fraccion * segundos)
+            categoria = rng.choice(categorias)
+            sala = rng.choice(salas_ids) if salas_ids and rng.random() < 0.9 else None
+            reporte = Reporte(
+                titulo=rng.choice(PROBLEMAS.get(categoria, ["Problema"])), categoria=categoria,
+                prioridad=rng.choices(prioridades, pesos)[0],
+                descripcion=f"Reporte generado #{creados + len(nuevos) + 1}.",
+                imagen="", estado="pendiente", created=t,
+                # Pocos alumnos reportan mucho: sesgo hacia los primeros ids
+                usuario_id=alumnos[int(len(alumnos) * rng.random() ** 2)], sala_id=sala,
+            )
+            estados, asignaciones = _ciclo(rng, reporte, t, fin, admins, mantenedores)
+            reporte.updated = max([t] + [h.fecha_cambio for h in estados] + [h.creado_en for h in asignaciones])
+            nuevos.append(reporte)
+            historias.append((estados, asignaciones))
+
+        with transaction.atomic():
+            Reporte.objects.bulk_create(nuevos)
+            estados, asignaciones = [], []
+            for reporte, (hist_estados, hist_asignaciones) in zip(nuevos, historias):
+                for h in hist_estados:
+                    h.reporte_id = reporte.pk
+                for h in hist_asignaciones:
+                    h.reporte_id = reporte.pk
+                estados += hist_estados
+                asignaciones += hist_asignaciones
+            HistorialEstado.objects.bulk_create(estados)
+            HistorialAsignacion.objects.bulk_create(asignaciones)
+
+        creados += len(nuevos)
+        cantidades["reportes"] = creados
+        cantidades["historial_estados"] += len(estados)
+        cantidades["historial_asignaciones"] += len(asignaciones)
+        if progreso:
+            progreso(creados)
@@ -0,0 +1,124 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from app import busqueda, eventos, imagenes, ubicaciones, usuario_cache
+from app.models import ArchivoImagen, ContadorEstado, Edificio, Piso, Reporte, Sala, Usuario
+
+
+# ===========================================
+# Contadores: borrados que no pasan por Reporte.save
+# ===========================================
+@receiver(post_delete, sender=Reporte)
+def descontar_reporte_eliminado(sender, instance, **kwargs):
+    ContadorEstado.objects.registrar_cambio((instance.asignado_a_id, instance.estado), None)
+
+
+@receiver(post_delete, sender=Reporte)
+def liberar_imagen_reporte(sender, instance, **kwargs):
+    # El archivo se borra después, con gc_imagenes, si ningún otro reporte lo usa
+    ArchivoImagen.objects.cambiar_referencia(instance.imagen.name or '', '')
+
+
+@receiver(pre_delete, sender=Usuario)
+def liberar_contadores_mantenedor(sender, instance, **kwargs):
+    # Reporte.asignado_a es SET_NULL: sus reportes pasan a "sin asignar"
+    ContadorEstado.objects.traspasar_a_sin_asignar(instance.pk)
+
+
+# ===========================================
+# Índice de búsqueda FTS5
+# ===========================================
+CAMPOS_INDEXADOS = {"titulo", "descripcion", "categoria", "sala"}
+
+
+@receiver(post_save, sender=Reporte)
+def indexar_reporte(sender, instance, update_fields=None, **kwargs):
+    # Asignaciones y cambios de estado no tocan el texto buscable
+    if update_fields is not None and not CAMPOS_INDEXADOS.intersection(update_fields):
+        return
+    busqueda.indexar_reporte(instance.pk)
+
+
+@receiver(post_delete, sender=Reporte)
+def desindexar_reporte(sender, instance, **kwargs):
+    busqueda.desindexar_reporte(instance.pk)
+
+
+@receiver(post_save, sender=Sala)
+def reindexar_sala(sender, instance, created=False, **kwargs):
+    if not created:
+        busqueda.indexar_sala(instance.pk)
+
+
+@receiver(post_save, sender=Edificio)
+def reindexar_edificio(sender, instance, created=False, **kwargs):
+    if not created:
+        busqueda.indexar_edificio(instance.pk)
+
+
+# ===========================================
+# Miniaturas de la imagen del reporte
+# ===========================================
+@receiver(post_save, sender=Reporte)
+def generar_variantes_imagen(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "imagen" not in update_fields:
+        return
+    if instance.imagen and not instance.variantes_listas:
+        # Después del commit: el pool lee el archivo y marca el reporte por su cuenta
+        transaction.on_commit(partial(imagenes.encolar, instance.pk, instance.imagen.name))
+
+
+# ===========================================
+# Árbol de ubicaciones en caché
+# ===========================================
+@receiver(post_save, sender=Edificio)
+@receiver(post_save, sender=Piso)
+@receiver(post_save, sender=Sala)
+@receiver(post_delete, sender=Edificio)
+@receiver(post_delete, sender=Piso)
+@receiver(post_delete, sender=Sala)
+def invalidar_ubicaciones(sender, **kwargs):
+    # Ahora, para que esta misma transacción vea el cambio, y otra vez después del
+    # commit: si otra petición armó el árbol entremedio con los datos viejos, esa
+    # entrada queda descartada al subir de nuevo la versión
+    ubicaciones.invalidar()
+    transaction.on_commit(ubicaciones.invalidar)
+
+
+# ===========================================
+# Usuario autenticado en caché
+# ===========================================
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_usuario_cacheado(sender, instance, **kwargs):
+    # Rol, is_active o contraseña nuevos rigen desde la próxima petición. Otra vez
+    # después del commit, por si otra petición alcanzó a guardar la foto vieja
+    usuario_cache.invalidar(instance.pk)
+    transaction.on_commit(partial(usuario_cache.invalidar, instance.pk))
+
+
+# ===========================================
+# Eventos en vivo de los dashboards
+# ===========================================
+@receiver(post_save, sender=Reporte)
+def publicar_evento_reporte(sender, instance, created=False, update_fields=None, **kwargs):
+    extras = {}
+    if 'fecha_asignacion' in instance.__dict__:
+        fecha = instance.fecha_asignacion
+        extras['fecha_asignacion'] = fecha.isoformat() if fecha else None
+
+    if created:
+        eventos.publicar(eventos.evento(
+            'creado', instance.pk, None, (instance.asignado_a_id, instance.estado),
+            titulo=instance.titulo, **extras,
+        ))
+        return
+
+    # Reporte.save deja el estado previo; los cambios de título o descripción no se publican
+    anterior = getattr(instance, '_estado_previo', None)
+    nuevo = instance.estado_escrito(anterior, update_fields)
+    if anterior is not None and nuevo != anterior:
+        eventos.publicar(eventos.evento('actualizado', instance.pk, anterior, nuevo, **extras))
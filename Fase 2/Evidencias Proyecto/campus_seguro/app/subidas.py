@@ -0,0 +1,149 @@
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+# ===========================================
+# Ingesta de imágenes de reportes
+# ===========================================
+# 1. ImagenUploadHandler (FILE_UPLOAD_HANDLERS): el campo "imagen" va directo a
+#    un archivo temporal en disco, se corta apenas pasa el límite de tamaño y la
+#    cabecera se valida con Pillow al llegar los primeros 64 KB, sin decodificar.
+# 2. procesar_imagen (ImagenReporteField.to_python): limita los megapíxeles,
+#    quita EXIF (GPS incluido) y reduce las fotos grandes. En JPEG, draft() hace
+#    que libjpeg decodifique ya a 1/2, 1/4 u 1/8: nunca se tiene la foto completa
+#    en memoria. El resultado se escribe a otro temporal en disco.
+
+FORMATOS = {
+    "JPEG": ("image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+    "PNG": ("image/png", {"optimize": True}),
+    "WEBP": ("image/webp", {"quality": 85}),
+}
+TAMANO_MAXIMO = 5 * 1024 * 1024
+
+
+def lado_maximo():
+    return getattr(settings, "IMAGEN_LADO_MAXIMO", 1920)
+
+
+def max_pixeles():
+    return getattr(settings, "IMAGEN_MAX_PIXELES", 30_000_000)
+
+
+def _revisar_cabecera(archivo):
+    """Valida formato y dimensiones leyendo solo la cabecera. Devuelve un mensaje de error o None."""
+    posicion = archivo.tell()
+    archivo.seek(0)
+    try:
+        with Image.open(archivo) as img:
+            formato, (ancho, alto) = img.format, img.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return "El archivo debe ser una imagen válida."
+    finally:
+        archivo.seek(posicion)
+
+    if formato not in FORMATOS:
+        return "Formato no soportado: usa JPG, PNG o WEBP."
+    if ancho * alto > max_pixeles():
+        return f"La imagen no puede superar los {max_pixeles() // 1_000_000} megapíxeles."
+    return None
+
+
+class ImagenUploadHandler(FileUploadHandler):
+    """
+    Solo actúa sobre los campos de CAMPOS; el resto sigue a los handlers de Django.
+    Un archivo rechazado se entrega vacío con `error_subida`, que el formulario muestra.
+    """
+    CAMPOS = {"imagen"}
+    BYTES_CABECERA = 64 * 1024
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.activo = field_name in self.CAMPOS
+        if not self.activo:
+            return
+        self.archivo = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.recibidos = 0
+        self.revisado = False
+        self.error = None
+        raise StopFutureHandlers()
+
+    def _rechazar(self, error):
+        self.error = error
+        self.archivo.seek(0)
+        self.archivo.truncate()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.activo:
+            return raw_data
+        if self.error:
+            return None  # se descarta el resto del archivo
+
+        self.recibidos += len(raw_data)
+        if self.recibidos > TAMANO_MAXIMO:
+            self._rechazar("La imagen no puede superar 5MB.")
+            return None
+
+        self.archivo.write(raw_data)
+        if not self.revisado and self.recibidos >= self.BYTES_CABECERA:
+            self.revisado = True
+            self.archivo.flush()
+            if error := _revisar_cabecera(self.archivo):
+                self._rechazar(error)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.activo:
+            return None
+        if not self.revisado and not self.error:
+            self.archivo.flush()
+            if error := _revisar_cabecera(self.archivo):
+                self._rechazar(error)
+
+        self.archivo.seek(0)
+        self.archivo.size = 0 if self.error else self.recibidos
+        self.archivo.error_subida = self.error
+        return self.archivo
+
+
+def procesar_imagen(archivo, reducir_al_decodificar=True):
+    """
+    Devuelve un TemporaryUploadedFile nuevo, sin metadatos y con el lado mayor
+    a lo más IMAGEN_LADO_MAXIMO, en el mismo formato. Lanza ValidationError si
+    el archivo no es una imagen aceptable.
+    """
+    if error := _revisar_cabecera(archivo):
+        raise ValidationError(error)
+
+    archivo.seek(0)
+    lado = lado_maximo()
+    try:
+        with Image.open(archivo) as original:
+            formato = original.format
+            icc = original.info.get("icc_profile")
+            ancho, alto = original.size
+            escala = lado / max(ancho, alto)
+            if reducir_al_decodificar and formato == "JPEG" and escala < 1:
+                # draft() elige la escala por el lado más corto: se le pide el tamaño final exacto
+                original.draft("RGB", (max(1, int(ancho * escala)), max(1, int(alto * escala))))
+            original.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+            # Orientación del EXIF aplicada sobre la imagen ya reducida, antes de descartarlo
+            imagen = ImageOps.exif_transpose(original)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError("El archivo debe ser una imagen válida.")
+
+    if formato == "JPEG" and imagen.mode not in ("RGB", "L"):
+        imagen = imagen.convert("RGB")
+
+    content_type, opciones = FORMATOS[formato]
+    nombre = os.path.basename(archivo.name or "imagen")
+    salida = TemporaryUploadedFile(nombre, content_type, 0, None)
+    # Sin exif= ni pnginfo=: solo se conserva el perfil de color
+    imagen.save(salida, formato, icc_profile=icc, **opciones)
+    salida.size = salida.tell()
+    salida.seek(0)
+    return salida
@@ -0,0 +1,26 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def imagen_reporte(reporte, variante="miniatura", **atributos):
+    """
+    {% imagen_reporte r "miniatura" alt="…" class="…" %}
+    <picture> con la variante en WebP y JPEG; el original mientras no estén generadas.
+    """
+    if not reporte.imagen:
+        return ""
+    atributos.setdefault("loading", "lazy")
+    atributos = flatatt(atributos)
+
+    if not reporte.variantes_listas:
+        return format_html('<img src="{}"{}>', reporte.imagen.url, atributos)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}"><img src="{}"{}></picture>',
+        reporte.url_variante(variante, "webp"),
+        reporte.url_variante(variante, "jpg"),
+        atributos,
+    )
@@ -1,3 +1,2408 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import re
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import async_to_sync
+
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.backends.utils import CursorWrapper
+from django.db.models import F
+from django.http import HttpResponse, QueryDict
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_encode
+from django.test.utils import CaptureQueriesContext
+
+from PIL import Image
+
+from app import almacenamiento, analitica, bd, busqueda, eventos, exportacion, imagenes, importacion, medicion_vistas, perfilador, semilla, tiempos, ubicaciones, views, vistas_async
+from app.urls import con_vistas
+from app.forms import ImagenReporteField, ReporteForm
+from app.paginacion import KeysetPaginator
+from app.models import ArchivoImagen, ContadorEstado, Edificio, HistorialAsignacion, HistorialEstado, MarcaResumen, Piso, Reporte, ReporteBusqueda, ResumenDiario, Sala, Usuario
 
 # Create your tests here.
+
+
+# ===========================================
+# Contadores materializados (ContadorEstado)
+# ===========================================
+class ContadoresEstadoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mant1 = Usuario.objects.create_user("mant1", "mant1@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.mant2 = Usuario.objects.create_user("mant2", "mant2@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+
+    def _crear(self, **extra):
+        return Reporte.objects.create(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                                      descripcion="Gotea", imagen="", usuario=self.alumno, **extra)
+
+    def _sin_asignar(self):
+        return dict(ContadorEstado.objects.filter(ambito="sin_asignar").exclude(cantidad=0).values_list("estado", "cantidad"))
+
+    def assertCuadran(self):
+        salida = io.StringIO()
+        call_command("reconciliar_contadores", "--solo-verificar", stdout=salida)
+        self.assertIn("sin diferencias", salida.getvalue())
+
+    def test_crear_suma_en_global_y_en_su_ambito(self):
+        self._crear()
+        self._crear(asignado_a=self.mant1, estado="en_proceso")
+
+        self.assertEqual(ContadorEstado.objects.resumen(), {
+            "total": 2, "pendientes": 1, "en_proceso": 1, "pausados": 0, "completados": 0,
+        })
+        self.assertEqual(ContadorEstado.objects.resumen(mantenedor=self.mant1)["en_proceso"], 1)
+        self.assertEqual(self._sin_asignar(), {"pendiente": 1})
+        self.assertCuadran()
+
+    def test_cambio_de_estado_mueve_una_unidad(self):
+        reporte = self._crear(asignado_a=self.mant1, estado="en_proceso")
+        reporte.estado = "pausado"
+        reporte.save(update_fields=["estado", "updated"])
+
+        resumen = ContadorEstado.objects.resumen(mantenedor=self.mant1)
+        self.assertEqual((resumen["en_proceso"], resumen["pausados"], resumen["total"]), (0, 1, 1))
+        self.assertEqual(ContadorEstado.objects.resumen()["pausados"], 1)
+        self.assertCuadran()
+
+    def test_reasignar_pasa_de_un_mantenedor_a_otro(self):
+        reporte = self._crear(asignado_a=self.mant1, estado="en_proceso")
+        reporte.asignado_a = self.mant2
+        reporte.save()
+
+        self.assertEqual(ContadorEstado.objects.resumen(mantenedor=self.mant1)["total"], 0)
+        self.assertEqual(ContadorEstado.objects.resumen(mantenedor=self.mant2)["en_proceso"], 1)
+        self.assertEqual(ContadorEstado.objects.resumen()["total"], 1)
+
+        # Desasignar lo deja en "sin asignar"
+        reporte.asignado_a = None
+        reporte.estado = "pendiente"
+        reporte.save()
+        self.assertEqual(ContadorEstado.objects.resumen(mantenedor=self.mant2)["total"], 0)
+        self.assertEqual(self._sin_asignar(), {"pendiente": 1})
+        self.assertCuadran()
+
+    def test_borrar_descuenta(self):
+        uno = self._crear(asignado_a=self.mant1, estado="pausado")
+        self._crear(asignado_a=self.mant1, estado="pausado")
+        self._crear()
+
+        uno.delete()
+        self.assertEqual(ContadorEstado.objects.resumen(mantenedor=self.mant1)["pausados"], 1)
+        # delete() de un queryset también pasa por post_delete
+        Reporte.objects.all().delete()
+        self.assertEqual(ContadorEstado.objects.resumen()["total"], 0)
+        self.assertCuadran()
+
+    def test_borrar_mantenedor_traspasa_a_sin_asignar(self):
+        self._crear(asignado_a=self.mant1, estado="en_proceso")
+        mant1_id = self.mant1.pk
+        self.mant1.delete()
+
+        self.assertFalse(ContadorEstado.objects.filter(asignado_a_id=mant1_id).exists())
+        self.assertEqual(self._sin_asignar(), {"en_proceso": 1})
+        self.assertCuadran()
+
+    def test_reconciliar_repara_el_desfase(self):
+        self._crear(asignado_a=self.mant1, estado="en_proceso")
+        self._crear()
+        # Escrituras que no pasan por Reporte.save ni por los signals
+        Reporte.objects.filter(asignado_a=self.mant1).update(estado="completado")
+        ContadorEstado.objects.filter(ambito="sin_asignar").delete()
+
+        salida = io.StringIO()
+        call_command("reconciliar_contadores", "--solo-verificar", stdout=salida)
+        self.assertIn("diferencia(s) encontradas", salida.getvalue())
+        self.assertEqual(ContadorEstado.objects.resumen(mantenedor=self.mant1)["en_proceso"], 1)
+
+        salida = io.StringIO()
+        call_command("reconciliar_contadores", stdout=salida)
+        self.assertIn("corregidas", salida.getvalue())
+        self.assertEqual(ContadorEstado.objects.resumen(mantenedor=self.mant1), {
+            "total": 1, "pendientes": 0, "en_proceso": 0, "pausados": 0, "completados": 1,
+        })
+        self.assertEqual(self._sin_asignar(), {"pendiente": 1})
+        self.assertCuadran()
+
+
+# ===========================================
+# Paginación por cursor (KeysetPaginator)
+# ===========================================
+class PaginacionCursorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        Reporte.objects.bulk_create([
+            Reporte(titulo=f"Fuga {i}", categoria="Infraestructura", prioridad="Alta", descripcion="Gotea",
+                    imagen="", usuario=alumno, estado="pendiente" if i % 3 else "pausado")
+            for i in range(23)
+        ])
+        # Empates en created: de a cuatro reportes con la misma fecha
+        base = timezone.now()
+        for i, pk in enumerate(Reporte.objects.order_by("id").values_list("id", flat=True)):
+            Reporte.objects.filter(pk=pk).update(created=base - timedelta(minutes=i // 4))
+        cls.orden = list(Reporte.objects.order_by("-created", "-id").values_list("id", flat=True))
+
+    def _pagina(self, querystring="", por_pagina=5, reportes=None):
+        paginador = KeysetPaginator(Reporte.objects.all() if reportes is None else reportes, por_pagina)
+        return paginador.get_page(QueryDict(querystring))
+
+    def _ids(self, pagina):
+        return [r.pk for r in pagina]
+
+    def test_hacia_adelante_sin_huecos_ni_repetidos(self):
+        pagina = self._pagina()
+        self.assertFalse(pagina.has_previous())
+        vistos = self._ids(pagina)
+        while pagina.has_next():
+            pagina = self._pagina(pagina.next_querystring)
+            self.assertTrue(pagina.has_previous())
+            vistos += self._ids(pagina)
+        self.assertEqual(vistos, self.orden)
+
+    def test_ultima_y_hacia_atras(self):
+        pagina = self._pagina(self._pagina().last_querystring)
+        self.assertEqual(self._ids(pagina), self.orden[-5:])
+        self.assertFalse(pagina.has_next())
+        vistos = self._ids(pagina)
+        while pagina.has_previous():
+            pagina = self._pagina(pagina.previous_querystring)
+            vistos = self._ids(pagina) + vistos
+        self.assertEqual(vistos, self.orden)
+
+    def test_siguiente_y_anterior_vuelven_a_la_misma_pagina(self):
+        primera = self._pagina()
+        segunda = self._pagina(primera.next_querystring)
+        self.assertEqual(self._ids(segunda), self.orden[5:10])
+        self.assertEqual(self._ids(self._pagina(segunda.previous_querystring)), self._ids(primera))
+
+    def test_cursor_invalido_o_adulterado_es_la_primera_pagina(self):
+        def cursor(datos):
+            return "cursor=" + urlsafe_base64_encode(json.dumps(datos).encode())
+
+        for querystring in ("cursor=xyz", "cursor=%%%", cursor(["sig"]), cursor(["sig", "texto", 1]),
+                            cursor(["sig", {"dt": "ayer"}, 1]), cursor(["otra", 1, 1]), cursor({"a": 1})):
+            with self.subTest(querystring=querystring):
+                pagina = self._pagina(querystring)
+                self.assertEqual(self._ids(pagina), self.orden[:5])
+                self.assertFalse(pagina.has_previous())
+
+    def test_los_filtros_siguen_en_cada_pagina(self):
+        pausados = Reporte.objects.filter(estado="pausado")
+        esperado = list(pausados.order_by("-created", "-id").values_list("id", flat=True))
+        pagina = self._pagina("estado=pausado&page=3", por_pagina=3, reportes=pausados)
+        vistos = self._ids(pagina)
+        while pagina.has_next():
+            self.assertIn("estado=pausado", pagina.next_querystring)
+            self.assertNotIn("page=", pagina.next_querystring)
+            pagina = self._pagina(pagina.next_querystring, por_pagina=3, reportes=pausados)
+            vistos += self._ids(pagina)
+        self.assertEqual(vistos, esperado)
+        self.assertEqual(QueryDict(pagina.first_querystring).dict(), {"estado": "pausado"})
+
+    def test_recorrido_en_el_dashboard_admin(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin")
+        pagina = self.client.get(url, {"estado": "pendiente"}).context["page_obj"]
+        vistos = self._ids(pagina)
+        while pagina.has_next():
+            pagina = self.client.get(f"{url}?{pagina.next_querystring}").context["page_obj"]
+            vistos += self._ids(pagina)
+        esperado = Reporte.objects.filter(estado="pendiente").order_by("-created", "-id").values_list("id", flat=True)
+        self.assertEqual(vistos, list(esperado))
+
+
+# ===========================================
+# Índice de búsqueda FTS5
+# ===========================================
+@skipUnless(connection.vendor == "sqlite", "FTS5 es de SQLite")
+class IndiceBusquedaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        cls.edificio = Edificio.objects.create(nombre="Edificio Norte", codigo="EN")
+        cls.piso = Piso.objects.create(edificio=cls.edificio, numero=1)
+        cls.sala = Sala.objects.create(piso=cls.piso, codigo="N101", nombre="Auditorio")
+
+    def _crear(self, titulo="Fuga de agua", descripcion="Gotea el techo", **extra):
+        return Reporte.objects.create(titulo=titulo, descripcion=descripcion, categoria="Infraestructura",
+                                      prioridad="Alta", imagen="", usuario=self.alumno, **extra)
+
+    def _buscar(self, texto):
+        reportes, orden = busqueda.buscar(Reporte.objects.all(), texto)
+        return list(reportes.order_by(orden, "id").values_list("id", flat=True))
+
+    def test_sigue_al_reporte(self):
+        reporte = self._crear(sala=self.sala)
+        self.assertEqual(self._buscar("fug"), [reporte.pk])
+        self.assertEqual(self._buscar("auditorio norte"), [reporte.pk])
+
+        reporte.titulo = "Vidrio roto"
+        reporte.save()
+        self.assertEqual(self._buscar("fuga"), [])
+        self.assertEqual(self._buscar("vidrio"), [reporte.pk])
+
+        # Estado y asignación no tocan el texto: ni se reindexa
+        reporte.estado = "en_proceso"
+        with CaptureQueriesContext(connection) as consultas:
+            reporte.save(update_fields=["estado", "updated"])
+        self.assertFalse([q for q in consultas if busqueda.TABLA_FTS in q["sql"]])
+
+        reporte.delete()
+        self.assertEqual(self._buscar("vidrio"), [])
+        self.assertFalse(ReporteBusqueda.objects.exists())
+
+    def test_sigue_a_sala_y_edificio(self):
+        reporte = self._crear(sala=self.sala)
+        self.sala.nombre = "Biblioteca"
+        self.sala.save()
+        self.assertEqual(self._buscar("biblioteca"), [reporte.pk])
+        self.assertEqual(self._buscar("auditorio"), [])
+
+        self.edificio.nombre = "Edificio Sur"
+        self.edificio.save()
+        self.assertEqual(self._buscar("sur biblioteca"), [reporte.pk])
+        self.assertEqual(self._buscar("norte biblioteca"), [])
+
+    def test_mover_de_sala_y_borrar_la_anterior(self):
+        reporte = self._crear(sala=self.sala)
+        otra = Sala.objects.create(piso=self.piso, codigo="N102", nombre="Gimnasio")
+        # Sala PROTECT: mientras tenga reportes no se borra ni cambia el índice
+        with self.assertRaises(Exception):
+            with transaction.atomic():
+                self.sala.delete()
+        self.assertEqual(self._buscar("auditorio"), [reporte.pk])
+
+        reporte.sala = otra
+        reporte.save()
+        self.sala.delete()
+        self.assertEqual(self._buscar("auditorio"), [])
+        self.assertEqual(self._buscar("gimnasio"), [reporte.pk])
+
+    def test_reconstruir_busqueda(self):
+        reportes = [self._crear(sala=self.sala), self._crear(titulo="Luz quemada")]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {busqueda.TABLA_FTS}")
+        self.assertEqual(self._buscar("fuga"), [])
+
+        salida = io.StringIO()
+        call_command("reconstruir_busqueda", stdout=salida)
+        self.assertIn("2 reporte(s)", salida.getvalue())
+        self.assertEqual(self._buscar("fuga"), [reportes[0].pk])
+        self.assertEqual(self._buscar("luz"), [reportes[1].pk])
+
+    def test_rank_con_filtros_y_paginas(self):
+        # La cantidad de veces que aparece "fuga" decide el rank; la mitad está pausada
+        reportes = [
+            self._crear(titulo=f"Reporte {i}", descripcion=" ".join(["fuga"] * (i + 1) + ["baño"] * 20),
+                        estado="pausado" if i % 2 else "pendiente")
+            for i in range(24)
+        ]
+        self._crear(titulo="Puerta", descripcion="No cierra", estado="pausado")
+        esperado = [r.pk for r in reversed(reportes) if r.estado == "pausado"]
+
+        self.client.force_login(self.admin)
+        url = reverse("admin")
+        pagina = self.client.get(url, {"busqueda": "fuga", "estado": "pausado"}).context["page_obj"]
+        vistos = [r.pk for r in pagina]
+        while pagina.has_next():
+            pagina = self.client.get(f"{url}?{pagina.next_querystring}").context["page_obj"]
+            vistos += [r.pk for r in pagina]
+        self.assertEqual(vistos, esperado)
+
+
+# ===========================================
+# Planes de consulta de las vistas calientes
+# ===========================================
+class PlanConsultaTests(TestCase):
+    """
+    Corre EXPLAIN QUERY PLAN sobre cada SELECT que las vistas hacen contra Reporte y los
+    historiales. Falla si SQLite recorre la tabla completa ("SCAN tabla" sin índice) o
+    si necesita ordenar en un B-tree temporal. "SCAN tabla USING INDEX" se permite: es
+    el recorrido en orden que corta el LIMIT de la página sin filtros. La búsqueda FTS5
+    ordena por rank, que se calcula por coincidencia, así que ahí solo se exige que no
+    haya full scan.
+    """
+    TABLAS = r"app_reporte|app_historialestado|app_historialasignacion"
+    FULL_SCAN = re.compile(rf"^SCAN ({TABLAS})\b(?! USING)")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.mantenedor = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.usuario = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        edificio = Edificio.objects.create(nombre="Edificio A", codigo="a")
+        piso = Piso.objects.create(edificio=edificio, numero=1)
+        sala = Sala.objects.create(piso=piso, codigo="A101", nombre="Laboratorio")
+
+        # Suficientes filas para que cada combinación de filtros tenga más de una página
+        estados = [e for e, _ in Reporte.ESTADO_CHOICES]
+        Reporte.objects.bulk_create([
+            Reporte(
+                titulo=f"Fuga de agua {i}", categoria="Infraestructura",
+                prioridad=["Alta", "Media", "Baja"][(i // 4) % 3], estado=estados[i % 4],
+                descripcion="Gotea el techo", imagen="reportes/x.jpg", usuario=cls.usuario, sala=sala,
+                asignado_a=cls.mantenedor if i % 5 else None,
+            )
+            for i in range(200)
+        ])
+        busqueda.reconstruir_indice()
+
+        cls.reporte = Reporte.objects.filter(asignado_a=cls.mantenedor).first()
+        HistorialEstado.objects.create(reporte=cls.reporte, estado_nuevo="en_proceso", cambiado_por=cls.mantenedor)
+        HistorialAsignacion.objects.create(reporte=cls.reporte, asignado_a=cls.mantenedor, cambiado_por=cls.admin)
+
+    def _planes(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200, url)
+
+        planes = []
+        with connection.cursor() as cursor:
+            for consulta in ctx.captured_queries:
+                sql = consulta["sql"]
+                if not sql.startswith("SELECT") or not re.search(rf'FROM "({self.TABLAS})"', sql):
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                planes.append((sql, [fila[3] for fila in cursor.fetchall()]))
+        self.assertTrue(planes, f"{url} no consultó reportes")
+        return respuesta, planes
+
+    def assertUsaIndices(self, url):
+        respuesta, planes = self._planes(url)
+        for sql, detalles in planes:
+            for detalle in detalles:
+                self.assertIsNone(self.FULL_SCAN.match(detalle), f"{url}: {detalle}\n{sql}")
+                if "app_reporte_fts" not in sql:
+                    self.assertNotIn("TEMP B-TREE", detalle, f"{url}: {detalle}\n{sql}")
+        return respuesta
+
+    def _recorrer(self, url, usuario):
+        """Primera página, la siguiente, la anterior y la última con los mismos filtros."""
+        self.client.force_login(usuario)
+        ruta = url.split("?")[0]
+        pagina = self.assertUsaIndices(url).context["page_obj"]
+        self.assertTrue(pagina.has_next(), url)
+        self.assertUsaIndices(f"{ruta}?{pagina.last_querystring}")
+        siguiente = self.assertUsaIndices(f"{ruta}?{pagina.next_querystring}").context["page_obj"]
+        self.assertUsaIndices(f"{ruta}?{siguiente.previous_querystring}")
+
+    def test_admin(self):
+        for filtros in ("", "estado=pendiente", "estado=completado", "prioridad=Alta",
+                        "estado=en_proceso&prioridad=Media", "busqueda=fuga&estado=pendiente"):
+            with self.subTest(filtros=filtros):
+                self._recorrer(f"/administrador/?{filtros}", self.admin)
+
+    def test_mantenimiento(self):
+        for filtros in ("", "estado=en_proceso", "prioridad=Alta", "estado=pausado&prioridad=Baja"):
+            with self.subTest(filtros=filtros):
+                self._recorrer(f"/mantenimiento_dashboard/?{filtros}", self.mantenedor)
+
+    def test_usuario_principal(self):
+        self._recorrer("/usuario_principal/", self.usuario)
+
+    def test_historiales(self):
+        self.client.force_login(self.mantenedor)
+        self.assertUsaIndices(f"/reporte/{self.reporte.pk}/historial/")
+        self.client.force_login(self.admin)
+        self.assertUsaIndices(f"/reporte/{self.reporte.pk}/historial-asignacion/")
+
+
+# ===========================================
+# Reporte.save sin lectura previa
+# ===========================================
+class GuardadoReporteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        cls.mantenedor = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        datos = dict(titulo="Fuga de agua", categoria="Infraestructura", prioridad="Alta",
+                     descripcion="Gotea", imagen="reportes/x.jpg", usuario=cls.usuario)
+        # Otro reporte ya en proceso: las filas de contadores de destino existen
+        Reporte.objects.create(**datos, asignado_a=cls.mantenedor, estado="en_proceso")
+        cls.reporte_id = Reporte.objects.create(**datos, asignado_a=cls.mantenedor).pk
+
+    def _sentencias(self, ctx, tabla):
+        return [q["sql"].split()[0] for q in ctx.captured_queries if f'"{tabla}"' in q["sql"]]
+
+    def test_cambio_de_estado_es_un_update_mas_el_historial(self):
+        reporte = Reporte.objects.get(pk=self.reporte_id)
+        reporte.estado = "en_proceso"
+
+        with CaptureQueriesContext(connection) as ctx:
+            reporte.save(update_fields=["estado", "updated"])
+
+        self.assertEqual(self._sentencias(ctx, "app_reporte"), ["UPDATE"])
+        self.assertEqual(self._sentencias(ctx, "app_historialestado"), ["INSERT"])
+        self.assertEqual(self._sentencias(ctx, "app_contadorestado"), ["UPDATE"])
+        sql = [q["sql"] for q in ctx.captured_queries if q["sql"].split()[0] not in ("SAVEPOINT", "RELEASE")]
+        self.assertEqual(len(sql), 3, sql)
+        self.assertIn("NOT", next(s for s in sql if s.startswith('UPDATE "app_reporte"')))
+
+    def test_guardado_completo_no_relee_el_reporte(self):
+        reporte = Reporte.objects.get(pk=self.reporte_id)
+        reporte.titulo = "Fuga de agua en el baño"
+
+        with CaptureQueriesContext(connection) as ctx:
+            reporte.save()
+
+        self.assertEqual(self._sentencias(ctx, "app_reporte"), ["UPDATE"])
+        self.assertEqual(self._sentencias(ctx, "app_historialestado"), [])
+
+    def test_completado_concurrente_bloquea_el_update(self):
+        reporte = Reporte.objects.get(pk=self.reporte_id)
+        # Otro proceso lo completa después de que lo cargamos
+        Reporte.objects.filter(pk=self.reporte_id).update(estado="completado")
+
+        reporte.estado = "pausado"
+        with self.assertRaises(ValidationError):
+            reporte.save(update_fields=["estado", "updated"])
+
+        self.assertEqual(Reporte.objects.get(pk=self.reporte_id).estado, "completado")
+        self.assertFalse(HistorialEstado.objects.filter(reporte_id=self.reporte_id).exists())
+
+    def test_reasignar_completado_falla_sin_consultar(self):
+        Reporte.objects.filter(pk=self.reporte_id).update(estado="completado")
+        reporte = Reporte.objects.get(pk=self.reporte_id)
+        reporte.asignado_a = None
+
+        with CaptureQueriesContext(connection) as ctx, self.assertRaises(ValidationError):
+            reporte.save()
+
+        self.assertEqual(self._sentencias(ctx, "app_reporte"), [])
+
+    def test_completado_admite_editar_el_texto(self):
+        Reporte.objects.filter(pk=self.reporte_id).update(estado="completado")
+        reporte = Reporte.objects.get(pk=self.reporte_id)
+        reporte.descripcion = "Reparado por el mantenedor"
+        reporte.save()
+
+        self.assertEqual(Reporte.objects.get(pk=self.reporte_id).descripcion, "Reparado por el mantenedor")
+
+
+# ===========================================
+# Asignación masiva
+# ===========================================
+class AsignacionMasivaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.mant1 = Usuario.objects.create_user("mant1", "mant1@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.mant2 = Usuario.objects.create_user("mant2", "mant2@duocuc.cl", "x", nombre_rol="mantenimiento")
+        usuario = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        datos = dict(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                     descripcion="Gotea", imagen="reportes/x.jpg", usuario=usuario)
+        cls.pendientes = [Reporte.objects.create(**datos).pk for _ in range(3)]
+        cls.pausado = Reporte.objects.create(**datos, asignado_a=cls.mant1, estado="pausado").pk
+        cls.completado = Reporte.objects.create(**datos, asignado_a=cls.mant1, estado="completado").pk
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _post(self, ids, asignado_a=""):
+        return self.client.post(reverse("asignar-mantenedor-masivo"), {
+            "ids": ",".join(str(i) for i in ids), "asignado_a": asignado_a,
+        })
+
+    def _contadores_cuadran(self):
+        reales = {}
+        for r in Reporte.objects.all():
+            for ambito, asignado in (("global", None), ("mantenedor" if r.asignado_a_id else "sin_asignar", r.asignado_a_id)):
+                clave = (ambito, asignado, r.estado)
+                reales[clave] = reales.get(clave, 0) + 1
+        guardados = {
+            (c.ambito, c.asignado_a_id, c.estado): c.cantidad
+            for c in ContadorEstado.objects.all() if c.cantidad
+        }
+        self.assertEqual(guardados, reales)
+
+    def test_asigna_en_lote_y_omite_completados(self):
+        ids = [*self.pendientes, self.pausado, self.completado, 999999]
+
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self._post(ids, self.mant2.pk)
+
+        datos = respuesta.json()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(datos["actualizados"], 4)
+        resultados = datos["resultados"]
+        self.assertFalse(resultados[str(self.completado)]["ok"])
+        self.assertFalse(resultados["999999"]["ok"])
+        self.assertEqual(resultados[str(self.pausado)]["estado_slug"], "pausado")
+
+        # Un UPDATE por estado de destino (en_proceso y "conserva"), no uno por reporte
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "app_reporte"')]
+        self.assertEqual(len(updates), 2)
+
+        self.assertEqual(
+            set(Reporte.objects.filter(pk__in=self.pendientes).values_list("estado", "asignado_a_id")),
+            {("en_proceso", self.mant2.pk)},
+        )
+        self.assertEqual(Reporte.objects.get(pk=self.pausado).estado, "pausado")
+        self.assertEqual(Reporte.objects.get(pk=self.completado).asignado_a_id, self.mant1.pk)
+        self.assertEqual(HistorialAsignacion.objects.count(), 4)
+        self.assertEqual(HistorialEstado.objects.filter(estado_nuevo="en_proceso").count(), 3)
+        self._contadores_cuadran()
+
+    def test_desasigna_en_lote(self):
+        self._post(self.pendientes, self.mant1.pk)
+        respuesta = self._post([*self.pendientes, self.pausado], "")
+
+        self.assertEqual(respuesta.json()["actualizados"], 4)
+        self.assertEqual(
+            set(Reporte.objects.filter(pk__in=[*self.pendientes, self.pausado]).values_list("estado", "asignado_a_id", "fecha_asignacion")),
+            {("pendiente", None, None)},
+        )
+        self.assertEqual(HistorialAsignacion.objects.filter(motivo="Desasignación").count(), 4)
+        self._contadores_cuadran()
+
+    def test_sin_cambios_no_escribe(self):
+        self._post(self.pendientes, self.mant1.pk)
+        respuesta = self._post(self.pendientes, self.mant1.pk)
+
+        self.assertEqual(respuesta.json()["actualizados"], 0)
+        self.assertTrue(all(r["sin_cambios"] for r in respuesta.json()["resultados"].values()))
+        self.assertEqual(HistorialAsignacion.objects.count(), 3)
+
+    def test_entradas_invalidas(self):
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self._post(["abc"]).status_code, 400)
+        self.assertEqual(self._post(self.pendientes, self.admin.pk).status_code, 400)
+
+
+# ===========================================
+# Cambios de estado en lote
+# ===========================================
+class CambiosEstadoLoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.otro = Usuario.objects.create_user("otro", "otro@duocuc.cl", "x", nombre_rol="mantenimiento")
+        usuario = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        datos = dict(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                     descripcion="Gotea", imagen="reportes/x.jpg", usuario=usuario, estado="en_proceso")
+        cls.propios = [Reporte.objects.create(**datos, asignado_a=cls.mant).pk for _ in range(3)]
+        cls.ajeno = Reporte.objects.create(**datos, asignado_a=cls.otro).pk
+
+    def setUp(self):
+        self.client.force_login(self.mant)
+
+    def _post(self, cambios):
+        return self.client.post(reverse("actualizar_estados_reportes"), json.dumps(cambios),
+                                content_type="application/json")
+
+    def test_aplica_el_lote_en_orden_de_timestamp(self):
+        a, b, c = self.propios
+        cambios = [
+            {"reporte_id": a, "nuevo_estado": "completado", "client_timestamp": "2026-10-18T10:05:00"},
+            {"reporte_id": a, "nuevo_estado": "pausado", "client_timestamp": "2026-10-18T10:00:00"},
+            {"reporte_id": b, "nuevo_estado": "pausado", "client_timestamp": "2026-10-18T10:01:00"},
+            {"reporte_id": c, "nuevo_estado": "en_proceso", "client_timestamp": "2026-10-18T10:02:00"},
+            {"reporte_id": self.ajeno, "nuevo_estado": "pausado", "client_timestamp": "2026-10-18T10:03:00"},
+            {"reporte_id": b, "nuevo_estado": "inventado"},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self._post(cambios)
+
+        datos = respuesta.json()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([r["success"] for r in datos["resultados"]], [True, True, True, True, False, False])
+        self.assertEqual(datos["contadores"]["completados"], 1)
+        self.assertEqual(datos["contadores"]["pausados"], 1)
+
+        self.assertEqual(Reporte.objects.get(pk=a).estado, "completado")
+        self.assertEqual(Reporte.objects.get(pk=self.ajeno).estado, "en_proceso")
+        self.assertEqual(
+            list(HistorialEstado.objects.filter(reporte_id=a).order_by("id").values_list("estado_anterior", "estado_nuevo")),
+            [("en_proceso", "pausado"), ("pausado", "completado")],
+        )
+        # Una lectura de propiedad, un UPDATE por estado final y un INSERT de historial
+        sql = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(sum(s.startswith('SELECT "app_reporte"') for s in sql), 1)
+        self.assertEqual(sum(s.startswith('UPDATE "app_reporte"') for s in sql), 2)
+        self.assertEqual(sum(s.startswith('INSERT INTO "app_historialestado"') for s in sql), 1)
+
+    def test_orden_por_instante_en_utc(self):
+        a, b, c = self.propios
+        epoch_ms = datetime(2026, 10, 18, 14, 0, tzinfo=ZoneInfo("UTC")).timestamp() * 1000
+        datos = self._post([
+            # 13:00Z con offset, después de las 12:30Z aunque como texto vaya antes
+            {"reporte_id": a, "nuevo_estado": "completado", "client_timestamp": "2026-10-18T10:00:00-03:00"},
+            {"reporte_id": a, "nuevo_estado": "pausado", "client_timestamp": "2026-10-18T12:30:00Z"},
+            # Epoch en ms (14:00Z): después del completado de las 13:30Z
+            {"reporte_id": b, "nuevo_estado": "pausado", "client_timestamp": epoch_ms},
+            {"reporte_id": b, "nuevo_estado": "completado", "client_timestamp": "2026-10-18T13:30:00Z"},
+            # Sin timestamp: detrás del cambio anterior del envío, no al principio
+            {"reporte_id": c, "nuevo_estado": "pausado", "client_timestamp": "2026-10-18T15:00:00Z"},
+            {"reporte_id": c, "nuevo_estado": "en_proceso"},
+        ]).json()
+
+        self.assertEqual([r["success"] for r in datos["resultados"]], [True, True, False, True, True, True])
+        self.assertEqual(
+            dict(Reporte.objects.filter(pk__in=self.propios).values_list("id", "estado")),
+            {a: "completado", b: "completado", c: "en_proceso"},
+        )
+        self.assertEqual(
+            list(HistorialEstado.objects.filter(reporte_id=c).order_by("id").values_list("estado_nuevo", flat=True)),
+            ["pausado", "en_proceso"],
+        )
+
+    def test_instante_cliente(self):
+        utc = ZoneInfo("UTC")
+        esperado = datetime(2026, 10, 18, 13, 0, tzinfo=utc)
+        for valor in ("2026-10-18T13:00:00Z", "2026-10-18T10:00:00-03:00", "2026-10-18T10:00:00",
+                      esperado.timestamp(), esperado.timestamp() * 1000, str(int(esperado.timestamp()))):
+            with self.subTest(valor=valor):
+                self.assertEqual(views._instante_cliente(valor), esperado)
+        for valor in (None, "", "ayer", True, [], 1e300):
+            with self.subTest(valor=valor):
+                self.assertIsNone(views._instante_cliente(valor))
+
+    def test_fila_completada_entre_lectura_y_update(self):
+        a, b, _ = self.propios
+        ContadorEstado.objects.all().delete()
+        call_command("reconciliar_contadores", stdout=io.StringIO())
+
+        hecho = []
+
+        def otro_proceso(execute, sql, params, many, context):
+            # Entre la lectura de los estados y el primer UPDATE del lote, otro proceso completa b
+            if sql.startswith('UPDATE "app_reporte"') and not hecho:
+                hecho.append(sql)
+                Reporte.objects.filter(pk=b).update(estado="completado")
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(otro_proceso):
+            datos = self._post([
+                {"reporte_id": a, "nuevo_estado": "pausado"},
+                {"reporte_id": b, "nuevo_estado": "pausado"},
+            ]).json()
+
+        self.assertEqual([r["success"] for r in datos["resultados"]], [True, False])
+        self.assertIn("completado", datos["resultados"][1]["error"])
+        self.assertEqual(list(HistorialEstado.objects.values_list("reporte_id", flat=True)), [a])
+        # Los contadores solo movieron a (el completado de b no pasó por Reporte.save)
+        self.assertEqual(datos["contadores"]["pausados"], 1)
+        self.assertEqual(datos["contadores"]["en_proceso"], 2)
+
+    def test_completado_no_se_reabre(self):
+        a = self.propios[0]
+        self._post([{"reporte_id": a, "nuevo_estado": "completado"}])
+        datos = self._post([{"reporte_id": a, "nuevo_estado": "pausado"}]).json()
+
+        self.assertFalse(datos["resultados"][0]["success"])
+        self.assertEqual(Reporte.objects.get(pk=a).estado, "completado")
+
+    def test_cuerpo_invalido(self):
+        self.assertEqual(self._post({"cambios": []}).status_code, 400)
+        respuesta = self.client.post(reverse("actualizar_estados_reportes"), "no json",
+                                     content_type="application/json")
+        self.assertEqual(respuesta.status_code, 400)
+
+
+# ===========================================
+# Miniaturas de imágenes
+# ===========================================
+def _png(ancho, alto):
+    salida = io.BytesIO()
+    Image.new("RGBA", (ancho, alto), (200, 30, 30, 128)).save(salida, "PNG")
+    return SimpleUploadedFile("foto.png", salida.getvalue(), content_type="image/png")
+
+
+class VariantesImagenTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.ajustes = override_settings(MEDIA_ROOT=cls.media, IMAGENES_PROCESOS=0)
+        cls.ajustes.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+
+    def _crear(self):
+        return Reporte.objects.create(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                                      descripcion="Gotea", imagen=_png(2000, 1500), usuario=self.usuario)
+
+    def _render(self, reporte):
+        return Template('{% load imagenes_reporte %}{% imagen_reporte r "miniatura" class="m" %}') \
+            .render(Context({"r": reporte}))
+
+    def test_usa_el_original_hasta_que_esten_las_variantes(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            reporte = self._crear()
+
+        self.assertFalse(reporte.variantes_listas)
+        self.assertEqual(reporte.imagen_miniatura_url, reporte.imagen.url)
+        self.assertIn(f'src="{reporte.imagen.url}"', self._render(reporte))
+
+    def test_genera_las_variantes_despues_del_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reporte = self._crear()
+        reporte.refresh_from_db()
+
+        self.assertTrue(reporte.variantes_listas)
+        for variante, lado in imagenes.VARIANTES.items():
+            for formato in imagenes.FORMATOS:
+                nombre = imagenes.nombre_variante(reporte.imagen.name, variante, formato)
+                with default_storage.open(nombre) as archivo, Image.open(archivo) as img:
+                    self.assertEqual(max(img.size), lado)
+        html = self._render(reporte)
+        self.assertIn('type="image/webp"', html)
+        self.assertIn("miniatura.jpg", html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_el_etag_del_listado_cambia_con_las_variantes(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            reporte = self._crear()
+        self.client.force_login(self.usuario)
+        url = reverse("usuario_principal")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        imagenes.generar(reporte.pk, reporte.imagen.name)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "miniatura")
+
+    def test_cambios_de_estado_no_regeneran(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reporte = self._crear()
+        reporte.refresh_from_db()
+        reporte.estado = "en_proceso"
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            reporte.save(update_fields=["estado", "updated"])
+        # Solo el evento en vivo del cambio de estado, nada de variantes
+        self.assertFalse([c for c in callbacks if getattr(c, "func", None) is imagenes.encolar])
+        self.assertEqual(len(callbacks), 1)
+
+    def test_backfill_en_pool(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            reporte = self._crear()
+
+        call_command("generar_variantes", procesos=1, stdout=io.StringIO())
+
+        reporte.refresh_from_db()
+        self.assertTrue(reporte.variantes_listas)
+
+
+# ===========================================
+# Ingesta de imágenes subidas
+# ===========================================
+def _jpeg_con_exif(ancho, alto, orientacion=6):
+    exif = Image.Exif()
+    exif[0x0112] = orientacion           # Orientation
+    exif[0x010F] = "Telefono de prueba"  # Make
+    salida = io.BytesIO()
+    Image.new("RGB", (ancho, alto), "navy").save(salida, "JPEG", exif=exif)
+    return SimpleUploadedFile("foto.jpg", salida.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(IMAGEN_LADO_MAXIMO=1920, IMAGEN_MAX_PIXELES=30_000_000)
+class IngestaImagenTests(TestCase):
+
+    def _subir(self, nombre_campo, contenido, nombre="foto.jpg"):
+        request = RequestFactory().post("/", {nombre_campo: SimpleUploadedFile(nombre, contenido)})
+        return request.FILES[nombre_campo]
+
+    def test_reduce_rota_y_quita_exif(self):
+        archivo = ImagenReporteField().clean(_jpeg_con_exif(4000, 3000))
+
+        with Image.open(archivo) as img:
+            # Orientación 6 = rotar 90°: la foto apaisada queda vertical
+            self.assertEqual(img.size, (1440, 1920))
+            self.assertEqual(len(img.getexif()), 0)
+        self.assertEqual(archivo.content_type, "image/jpeg")
+
+    def test_imagen_chica_no_se_agranda(self):
+        archivo = ImagenReporteField().clean(_png(300, 200))
+        with Image.open(archivo) as img:
+            self.assertEqual((img.format, img.size), ("PNG", (300, 200)))
+
+    @override_settings(IMAGEN_MAX_PIXELES=1_000_000)
+    def test_rechaza_demasiados_pixeles(self):
+        with self.assertRaisesMessage(ValidationError, "megapíxeles"):
+            ImagenReporteField().clean(_png(1200, 1000))
+
+    def test_rechaza_lo_que_no_es_imagen(self):
+        falso = SimpleUploadedFile("foto.jpg", b"GIF89a no realmente" * 10, content_type="image/jpeg")
+        with self.assertRaises(ValidationError):
+            ImagenReporteField().clean(falso)
+
+    def test_handler_corta_los_archivos_grandes(self):
+        # Cabecera válida: el corte es por tamaño, no por formato
+        archivo = self._subir("imagen", _jpeg_con_exif(800, 600).read() + b"0" * (6 * 1024 * 1024))
+
+        self.assertEqual(archivo.size, 0)
+        self.assertIn("5MB", archivo.error_subida)
+        with self.assertRaisesMessage(ValidationError, "5MB"):
+            ImagenReporteField().clean(archivo)
+
+    def test_handler_valida_la_cabecera(self):
+        self.assertIsNotNone(self._subir("imagen", b"%PDF-1.7" + b"0" * 200_000).error_subida)
+
+        foto = _jpeg_con_exif(800, 600)
+        archivo = self._subir("imagen", foto.read())
+        self.assertIsNone(archivo.error_subida)
+        self.assertEqual(archivo.size, foto.size)
+
+    def test_otros_campos_siguen_con_los_handlers_de_django(self):
+        archivo = self._subir("adjunto", b"hola", nombre="nota.txt")
+        self.assertFalse(hasattr(archivo, "error_subida"))
+        self.assertEqual(archivo.read(), b"hola")
+
+
+# ===========================================
+# Almacenamiento por contenido y gc_imagenes
+# ===========================================
+class AlmacenamientoPorContenidoTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.ajustes = override_settings(MEDIA_ROOT=cls.media, IMAGENES_PROCESOS=0)
+        cls.ajustes.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        self.storage = almacenamiento.storage_imagenes()
+
+    def _crear(self, imagen):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reporte.objects.create(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                                          descripcion="Gotea", imagen=imagen, usuario=self.usuario)
+
+    def _gc(self, *args):
+        call_command("gc_imagenes", "--gracia", "0", *args, stdout=io.StringIO())
+
+    def test_la_misma_foto_se_guarda_una_vez(self):
+        with mock.patch("app.almacenamiento.tempfile.mkstemp", wraps=tempfile.mkstemp) as escrituras:
+            a = self._crear(_png(400, 300))
+            b = self._crear(_png(400, 300))
+            c = self._crear(_png(300, 400))
+
+        self.assertEqual(a.imagen.name, b.imagen.name)
+        self.assertNotEqual(a.imagen.name, c.imagen.name)
+        self.assertTrue(almacenamiento.es_nombre_por_contenido(a.imagen.name))
+        self.assertEqual(escrituras.call_count, 2)
+        self.assertEqual(ArchivoImagen.objects.get(nombre=a.imagen.name).referencias, 2)
+        # La segunda copia reutiliza también las variantes
+        b.refresh_from_db()
+        self.assertTrue(b.variantes_listas)
+
+    def test_gc_borra_solo_lo_que_nadie_usa(self):
+        a = self._crear(_png(400, 300))
+        b = self._crear(_png(400, 300))
+        nombre = a.imagen.name
+        variante = imagenes.nombre_variante(nombre, "miniatura", "webp")
+
+        a.delete()
+        self._gc()
+        self.assertTrue(self.storage.exists(nombre))
+
+        b.delete()
+        self.assertEqual(ArchivoImagen.objects.get(nombre=nombre).referencias, 0)
+        self._gc()
+        self.assertFalse(self.storage.exists(nombre))
+        self.assertFalse(default_storage.exists(variante))
+        self.assertFalse(ArchivoImagen.objects.filter(nombre=nombre).exists())
+
+    def test_cambiar_la_imagen_libera_la_anterior(self):
+        reporte = self._crear(_png(400, 300))
+        anterior = reporte.imagen.name
+        reporte.imagen = _png(200, 100)
+        reporte.save()
+
+        self.assertEqual(ArchivoImagen.objects.get(nombre=anterior).referencias, 0)
+        self.assertEqual(ArchivoImagen.objects.get(nombre=reporte.imagen.name).referencias, 1)
+
+    def test_gc_recoge_archivos_sin_fila_y_respeta_referencias_sin_contar(self):
+        # Archivo escrito por una subida cuya transacción se revirtió
+        huerfano = self.storage.save("reportes/x.png", _png(10, 10))
+        # Reporte creado con bulk_create: no pasa por Reporte.save
+        usado = self.storage.save("reportes/y.png", _png(20, 20))
+        Reporte.objects.bulk_create([Reporte(titulo="Masivo", categoria="Limpieza", prioridad="Baja",
+                                             descripcion="x", imagen=usado, usuario=self.usuario)])
+
+        self._gc()
+
+        self.assertFalse(self.storage.exists(huerfano))
+        self.assertTrue(self.storage.exists(usado))
+
+        self._gc("--reconciliar")
+        self.assertEqual(ArchivoImagen.objects.get(nombre=usado).referencias, 1)
+
+
+# ===========================================
+# Árbol de ubicaciones en caché
+# ===========================================
+class UbicacionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        cls.edificio = Edificio.objects.create(nombre="Edificio A", codigo="a")
+        cls.piso = Piso.objects.create(edificio=cls.edificio, numero=1, etiqueta="Zócalo")
+        cls.sala = Sala.objects.create(piso=cls.piso, codigo="A101", nombre="Laboratorio")
+        otro = Edificio.objects.create(nombre="Edificio B", codigo="b")
+        cls.otro_piso = Piso.objects.create(edificio=otro, numero=2)
+        cls.otra_sala = Sala.objects.create(piso=cls.otro_piso, codigo="B201", nombre="Aula")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def test_arbol_compacto(self):
+        response = self.client.get(reverse("api-ubicaciones"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        datos = json.loads(response.content)
+        self.assertEqual(datos["edificios"][0], [
+            self.edificio.pk, "Edificio A", "a",
+            [[self.piso.pk, 1, "Zócalo", [[self.sala.pk, "A101", "Laboratorio"]]]],
+        ])
+        self.assertEqual(len(datos["edificios"]), 2)
+
+    def test_revalidacion_responde_304_sin_consultas(self):
+        url = reverse("api-ubicaciones")
+        etag = self.client.get(url)["ETag"]
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in consultas if re.search(r"app_(edificio|piso|sala)", q["sql"])])
+
+    def test_guardar_o_borrar_invalida(self):
+        url = reverse("api-ubicaciones")
+        etag = self.client.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Sala.objects.create(piso=self.piso, codigo="A102", nombre="Bodega")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("A102", response.content.decode())
+
+        etag = response["ETag"]
+        self.otra_sala.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("B201", response.content.decode())
+
+    def test_formulario_sin_consultas_de_piso_ni_sala(self):
+        ubicaciones.arbol()
+        reporte = Reporte(pk=1, sala_id=self.sala.pk)
+        with CaptureQueriesContext(connection) as consultas:
+            html = ReporteForm(instance=reporte).as_p()
+        self.assertFalse([q for q in consultas if re.search(r"app_(edificio|piso|sala)", q["sql"])])
+        self.assertIn(f'<option value="{self.piso.pk}" selected>', html)
+        self.assertIn("A101 — A", html)
+        self.assertNotIn("B201", html)
+
+    def test_formulario_rechaza_sala_de_otro_piso(self):
+        datos = {"edificio": self.edificio.pk, "piso": self.piso.pk, "sala": self.otra_sala.pk}
+        form = ReporteForm(data=datos)
+        form.is_valid()
+        self.assertIn("sala", form.errors)
+
+        datos = {"edificio": self.edificio.pk, "piso": self.otro_piso.pk, "sala": self.otra_sala.pk}
+        form = ReporteForm(data=datos)
+        form.is_valid()
+        self.assertIn("piso", form.errors)
+
+
+# ===========================================
+# Usuario autenticado en caché
+# ===========================================
+class UsuarioCacheadoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mantenedor = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.mantenedor)
+        self.url = reverse("mantenimiento")
+
+    def _consultas_usuario(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        return response, [q for q in consultas if 'FROM "app_usuario"' in q["sql"]
+                          and '"app_usuario"."id" = ' in q["sql"] and "JOIN" not in q["sql"]]
+
+    def test_segunda_peticion_no_lee_usuario(self):
+        self._consultas_usuario()
+        response, consultas = self._consultas_usuario()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, [])
+
+    def test_cambio_de_rol_rige_al_tiro(self):
+        self._consultas_usuario()
+        self.mantenedor.nombre_rol = "usuario"
+        self.mantenedor.save()
+        response, _ = self._consultas_usuario()
+        self.assertRedirects(response, reverse("usuario_principal"), fetch_redirect_response=False)
+
+    def test_desactivar_deja_fuera_al_usuario(self):
+        self._consultas_usuario()
+        Usuario.objects.filter(pk=self.mantenedor.pk).update(is_active=False)
+        # Sin signal la foto sigue vigente hasta que alguien invalida
+        self.assertEqual(self._consultas_usuario()[0].status_code, 200)
+        self.mantenedor.is_active = False
+        self.mantenedor.save()
+        response, _ = self._consultas_usuario()
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_cambio_de_contrasena_invalida_otras_sesiones(self):
+        self._consultas_usuario()
+        self.mantenedor.set_password("nueva")
+        self.mantenedor.save()
+        response, _ = self._consultas_usuario()
+        self.assertEqual(response.status_code, 302)
+
+    def test_foto_sirve_como_usuario(self):
+        self._consultas_usuario()
+        user = self.client.get(self.url).wsgi_request.user
+        self.assertIsInstance(user._wrapped, Usuario)
+        self.assertEqual(user.nombre_rol, "mantenimiento")
+        # Los campos fuera de la foto se cargan al pedirlos
+        self.assertEqual(user.date_joined, self.mantenedor.date_joined)
+
+
+# ===========================================
+# Login por correo (EmailBackend)
+# ===========================================
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class AutenticacionEmailTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user("ana", "Ana.Perez@duocuc.cl", "clave")
+
+    def _autenticar(self, email, password):
+        with mock.patch.object(MD5PasswordHasher, "encode", autospec=True,
+                               side_effect=MD5PasswordHasher.encode) as hashes, \
+                CaptureQueriesContext(connection) as consultas:
+            user = authenticate(None, email=email, password=password)
+        return user, hashes.call_count, len(consultas)
+
+    def test_una_consulta_sin_importar_mayusculas(self):
+        user, hashes, consultas = self._autenticar("  ana.perez@DUOCUC.cl ", "clave")
+        self.assertEqual(user, self.usuario)
+        self.assertEqual((hashes, consultas), (1, 1))
+
+    def test_un_hash_por_intento_aunque_no_exista(self):
+        for email, password in [("ana.perez@duocuc.cl", "mala"), ("nadie@duocuc.cl", "clave")]:
+            user, hashes, _ = self._autenticar(email, password)
+            self.assertIsNone(user)
+            self.assertEqual(hashes, 1)
+
+    def test_usuario_inactivo_no_entra(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        self.assertIsNone(self._autenticar("ana.perez@duocuc.cl", "clave")[0])
+
+    def test_correo_unico_sin_importar_mayusculas(self):
+        with self.assertRaises(IntegrityError):
+            Usuario.objects.create_user("otra", "ANA.PEREZ@duocuc.cl", "x")
+
+    def test_busqueda_usa_el_indice(self):
+        sql, params = Usuario.objects.por_email("ana.perez@duocuc.cl").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " ".join(fila[-1] for fila in cursor.fetchall())
+        self.assertIn("usuario_email_lower_uniq", plan)
+
+    def test_login_view(self):
+        response = self.client.post(reverse("login"), {"email": "ANA.PEREZ@duocuc.cl", "password": "clave"})
+        self.assertRedirects(response, reverse("usuario_principal"), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session["_auth_user_id"]), self.usuario.pk)
+
+
+# ===========================================
+# Eventos en vivo (SSE)
+# ===========================================
+class EventosEnVivoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.otro = Usuario.objects.create_user("otro", "otro@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+
+    def setUp(self):
+        self.broker = eventos.BrokerEnMemoria()
+        parche = mock.patch.object(eventos, "_broker", self.broker)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _publicados(self):
+        return [evento for _, evento in self.broker._historial]
+
+    def _crear(self, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reporte.objects.create(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                                          descripcion="Gotea", imagen="", usuario=self.alumno, **extra)
+
+    def test_guardar_publica_despues_del_commit(self):
+        reporte = self._crear()
+        reporte.asignado_a = self.mant
+        reporte.estado = "en_proceso"
+        with self.captureOnCommitCallbacks() as callbacks:
+            reporte.save(update_fields=["asignado_a", "estado", "updated"])
+            self.assertEqual(len(self._publicados()), 1)
+        for callback in callbacks:
+            callback()
+
+        creado, actualizado = self._publicados()
+        self.assertEqual((creado["tipo"], creado["id"], creado["antes"]), ("creado", reporte.pk, None))
+        self.assertEqual(actualizado["antes"], {"asignado_a": None, "estado": "pendiente"})
+        self.assertEqual((actualizado["asignado_a"], actualizado["estado"]), (self.mant.pk, "en_proceso"))
+
+        # Cambios que no tocan estado ni asignación no generan eventos
+        reporte.titulo = "Fuga grande"
+        with self.captureOnCommitCallbacks(execute=True):
+            reporte.save(update_fields=["titulo"])
+        self.assertEqual(len(self._publicados()), 2)
+
+    def test_asignacion_masiva_publica_un_evento_por_reporte(self):
+        a, b = self._crear(), self._crear()
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("asignar-mantenedor-masivo"), {"ids": f"{a.pk},{b.pk}", "asignado_a": self.mant.pk})
+
+        actualizados = [e for e in self._publicados() if e["tipo"] == "actualizado"]
+        self.assertEqual({e["id"] for e in actualizados}, {a.pk, b.pk})
+        self.assertTrue(all(e["asignado_a"] == self.mant.pk and e["fecha_asignacion"] for e in actualizados))
+
+    def test_lote_de_estados_publica_solo_lo_que_cambio(self):
+        a, b = self._crear(asignado_a=self.mant, estado="en_proceso"), self._crear(asignado_a=self.mant, estado="en_proceso")
+        hecho = []
+
+        def otro_proceso(execute, sql, params, many, context):
+            # Otro proceso completa b entre la lectura y el UPDATE del lote
+            if sql.startswith('UPDATE "app_reporte"') and not hecho:
+                hecho.append(sql)
+                Reporte.objects.filter(pk=b.pk).update(estado="completado")
+            return execute(sql, params, many, context)
+
+        self.client.force_login(self.mant)
+        with self.captureOnCommitCallbacks(execute=True), connection.execute_wrapper(otro_proceso):
+            self.client.post(reverse("actualizar_estados_reportes"), json.dumps([
+                {"reporte_id": a.pk, "nuevo_estado": "pausado"},
+                {"reporte_id": b.pk, "nuevo_estado": "pausado"},
+            ]), content_type="application/json")
+
+        actualizados = [e for e in self._publicados() if e["tipo"] == "actualizado"]
+        self.assertEqual([(e["id"], e["estado"]) for e in actualizados], [(a.pk, "pausado")])
+
+    def test_visible_por_rol_y_mantenedor(self):
+        reasignado = eventos.evento("actualizado", 1, (self.mant.pk, "pausado"), (self.otro.pk, "pausado"))
+        ajeno = eventos.evento("actualizado", 2, (None, "pendiente"), (self.otro.pk, "en_proceso"))
+        self.assertTrue(eventos.visible_para(ajeno, self.admin))
+        self.assertTrue(eventos.visible_para(reasignado, self.mant))
+        self.assertFalse(eventos.visible_para(ajeno, self.mant))
+        self.assertFalse(eventos.visible_para(ajeno, self.alumno))
+
+    async def test_reconexion_con_last_event_id(self):
+        for i in range(3):
+            self.broker.publicar({"tipo": "creado", "n": i})
+        escucha = self.broker.escuchar(ultimo_id=1, latido=0.01)
+        self.assertEqual([(await anext(escucha))[1]["n"] for _ in range(2)], [1, 2])
+        self.assertIsNone(await anext(escucha))
+        await escucha.aclose()
+
+        # Más antiguo que el historial (o de otro proceso): hay que recargar
+        escucha = self.broker.escuchar(ultimo_id=99)
+        self.assertIs((await anext(escucha))[1], eventos.RECARGAR)
+        with self.assertRaises(StopAsyncIteration):
+            await anext(escucha)
+        self.assertEqual(self.broker._suscripciones, set())
+
+    async def test_stream_asgi_filtrado(self):
+        await self.async_client.aforce_login(self.mant)
+        response = await self.async_client.get(reverse("eventos-dashboard"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        flujo = aiter(response.streaming_content)
+        self.assertEqual(await anext(flujo), b"retry: 5000\n\n")
+
+        lectura = asyncio.ensure_future(anext(flujo))
+        await asyncio.sleep(0)
+        self.broker.publicar(eventos.evento("actualizado", 1, (None, "pendiente"), (self.otro.pk, "en_proceso")))
+        self.broker.publicar(eventos.evento("actualizado", 2, (None, "pendiente"), (self.mant.pk, "en_proceso")))
+        trozo = (await asyncio.wait_for(lectura, 5)).decode()
+        self.assertTrue(trozo.startswith("id: 2\nevent: actualizado\ndata: "))
+        self.assertEqual(json.loads(trozo.split("data: ")[1])["id"], 2)
+        await response.streaming_content.aclose()
+
+    def test_wsgi_responde_204(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse("eventos-dashboard")).status_code, 204)
+
+
+# ===========================================
+# Endpoints JSON async (app.vistas_async)
+@override_settings(TIEMPOS_LENTO_MS=None)
+class EscrituraConcurrenteTests(TransactionTestCase):
+    """
+    Otro mantenedor cambia el reporte justo después de que la vista lo lee. La lectura
+    va dentro de la transacción de escritura, así que el otro espera a que la vista
+    termine (SQLite: BEGIN IMMEDIATE; PostgreSQL: FOR UPDATE) y no la deja con un
+    estado anterior viejo.
+    """
+
+    def setUp(self):
+        self.mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        self.alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        cache.clear()
+
+    def _otro_mantenedor(self, pk):
+        def pausar():
+            try:
+                while True:
+                    try:
+                        with bd.escritura():
+                            reporte = Reporte.objects.select_for_update().get(pk=pk)
+                            reporte.estado = "pausado"
+                            reporte.save(update_fields=["estado", "updated"])
+                        return
+                    except OperationalError:
+                        # SQLite: la vista tiene el candado de escritura
+                        time.sleep(0.01)
+                    except ValidationError:
+                        return  # ya estaba completado
+            finally:
+                connection.close()
+        return threading.Thread(target=pausar)
+
+    def test_lectura_dentro_de_la_transaccion(self):
+        for urlconf in (UrlsSync, UrlsAsync):
+            with self.subTest(vista=urlconf.__name__), override_settings(ROOT_URLCONF=urlconf):
+                reporte = Reporte.objects.create(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                                                 descripcion="Gotea", imagen="", usuario=self.alumno,
+                                                 asignado_a=self.mant, estado="en_proceso")
+                hilo = self._otro_mantenedor(reporte.pk)
+                leido = []
+
+                def entre_lectura_y_escritura(execute, sql, params, many, context):
+                    # Con la lectura ya consumida, antes de la sentencia siguiente
+                    if leido and hilo.ident is None:
+                        hilo.start()
+                        hilo.join(0.5)
+                    if 'FROM "app_reporte"' in sql:
+                        leido.append(sql)
+                    return execute(sql, params, many, context)
+
+                self.client.force_login(self.mant)
+                with connection.execute_wrapper(entre_lectura_y_escritura):
+                    response = self.client.post(reverse("actualizar_estado_reporte"),
+                                                {"reporte_id": reporte.pk, "nuevo_estado": "completado"})
+                hilo.join(10)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(Reporte.objects.get(pk=reporte.pk).estado, "completado")
+                self.assertEqual(
+                    list(HistorialEstado.objects.filter(reporte=reporte).values_list("estado_anterior", "estado_nuevo")),
+                    [("en_proceso", "completado")],
+                )
+                salida = io.StringIO()
+                call_command("reconciliar_contadores", "--solo-verificar", stdout=salida)
+                self.assertIn("sin diferencias", salida.getvalue())
+
+
+# ===========================================
+class UrlsSync:
+    urlpatterns = [path("", include(con_vistas(views)))]
+
+
+class UrlsAsync:
+    urlpatterns = [path("", include(con_vistas(vistas_async)))]
+
+
+@override_settings(ROOT_URLCONF=UrlsAsync)
+class VistasAsyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento",
+                                               first_name="Ana", last_name="Soto")
+        cls.alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        edificio = Edificio.objects.create(nombre="Edificio A", codigo="a")
+        cls.piso = Piso.objects.create(edificio=edificio, numero=1)
+        Sala.objects.create(piso=cls.piso, codigo="A101", nombre="Laboratorio")
+        cls.edificio = edificio
+        cls.reportes = [
+            Reporte.objects.create(titulo=f"Fuga {i}", categoria="Infraestructura", prioridad="Alta",
+                                   descripcion="Gotea", imagen="", usuario=cls.alumno, asignado_a=cls.mant)
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def _ambas(self, user, metodo, nombre, datos=None, args=None):
+        """La misma petición contra la vista síncrona y la async; datos puede ser una lista (una por vista)."""
+        self.client.force_login(user)
+        respuestas = []
+        for i, urlconf in enumerate((UrlsSync, UrlsAsync)):
+            with override_settings(ROOT_URLCONF=urlconf):
+                url = reverse(nombre, args=args[i] if args else None)
+                respuestas.append(getattr(self.client, metodo)(url, datos[i] if isinstance(datos, list) else datos))
+        return respuestas
+
+    def test_mismas_respuestas_que_las_sincronas(self):
+        sync, asinc = self._ambas(self.alumno, "get", "cargar-pisos", {"edificio_id": self.edificio.pk})
+        self.assertEqual((sync.status_code, sync.json()), (asinc.status_code, asinc.json()))
+        self.assertEqual(len(asinc.json()["pisos"]), 1)
+
+        sync, asinc = self._ambas(self.alumno, "get", "cargar-salas", {"piso_id": "x"})
+        self.assertEqual(sync.json(), asinc.json())
+
+        sync, asinc = self._ambas(self.mant, "get", "contadores-dashboard")
+        self.assertEqual(sync.json(), asinc.json())
+
+        a, b = self.reportes
+        sync, asinc = self._ambas(self.mant, "post", "actualizar_estado_reporte", [
+            {"reporte_id": a.pk, "nuevo_estado": "en_proceso"},
+            {"reporte_id": b.pk, "nuevo_estado": "en_proceso"},
+        ])
+        self.assertEqual(asinc.status_code, 200)
+        self.assertEqual({**sync.json(), "reporte_id": None, "contadores": None},
+                         {**asinc.json(), "reporte_id": None, "contadores": None})
+        self.assertEqual(asinc.json()["contadores"]["en_proceso"], 2)
+
+        sync, asinc = self._ambas(self.admin, "post", "asignar-mantenedor", {"asignado_a": ""},
+                                  args=[[a.pk], [b.pk]])
+        self.assertEqual({**sync.json(), "reporte_id": None}, {**asinc.json(), "reporte_id": None})
+        self.assertEqual(HistorialAsignacion.objects.filter(reporte=b).count(), 1)
+
+    def test_errores_con_los_mismos_codigos(self):
+        completado = self.reportes[0]
+        Reporte.objects.filter(pk=completado.pk).update(estado="completado")
+        sync, asinc = self._ambas(self.admin, "post", "asignar-mantenedor", {"asignado_a": self.mant.pk},
+                                  args=[[completado.pk]] * 2)
+        self.assertEqual((sync.status_code, asinc.status_code), (409, 409))
+
+        sync, asinc = self._ambas(self.admin, "post", "asignar-mantenedor", {"asignado_a": "abc"},
+                                  args=[[self.reportes[1].pk]] * 2)
+        self.assertEqual((sync.status_code, asinc.status_code), (400, 400))
+
+        sync, asinc = self._ambas(self.admin, "post", "asignar-mantenedor", {}, args=[[999]] * 2)
+        self.assertEqual((sync.status_code, asinc.status_code), (404, 404))
+
+        sync, asinc = self._ambas(self.mant, "post", "actualizar_estado_reporte",
+                                  {"reporte_id": self.reportes[1].pk, "nuevo_estado": "volando"})
+        self.assertEqual((sync.json(), asinc.status_code), (asinc.json(), 400))
+
+    async def test_roles_por_asgi(self):
+        await self.async_client.aforce_login(self.alumno)
+        response = await self.async_client.post(reverse("asignar-mantenedor", args=[self.reportes[0].pk]))
+        self.assertRedirects(response, reverse("usuario_principal"), fetch_redirect_response=False)
+        response = await self.async_client.get(reverse("contadores-dashboard"))
+        self.assertEqual(response.status_code, 403)
+
+        await self.async_client.aforce_login(self.mant)
+        response = await self.async_client.get(reverse("cargar-pisos"))
+        self.assertRedirects(response, reverse("mantenimiento"), fetch_redirect_response=False)
+
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse("contadores-dashboard"))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("next=", response["Location"])
+
+    def test_usuario_en_cache_tambien_por_asgi(self):
+        # Síncrono para poder capturar consultas; el cliente async sigue pasando por ASGI
+        async_to_sync(self.async_client.aforce_login)(self.mant)
+        url = reverse("contadores-dashboard")
+        async_to_sync(self.async_client.get)(url)
+        with CaptureQueriesContext(connection) as consultas:
+            response = async_to_sync(self.async_client.get)(url)
+        self.assertEqual(response.json()["contadores"]["total"], 2)
+        self.assertFalse([q for q in consultas if 'FROM "app_usuario"' in q["sql"] and "JOIN" not in q["sql"]])
+
+
+# ===========================================
+# GET condicional de dashboards e historiales
+# ===========================================
+class PaginaCondicionalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        edificio = Edificio.objects.create(nombre="Edificio A", codigo="a")
+        cls.sala = Sala.objects.create(piso=Piso.objects.create(edificio=edificio, numero=1), codigo="A101")
+        estados = ["pendiente", "en_proceso", "pausado"]
+        Reporte.objects.bulk_create([
+            Reporte(titulo=f"Fuga {i}", categoria="Infraestructura", prioridad=["Alta", "Baja"][i % 2],
+                    estado=estados[i % 3], descripcion="Gotea", imagen="", usuario=cls.alumno,
+                    sala=cls.sala, asignado_a=cls.mant)
+            for i in range(24)
+        ])
+        busqueda.reconstruir_indice()
+
+    def setUp(self):
+        cache.clear()
+
+    def _revalidar(self, url, etag):
+        """(respuesta, consultas a Reporte) de un GET con If-None-Match."""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, [q["sql"] for q in consultas if '"app_reporte"' in q["sql"]]
+
+    def _cambiar(self, reporte, **campos):
+        for campo, valor in campos.items():
+            setattr(reporte, campo, valor)
+        with self.captureOnCommitCallbacks(execute=True):
+            reporte.save()
+
+    def test_304_sin_renderizar_ni_consultar_la_pagina(self):
+        self.client.force_login(self.mant)
+        url = reverse("mantenimiento")
+        primera = self.client.get(url)
+        self.assertEqual(primera.status_code, 200)
+        self.assertIn("no-cache", primera["Cache-Control"])
+        self.assertTrue(primera.has_header("Last-Modified"))
+
+        response, consultas = self._revalidar(url, primera["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+        # Solo la sonda: un aggregate, sin la página ni los contadores
+        self.assertEqual(len(consultas), 1)
+        self.assertIn("MAX(", consultas[0])
+
+    def test_combinaciones_de_filtros(self):
+        self.client.force_login(self.mant)
+        url = reverse("mantenimiento")
+        filtros = ["", "?estado=pendiente", "?prioridad=Alta", "?estado=pausado&prioridad=Baja",
+                   "?busqueda=fuga&estado=en_proceso"]
+        etags = {f: self.client.get(url + f)["ETag"] for f in filtros}
+        self.assertEqual(len(set(etags.values())), len(filtros))
+
+        # Un reporte que pasa de en_proceso a pausado con prioridad Alta
+        reporte = Reporte.objects.filter(estado="en_proceso", prioridad="Alta").first()
+        self._cambiar(reporte, estado="pausado")
+        esperado = {
+            "": 200,
+            "?estado=pendiente": 304,                   # nunca estuvo en el filtro
+            "?prioridad=Alta": 200,                     # sigue en el filtro, con otro estado
+            "?estado=pausado&prioridad=Baja": 304,      # es Alta: no entra
+            "?busqueda=fuga&estado=en_proceso": 200,    # sale del filtro
+        }
+        for f, codigo in esperado.items():
+            with self.subTest(filtros=f):
+                self.assertEqual(self._revalidar(url + f, etags[f])[0].status_code, codigo)
+
+    def test_paginacion(self):
+        self.client.force_login(self.mant)
+        url = reverse("mantenimiento")
+        primera = self.client.get(url)
+        url_siguiente = f"{url}?{primera.context['page_obj'].next_querystring}"
+        segunda = self.client.get(url_siguiente)
+        self.assertNotEqual(primera["ETag"], segunda["ETag"])
+        self.assertEqual(self._revalidar(url_siguiente, segunda["ETag"])[0].status_code, 304)
+
+        # Un reporte borrado no mueve Max(updated), pero sí el conteo
+        Reporte.objects.filter(asignado_a=self.mant).order_by("created").first().delete()
+        self.assertEqual(self._revalidar(url_siguiente, segunda["ETag"])[0].status_code, 200)
+
+    def test_usuario_principal_y_ubicaciones(self):
+        self.client.force_login(self.alumno)
+        url = reverse("usuario_principal")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self._revalidar(url, etag)[0].status_code, 304)
+
+        # El nombre de la sala sale en la página
+        self.sala.nombre = "Laboratorio"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sala.save()
+        self.assertEqual(self._revalidar(url, etag)[0].status_code, 200)
+
+        # Mismo contenido, otro usuario: otro ETag
+        otro = Usuario.objects.create_user("otro", "otro@duocuc.cl", "x")
+        self.client.force_login(otro)
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
+
+    def test_historiales(self):
+        reporte = Reporte.objects.filter(estado="pendiente").first()
+        self.client.force_login(self.mant)
+        url = reverse("ver_historial_reporte", args=[reporte.pk])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self._revalidar(url, etag)[0].status_code, 304)
+        self._cambiar(reporte, estado="en_proceso")
+        self.assertEqual(self._revalidar(url, etag)[0].status_code, 200)
+
+        # Reporte ajeno: la sonda no responde y la vista da 404
+        self.client.force_login(self.alumno)
+        ajeno = Reporte.objects.create(titulo="Otro", categoria="Infraestructura", prioridad="Alta",
+                                       descripcion="-", imagen="", usuario=self.admin)
+        response = self.client.get(reverse("ver_historial_reporte", args=[ajeno.pk]))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.force_login(self.admin)
+        url = reverse("ver_historial_asignacion", args=[reporte.pk])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self._revalidar(url, etag)[0].status_code, 304)
+        HistorialAsignacion.objects.create(reporte=reporte, asignado_a=self.mant, cambiado_por=self.admin)
+        self.assertEqual(self._revalidar(url, etag)[0].status_code, 200)
+
+    def test_mensajes_pendientes_no_usan_etag(self):
+        self.client.force_login(self.mant)
+        url = reverse("mantenimiento")
+        etag = self.client.get(url)["ETag"]
+        # rol_requerido deja un mensaje de error y redirige al dashboard
+        self.client.get(reverse("usuario_principal"))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertContains(response, "Acceso denegado")
+
+
+# ===========================================
+# Resúmenes diarios y página de analítica
+# ===========================================
+class AnaliticaTests(TestCase):
+    D1, D2 = date(2026, 3, 2), date(2026, 3, 3)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.mant1 = Usuario.objects.create_user("mant1", "m1@duocuc.cl", "x", nombre_rol="mantenimiento", first_name="Ana")
+        cls.mant2 = Usuario.objects.create_user("mant2", "m2@duocuc.cl", "x", nombre_rol="mantenimiento", first_name="Beto")
+        alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        cls.edificio = Edificio.objects.create(nombre="Edificio A", codigo="a")
+        sala = Sala.objects.create(piso=Piso.objects.create(edificio=cls.edificio, numero=1), codigo="A101")
+
+        def reporte(creado, **extra):
+            r = Reporte.objects.create(titulo="R", descripcion="-", imagen="", usuario=alumno, **extra)
+            Reporte.objects.filter(pk=r.pk).update(created=creado)
+            return Reporte.objects.get(pk=r.pk)
+
+        def asignar(r, de, a, cuando):
+            h = HistorialAsignacion.objects.create(reporte=r, asignado_de=de, asignado_a=a, cambiado_por=cls.admin)
+            HistorialAsignacion.objects.filter(pk=h.pk).update(creado_en=cuando)
+            r.asignado_a = a
+            r.save(update_fields=["asignado_a"])
+
+        # R1: se crea y asigna el día 1, se completa el día 2 (24 h después)
+        cls.r1 = reporte(cls._hora(cls.D1, 10), categoria="Infraestructura", prioridad="Alta", sala=sala)
+        asignar(cls.r1, None, cls.mant1, cls._hora(cls.D1, 12))
+        cls.r1.estado = "completado"
+        cls.r1.save(update_fields=["estado"])
+        HistorialEstado.objects.filter(reporte=cls.r1).update(fecha_cambio=cls._hora(cls.D2, 10))
+
+        # R2: asignado a mant1 el día 1, reasignado a mant2 el día 2; sigue abierto
+        r2 = reporte(cls._hora(cls.D1, 11), categoria="Infraestructura", prioridad="Alta", sala=sala)
+        asignar(r2, None, cls.mant1, cls._hora(cls.D1, 12))
+        asignar(r2, cls.mant1, cls.mant2, cls._hora(cls.D2, 9))
+
+        # R3: creado el día 2, sin sala ni mantenedor
+        cls.r3 = reporte(cls._hora(cls.D2, 8), categoria="Eléctrico", prioridad="Baja")
+
+    @staticmethod
+    def _hora(dia, hora):
+        return datetime(dia.year, dia.month, dia.day, hora, tzinfo=ZoneInfo("America/Santiago"))
+
+    def _filas(self, dia):
+        return {
+            (r.edificio_id, r.categoria, r.prioridad, r.mantenedor_id): (r.creados, r.completados, r.backlog)
+            for r in ResumenDiario.objects.filter(dia=dia)
+        }
+
+    def test_resumen_por_dia(self):
+        self.assertEqual(analitica.actualizar(desde=self.D1, hoy=self.D2)[0], 2)
+        e = self.edificio.pk
+        self.assertEqual(self._filas(self.D1), {
+            (e, "Infraestructura", "Alta", None): (2, 0, 0),
+            (e, "Infraestructura", "Alta", self.mant1.pk): (0, 0, 2),
+        })
+        self.assertEqual(self._filas(self.D2), {
+            (e, "Infraestructura", "Alta", self.mant1.pk): (0, 1, 0),
+            (e, "Infraestructura", "Alta", self.mant2.pk): (0, 0, 1),
+            (None, "Eléctrico", "Baja", None): (1, 0, 1),
+        })
+        completado = ResumenDiario.objects.get(dia=self.D2, completados=1)
+        self.assertEqual((completado.resolucion_p50, completado.resolucion_p90), (1440, 1440))
+        self.assertEqual(analitica.percentil_histograma(completado.resolucion_hist, 0.5), 1440)
+
+    def test_incremental_e_idempotente(self):
+        analitica.actualizar(desde=self.D1, hoy=self.D2)
+        antes = {dia: self._filas(dia) for dia in (self.D1, self.D2)}
+        self.assertEqual(MarcaResumen.objects.get().dia_pendiente, self.D2)
+
+        # Solo se rehace el día abierto; los cerrados no se vuelven a consultar
+        Reporte.objects.filter(pk=self.r3.pk).update(categoria="Agua")
+        self.assertEqual(analitica.actualizar(hoy=self.D2)[0], 1)
+        self.assertEqual(self._filas(self.D1), antes[self.D1])
+        self.assertIn((None, "Agua", "Baja", None), self._filas(self.D2))
+
+        Reporte.objects.filter(pk=self.r3.pk).update(categoria="Eléctrico")
+        analitica.actualizar(hoy=self.D2)
+        analitica.actualizar(hoy=self.D2)
+        self.assertEqual({dia: self._filas(dia) for dia in (self.D1, self.D2)}, antes)
+
+    def test_comando(self):
+        salida = io.StringIO()
+        call_command("actualizar_resumenes", "--desde", "2026-03-02", stdout=salida)
+        self.assertIn("fila(s)", salida.getvalue())
+        self.assertTrue(ResumenDiario.objects.filter(dia=self.D1).exists())
+
+    def test_pagina_lee_solo_los_resumenes(self):
+        analitica.actualizar(desde=self.D1, hoy=self.D2)
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse("panel-analitica"),
+                                       {"desde": "2026-03-02", "hasta": "2026-03-03", "por": "mantenedor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in consultas if re.search(r'"app_(reporte|historial\w+)"', q["sql"])])
+
+        filas = {f["nombre"]: f for f in response.context["filas"]}
+        self.assertEqual((filas["Ana"]["creados"], filas["Ana"]["completados"], filas["Ana"]["p50"]), (0, 1, "≤ 1 d"))
+        self.assertEqual(filas["Beto"]["backlog"], 1)
+        self.assertEqual(filas["Sin asignar"]["creados"], 3)
+        self.assertEqual([d["backlog"] for d in response.context["serie"]], [2, 2])
+
+    def test_solo_administracion(self):
+        self.client.force_login(self.mant1)
+        self.assertRedirects(self.client.get(reverse("panel-analitica")), reverse("mantenimiento"),
+                             fetch_redirect_response=False)
+
+
+# ===========================================
+# Exportación CSV / XLSX en streaming
+# ===========================================
+class ExportacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        cls.alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        edificio = Edificio.objects.create(nombre="Edificio A", codigo="a")
+        cls.sala = Sala.objects.create(piso=Piso.objects.create(edificio=edificio, numero=1), codigo="A101")
+        Reporte.objects.create(
+            titulo="Fuga de agua", descripcion='Baño "norte", piso 1 & <2>', imagen="", prioridad="Alta",
+            usuario=cls.alumno, sala=cls.sala, asignado_a=cls.mant, estado="en_proceso",
+        )
+        Reporte.objects.create(titulo="Luz quemada", descripcion="-", imagen="", prioridad="Baja", usuario=cls.alumno)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _exportar(self, **params):
+        response = self.client.get(reverse("exportar-reportes"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response
+
+    def _csv(self, **params):
+        contenido = b"".join(self._exportar(formato="csv", **params).streaming_content).decode("utf-8-sig")
+        return list(csv.reader(io.StringIO(contenido)))
+
+    def test_csv_con_columnas_relacionadas(self):
+        filas = self._csv()
+        self.assertEqual(filas[0], exportacion.ENCABEZADOS)
+        self.assertEqual(len(filas), 3)
+        fuga = dict(zip(filas[0], filas[2]))  # orden: más reciente primero
+        self.assertEqual(fuga["Título"], "Fuga de agua")
+        self.assertEqual(fuga["Estado"], "En Proceso")
+        self.assertEqual(fuga["Reportado por"], "alumno")
+        self.assertEqual(fuga["Sala"], "A101")
+        self.assertEqual(fuga["Edificio"], "Edificio A")
+        self.assertEqual(fuga["Asignado a"], "mant")
+        self.assertEqual(fuga["Descripción"], 'Baño "norte", piso 1 & <2>')
+        self.assertEqual(dict(zip(filas[0], filas[1]))["Sala"], "")
+
+    def test_respeta_los_filtros_del_admin(self):
+        self.assertEqual([f[1] for f in self._csv(prioridad="Baja")[1:]], ["Luz quemada"])
+        self.assertEqual([f[1] for f in self._csv(estado="en_proceso")[1:]], ["Fuga de agua"])
+        self.assertEqual([f[1] for f in self._csv(busqueda="agua")[1:]], ["Fuga de agua"])
+
+    def test_xlsx_legible(self):
+        response = self._exportar(formato="xlsx", estado="en_proceso")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        archivo = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertIsNone(archivo.testzip())
+        ns = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        hoja = ElementTree.fromstring(archivo.read("xl/worksheets/sheet1.xml"))
+        filas = [
+            ["".join(c.itertext()) for c in fila.findall("x:c", ns)]
+            for fila in hoja.findall("x:sheetData/x:row", ns)
+        ]
+        self.assertEqual(filas[0], exportacion.ENCABEZADOS)
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[1][1], "Fuga de agua")
+        self.assertEqual(filas[1][-1], 'Baño "norte", piso 1 & <2>')
+        # Las fechas van como número de serie de Excel (con estilo de fecha)
+        self.assertGreater(float(filas[1][5]), 40000)
+
+    def test_textos_con_formula_se_escapan(self):
+        maliciosos = ['=HYPERLINK("http://x.cl","clic")', "+1+1", "-2+3", "@SUM(A1)", "\t=1", "\r=1"]
+        for texto in maliciosos:
+            Reporte.objects.create(titulo=texto, descripcion=texto, imagen="", prioridad="Media", usuario=self.alumno)
+
+        filas = self._csv(prioridad="Media")[1:]
+        self.assertEqual(sorted(f[1] for f in filas), sorted("'" + t for t in maliciosos))
+        self.assertTrue(all(f[-1] == f[1] for f in filas))
+
+        response = self._exportar(formato="xlsx", prioridad="Media")
+        hoja = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))).read("xl/worksheets/sheet1.xml").decode()
+        for texto in ('=HYPERLINK', "+1+1", "@SUM"):
+            self.assertIn(f">'{texto}", hoja)
+
+    def test_solo_administracion(self):
+        self.client.force_login(self.mant)
+        self.assertEqual(self.client.get(reverse("exportar-reportes")).status_code, 302)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse("exportar-reportes"), {"formato": "pdf"}).status_code, 400)
+
+    def _pico_memoria(self, formato, n):
+        """Pico de memoria (tracemalloc) al consumir una exportación de n reportes (o más, si ya había)."""
+        faltan = n - Reporte.objects.count()
+        Reporte.objects.bulk_create(
+            Reporte(titulo=f"Reporte {i}", descripcion="x" * 200, imagen="", usuario=self.alumno,
+                    sala=self.sala, asignado_a=self.mant)
+            for i in range(max(faltan, 0))
+        )
+        response = self._exportar(formato=formato)
+        tracemalloc.start()
+        try:
+            tamano = sum(len(bloque) for bloque in response.streaming_content)
+            return tracemalloc.get_traced_memory()[1], tamano
+        finally:
+            tracemalloc.stop()
+
+    def test_memoria_constante(self):
+        # Lotes chicos para que las dos exportaciones recorran varios lotes
+        with mock.patch.object(exportacion, "LOTE", 100):
+            chicos = {formato: self._pico_memoria(formato, 300) for formato in ("csv", "xlsx")}
+            for formato, (pico_chico, tamano_chico) in chicos.items():
+                with self.subTest(formato=formato):
+                    pico_grande, tamano_grande = self._pico_memoria(formato, 6000)
+                    self.assertGreater(tamano_grande, 10 * tamano_chico)
+                    # 20 veces más filas, mismo pico (con holgura para el ruido del intérprete)
+                    self.assertLess(pico_grande, pico_chico * 1.5 + 256 * 1024)
+
+
+# ===========================================
+# Importación masiva de ubicaciones (CSV)
+# ===========================================
+class ImportacionUbicacionesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.edificio = Edificio.objects.create(nombre="Edificio A", codigo="a")
+        cls.piso = Piso.objects.create(edificio=cls.edificio, numero=1, etiqueta="Primer piso")
+        cls.sala = Sala.objects.create(piso=cls.piso, codigo="A101", nombre="Laboratorio")
+
+    def _importar(self, texto, guardar=True):
+        return importacion.importar(io.StringIO(texto), guardar=guardar)
+
+    def test_crea_campus_nuevo_con_consultas_constantes(self):
+        def campus(salas):
+            filas = ["edificio,piso,etiqueta,sala_codigo,sala_nombre"]
+            filas += [f"Edificio B,{i % 10},,B{i},Sala {i}" for i in range(salas)]
+            return "\n".join(filas)
+
+        # Mismas consultas para 3.000 salas que para 30
+        with CaptureQueriesContext(connection) as chico:
+            self._importar(campus(30))
+        Edificio.objects.filter(codigo="edificio-b").delete()
+        with CaptureQueriesContext(connection) as grande:
+            resultado = self._importar(campus(3000))
+        self.assertEqual(resultado["errores"], [])
+        self.assertLessEqual(len(grande), len(chico) + 2 * (3000 // importacion.LOTE))
+
+        self.assertEqual(resultado["edificios"], 1)
+        self.assertEqual(resultado["pisos_nuevos"], 10)
+        self.assertEqual(resultado["salas_nuevas"], 3000)
+        b = Edificio.objects.get(codigo="edificio-b")
+        self.assertEqual(Sala.objects.filter(edificio=b).count(), 3000)
+        sala = Sala.objects.get(edificio=b, codigo="B13")
+        self.assertEqual((sala.piso.numero, sala.piso.edificio_id), (3, b.pk))
+
+    def test_actualiza_existentes_y_es_idempotente(self):
+        Reporte.objects.create(titulo="Fuga", descripcion="-", imagen="", usuario=self.admin, sala=self.sala)
+        texto = (
+            "edificio,piso,etiqueta,sala_codigo,sala_nombre\n"
+            "a,2,Segundo piso,A101,Auditorio\n"   # por código: se mueve de piso y se renombra
+            "edificio a,1,,A102,\n"               # por nombre: etiqueta vacía no pisa la existente
+        )
+        version = ubicaciones.version()
+        resultado = self._importar(texto)
+        self.assertEqual(resultado["errores"], [])
+        self.assertEqual((resultado["edificios"], resultado["pisos_nuevos"], resultado["salas_nuevas"]), (0, 1, 1))
+        self.assertEqual(resultado["salas_actualizadas"], 1)
+
+        self.sala.refresh_from_db()
+        self.assertEqual((self.sala.nombre, self.sala.piso.numero), ("Auditorio", 2))
+        self.assertEqual(Piso.objects.get(edificio=self.edificio, numero=1).etiqueta, "Primer piso")
+        self.assertGreater(ubicaciones.version(), version)
+        # El índice de búsqueda ve el nombre nuevo de la sala
+        if busqueda.disponible():
+            self.assertEqual(busqueda.buscar(Reporte.objects.all(), "auditorio")[0].count(), 1)
+
+        repetido = self._importar(texto)
+        self.assertEqual(
+            [repetido[k] for k in ("edificios", "pisos_nuevos", "pisos_actualizados", "salas_nuevas", "salas_actualizadas")],
+            [0, 0, 0, 0, 0],
+        )
+
+    def test_errores_por_linea_sin_escribir_nada(self):
+        resultado = self._importar(
+            "edificio,piso,etiqueta,sala_codigo,sala_nombre\n"
+            "Edificio C,1,,C1,\n"
+            "Edificio C,uno,,C2,\n"
+            "Edificio C,1,,C1,Repetida\n"
+            ",1,,C3,\n"
+            "Edificio C,300,,C4,\n"
+            "a,1,Otra etiqueta,A101,\n"
+        )
+        self.assertEqual([linea for linea, _ in resultado["errores"]], [3, 4, 5, 6])
+        self.assertIn("línea 2", resultado["errores"][1][1])
+        self.assertFalse(Edificio.objects.filter(nombre="Edificio C").exists())
+
+        faltan = self._importar("edificio,sala\nA,1\n")
+        self.assertIn("Faltan columnas", faltan["errores"][0][1])
+
+    def test_simular_no_escribe(self):
+        resultado = self._importar("edificio,piso,sala_codigo\nEdificio D,1,D1\n", guardar=False)
+        self.assertEqual((resultado["edificios"], resultado["salas_nuevas"]), (1, 1))
+        self.assertFalse(Edificio.objects.filter(nombre="Edificio D").exists())
+
+    def test_pagina_y_comando(self):
+        url = reverse("importar-ubicaciones")
+        self.client.force_login(self.admin)
+        archivo = SimpleUploadedFile("campus.csv", "edificio,piso,sala_codigo\nEdificio É,1,E1\n".encode("utf-8-sig"))
+        response = self.client.post(url, {"archivo": archivo})
+        self.assertRedirects(response, url)
+        self.assertTrue(Sala.objects.filter(codigo="E1", edificio__nombre="Edificio É").exists())
+
+        archivo = SimpleUploadedFile("campus.csv", b"edificio,piso,sala_codigo\nedificio-e,x,E2\n")
+        response = self.client.post(url, {"archivo": archivo})
+        self.assertContains(response, "Piso inválido")
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as f:
+            f.write("edificio,piso,sala_codigo\nEdificio F,1,F1\nEdificio F,1,F1\n")
+        errores = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command("importar_ubicaciones", f.name, stdout=io.StringIO(), stderr=errores)
+        self.assertIn("Línea 3", errores.getvalue())
+
+
+# ===========================================
+# Campus sintético (seed_campus)
+# ===========================================
+class SemillaTests(TestCase):
+    HASTA = date(2026, 3, 1)
+    PARAMETROS = dict(edificios=2, pisos=2, salas=3, alumnos=20, mantenedores=4, administradores=2,
+                      reportes=300, dias=60, hasta=HASTA, lote=100)
+
+    def _foto(self):
+        return list(
+            Reporte.objects.order_by("created", "id").values_list(
+                "titulo", "categoria", "prioridad", "estado", "created", "updated", "fecha_asignacion",
+                "usuario__username", "sala__codigo", "asignado_a__username",
+            )
+        )
+
+    def test_datos_coherentes(self):
+        cantidades = semilla.sembrar(semilla=7, **self.PARAMETROS)
+        self.assertEqual(
+            [cantidades[k] for k in ("edificios", "pisos", "salas", "usuarios", "reportes")],
+            [2, 4, 12, 26, 300],
+        )
+        self.assertEqual(Sala.objects.exclude(edificio=F("piso__edificio")).count(), 0)
+        self.assertEqual(Usuario.objects.filter(nombre_rol="mantenimiento").count(), 4)
+
+        # Una sola contraseña hasheada, válida para todas las cuentas
+        self.assertEqual(Usuario.objects.values("password").distinct().count(), 1)
+        self.assertTrue(Usuario.objects.get(username="alumno000001").check_password("campus123"))
+
+        # Fechas dentro del período, ids en orden de llegada, historial consistente con el estado
+        fin = datetime(2026, 3, 1, tzinfo=ZoneInfo("America/Santiago"))
+        fechas = list(Reporte.objects.order_by("id").values_list("created", flat=True))
+        self.assertEqual(fechas, sorted(fechas))
+        self.assertLess(fechas[-1], fin)
+        self.assertFalse(Reporte.objects.filter(updated__lt=F("created")).exists())
+        self.assertFalse(HistorialEstado.objects.filter(fecha_cambio__gte=fin).exists())
+        completados = Reporte.objects.filter(estado="completado")
+        self.assertGreater(completados.count(), 0)
+        self.assertEqual(
+            HistorialEstado.objects.filter(estado_nuevo="completado").count(), completados.count(),
+        )
+        self.assertFalse(Reporte.objects.filter(asignado_a__isnull=True).exclude(estado="pendiente").exists())
+        self.assertEqual(
+            HistorialAsignacion.objects.filter(motivo="Asignación").count(),
+            Reporte.objects.filter(asignado_a__isnull=False).count(),
+        )
+
+        # Contadores e índice de búsqueda al día pese a bulk_create
+        self.assertEqual(ContadorEstado.objects.resumen()["total"], 300)
+        self.assertEqual(ContadorEstado.objects.resumen()["completados"], completados.count())
+        if busqueda.disponible():
+            titulo = Reporte.objects.values_list("titulo", flat=True).first()
+            self.assertGreater(busqueda.buscar(Reporte.objects.all(), titulo)[0].count(), 0)
+
+    def test_determinista(self):
+        semilla.sembrar(semilla=7, **self.PARAMETROS)
+        primera = self._foto()
+        Reporte.objects.all().delete()
+        Edificio.objects.all().delete()
+        Usuario.objects.all().delete()
+
+        semilla.sembrar(semilla=7, **self.PARAMETROS)
+        self.assertEqual(self._foto(), primera)
+
+        Reporte.objects.all().delete()
+        Edificio.objects.all().delete()
+        Usuario.objects.all().delete()
+        semilla.sembrar(semilla=8, **self.PARAMETROS)
+        self.assertNotEqual(self._foto(), primera)
+
+    def test_comando_no_repite_sobre_datos_de_semilla(self):
+        argumentos = ["--edificios", "1", "--pisos", "1", "--salas", "2", "--alumnos", "3", "--mantenedores", "1",
+                      "--administradores", "1", "--reportes", "10", "--hasta", "2026-03-01"]
+        salida = io.StringIO()
+        call_command("seed_campus", *argumentos, stdout=salida)
+        self.assertIn("10 reportes", salida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("seed_campus", *argumentos, stdout=io.StringIO())
+
+
+# ===========================================
+# Benchmark de vistas con presupuestos (bench_vistas)
+# ===========================================
+class MedicionVistasTests(TestCase):
+    def test_todas_las_rutas_tienen_caso_y_presupuesto(self):
+        self.assertEqual(medicion_vistas.rutas_sin_caso(), [])
+        if not medicion_vistas.ruta_presupuesto().exists():
+            self.skipTest(f"Sin presupuesto para {connection.vendor}: bench_vistas --actualizar-presupuesto")
+        presupuesto = medicion_vistas.cargar_presupuesto()
+        self.assertEqual(set(presupuesto["vistas"]), set(medicion_vistas.CASOS))
+
+    def test_mide_y_compara_contra_el_presupuesto(self):
+        semilla.sembrar(edificios=1, pisos=2, salas=3, alumnos=10, mantenedores=3, administradores=1,
+                        reportes=200, dias=30, hasta=date(2026, 3, 1))
+        casos = ["admin", "contadores-dashboard", "actualizar_estado_reporte", "logout"]
+        resultados = medicion_vistas.medir(medicion_vistas.contexto(), casos, repeticiones=3, calentamiento=1)
+
+        self.assertEqual([resultados[c]["estado"] for c in casos], [[200], [200], [200], [302]])
+        self.assertGreater(resultados["admin"]["consultas"], 0)
+        self.assertGreaterEqual(resultados["admin"]["filas"], 10)  # una página de reportes
+        self.assertLessEqual(resultados["admin"]["p50_ms"], resultados["admin"]["p95_ms"])
+        # El contador de filas deja el cursor de Django como estaba
+        self.assertNotIn("fetchone", vars(CursorWrapper))
+
+        holgado = {"vistas": {c: {"consultas": 100, "filas": 10000, "p95_ms": 10000} for c in casos}}
+        self.assertEqual(medicion_vistas.comparar(resultados, holgado), [])
+
+        justo = medicion_vistas.presupuesto_desde(resultados, {})
+        justo["vistas"]["admin"]["consultas"] -= 1
+        justo["vistas"]["contadores-dashboard"]["p95_ms"] = 0
+        del justo["vistas"]["logout"]
+        fallas = dict(medicion_vistas.comparar(resultados, justo))
+        self.assertIn("consultas", fallas["admin"])
+        self.assertIn("p95", fallas["contadores-dashboard"])
+        self.assertEqual(fallas["logout"], "sin presupuesto")
+        self.assertNotIn("actualizar_estado_reporte", fallas)
+
+
+# ===========================================
+# Tiempos por petición (Server-Timing y peticiones lentas)
+# ===========================================
+class TiemposTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        for i in range(3):
+            Reporte.objects.create(titulo=f"Fuga {i}", categoria="Infraestructura", prioridad="Alta",
+                                   descripcion="Gotea", imagen="", usuario=alumno)
+
+    def setUp(self):
+        cache.clear()
+
+    def _metricas(self, response):
+        metricas = {}
+        for parte in response["Server-Timing"].split(", "):
+            nombre, dur, *desc = parte.split(";")
+            metricas[nombre] = (float(dur.removeprefix("dur=")), desc)
+        return metricas
+
+    def test_cabecera_server_timing(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("admin"))
+        metricas = self._metricas(response)
+        self.assertEqual(list(metricas), ["db", "tpl", "app", "total"])
+        self.assertGreater(metricas["tpl"][0], 0)
+        consultas = int(re.search(r"SQL \((\d+)\)", metricas["db"][1][0]).group(1))
+        self.assertGreater(consultas, 0)
+        self.assertLessEqual(metricas["db"][0] + metricas["tpl"][0], metricas["total"][0] + 0.2)
+
+    @override_settings(TIEMPOS_LENTO_MS=0, TIEMPOS_SQL_LENTAS=2)
+    def test_log_de_peticion_lenta(self):
+        self.client.force_login(self.admin)
+        with self.assertLogs("app.tiempos", "WARNING") as logs:
+            self.client.get(reverse("admin"))
+        detalle = json.loads(logs.output[0].split("peticion_lenta ", 1)[1])
+        self.assertEqual((detalle["ruta"], detalle["rol"], detalle["estado"]), ("admin", "administracion", 200))
+        self.assertGreater(detalle["consultas"], 0)
+        self.assertEqual(len(detalle["sql_lentas"]), 2)
+        self.assertGreaterEqual(detalle["sql_lentas"][0]["ms"], detalle["sql_lentas"][1]["ms"])
+
+    @override_settings(TIEMPOS_LENTO_MS=0)
+    def test_sql_repetida(self):
+        request = RequestFactory().get("/x/")
+        medicion, token = tiempos.iniciar()
+        try:
+            for _ in range(3):
+                list(Reporte.objects.filter(titulo="Fuga 1"))
+            Usuario.objects.count()
+        finally:
+            tiempos.terminar(token)
+        self.assertEqual(medicion.consultas, 4)
+        with self.assertLogs("app.tiempos", "WARNING") as logs:
+            tiempos.reportar(request, HttpResponse(), medicion)
+        detalle = json.loads(logs.output[0].split("peticion_lenta ", 1)[1])
+        self.assertEqual(detalle["sql_repetida"]["veces"], 3)
+        self.assertIn('"app_reporte"', detalle["sql_repetida"]["sql"])
+        self.assertIsNone(detalle["rol"])
+
+    def test_sin_log_bajo_el_umbral(self):
+        self.client.force_login(self.admin)
+        with override_settings(TIEMPOS_LENTO_MS=60_000), self.assertNoLogs("app.tiempos"):
+            response = self.client.get(reverse("admin"))
+        self.assertIn("Server-Timing", response)
+
+    @override_settings(ROOT_URLCONF=UrlsAsync, TIEMPOS_LENTO_MS=0)
+    def test_vista_async(self):
+        async_to_sync(self.async_client.aforce_login)(self.mant)
+        with self.assertLogs("app.tiempos", "WARNING") as logs:
+            response = async_to_sync(self.async_client.get)(reverse("contadores-dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self._metricas(response)["db"][0], 0)
+        detalle = json.loads(logs.output[0].split("peticion_lenta ", 1)[1])
+        self.assertEqual((detalle["ruta"], detalle["rol"]), ("contadores-dashboard", "mantenimiento"))
+        self.assertGreater(detalle["consultas"], 0)
+
+
+# ===========================================
+# Perfilador bajo demanda
+# ===========================================
+class PerfiladorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        cls.alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        cls.reporte = Reporte.objects.create(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                                             descripcion="Gotea", imagen="", usuario=cls.alumno)
+
+    def setUp(self):
+        cache.clear()
+        self.carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.carpeta, ignore_errors=True)
+        ajustes = override_settings(PERFILADOR_DIR=self.carpeta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(self.admin)
+        self.firma = perfilador.firmar(self.admin)
+
+    def test_perfila_con_parametro_firmado(self):
+        response = self.client.get(reverse("admin"), {"perfilar": self.firma})
+        self.assertEqual(response.status_code, 200)
+        [perfil] = perfilador.recientes()
+        self.assertEqual((perfil["ruta"], perfil["estado"], perfil["solicitado_por"]), ("admin", 200, self.admin.pk))
+        completo = perfilador.cargar(perfil["nombre"])
+        self.assertTrue(any("app/views.py" in f["funcion"] for f in completo["funciones"]))
+        acumulados = [f["acumulado_ms"] for f in completo["funciones"]]
+        self.assertEqual(acumulados, sorted(acumulados, reverse=True))
+        self.assertIsInstance(completo["asignaciones"], list)
+        self.assertTrue((Path(self.carpeta) / f"{perfil['nombre']}.prof").exists())
+
+    def test_perfila_con_cabecera(self):
+        url = reverse("ver_historial_asignacion", args=[self.reporte.pk])
+        response = self.client.get(url, HTTP_X_PERFILAR=self.firma)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["ruta"] for p in perfilador.recientes()], ["ver_historial_asignacion"])
+
+    def test_sin_firma_valida_no_perfila(self):
+        self.client.get(reverse("admin"))
+        with self.assertLogs("app.perfilador", "WARNING"):
+            response = self.client.get(reverse("admin"), {"perfilar": self.firma + "x"})
+        self.assertEqual(response.status_code, 200)
+        with override_settings(PERFILADOR_VALIDEZ=-1), self.assertLogs("app.perfilador", "WARNING"):
+            self.client.get(reverse("admin"), {"perfilar": self.firma})
+        self.assertEqual(perfilador.recientes(), [])
+
+    def test_firma_ajena_no_perfila(self):
+        otro_admin = Usuario.objects.create_user("admin2", "admin2@duocuc.cl", "x", nombre_rol="administracion")
+        for usuario in (self.alumno, otro_admin, None):
+            with self.subTest(usuario=usuario and usuario.username):
+                if usuario is None:
+                    self.client.logout()
+                else:
+                    self.client.force_login(usuario)
+                with self.assertLogs("app.perfilador", "WARNING"):
+                    self.client.get(reverse("login"), {"perfilar": self.firma})
+        self.assertEqual(perfilador.recientes(), [])
+
+    def test_quitar_el_rol_anula_la_firma(self):
+        self.admin.nombre_rol = "mantenimiento"
+        self.admin.save()
+        with self.assertLogs("app.perfilador", "WARNING"):
+            self.client.get(reverse("mantenimiento"), {"perfilar": self.firma})
+        self.assertEqual(perfilador.recientes(), [])
+
+    @override_settings(PERFILADOR_MAX=2)
+    def test_guarda_solo_los_mas_recientes(self):
+        for _ in range(3):
+            self.client.get(reverse("admin"), {"perfilar": self.firma})
+        self.assertEqual(len(perfilador.recientes()), 2)
+        self.assertEqual(len(list(Path(self.carpeta).glob("*.prof"))), 2)
+
+    def test_pagina_de_perfiles(self):
+        self.client.get(reverse("admin"), {"perfilar": self.firma})
+        [perfil] = perfilador.recientes()
+        response = self.client.get(reverse("perfiles"), {"perfil": perfil["nombre"]})
+        self.assertContains(response, "Funciones por tiempo acumulado")
+        self.assertContains(response, "app/views.py")
+
+        response = self.client.get(reverse("perfiles"), {"perfil": "../settings"})
+        self.assertNotContains(response, "Funciones por tiempo acumulado")
+        self.assertContains(response, "El perfil no existe")
+
+        self.client.force_login(self.alumno)
+        response = self.client.get(reverse("perfiles"))
+        self.assertRedirects(response, reverse("usuario_principal"), fetch_redirect_response=False)
+
+
+# ===========================================
+# Ajustes de SQLite y transacciones de escritura
+# ===========================================
+@skipUnless(connection.vendor == "sqlite", "PRAGMA de SQLite")
+class PragmasSqliteTests(TestCase):
+
+    def _pragma(self, cursor, nombre):
+        cursor.execute(f"PRAGMA {nombre}")
+        return cursor.fetchone()[0]
+
+    def test_pragmas_en_cada_conexion(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(self._pragma(cursor, "synchronous"), 1)  # NORMAL
+            self.assertEqual(self._pragma(cursor, "busy_timeout"), 5000)
+            self.assertEqual(self._pragma(cursor, "cache_size"), -20000)
+            self.assertEqual(self._pragma(cursor, "temp_store"), 2)  # MEMORY
+
+    def _en_archivo(self, *pragmas):
+        """Los PRAGMA de una conexión nueva a un archivo (la base de pruebas está en memoria)."""
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        otra = connection.copy()
+        otra.settings_dict = {**connection.settings_dict, "NAME": f"{carpeta}/prueba.sqlite3"}
+        try:
+            with otra.cursor() as cursor:
+                return [self._pragma(cursor, nombre) for nombre in pragmas]
+        finally:
+            otra.close()
+
+    def test_wal_en_un_archivo(self):
+        self.assertEqual(self._en_archivo("journal_mode", "mmap_size"), ["wal", 256 * 1024 * 1024])
+
+    @override_settings(SQLITE_PRAGMAS={"busy_timeout": 100})
+    def test_pragmas_desde_settings(self):
+        self.assertEqual(self._en_archivo("journal_mode", "busy_timeout", "synchronous"), ["delete", 100, 2])
+
+
+@skipUnless(connection.vendor == "sqlite", "BEGIN IMMEDIATE es de SQLite")
+class EscrituraInmediataTests(TransactionTestCase):
+
+    def _inicios(self, consultas):
+        return [q["sql"] for q in consultas if q["sql"].startswith(("BEGIN", "SAVEPOINT"))]
+
+    def test_begin_immediate(self):
+        with CaptureQueriesContext(connection) as consultas:
+            with bd.escritura():
+                Reporte.objects.count()
+        self.assertEqual(self._inicios(consultas), ["BEGIN IMMEDIATE"])
+        self.assertIsNone(connection.transaction_mode)
+
+        with override_settings(SQLITE_ESCRITURA_INMEDIATA=False), CaptureQueriesContext(connection) as consultas:
+            with bd.escritura():
+                Reporte.objects.count()
+        self.assertEqual(self._inicios(consultas), ["BEGIN"])
+
+    def test_dentro_de_otra_transaccion_es_un_savepoint(self):
+        with CaptureQueriesContext(connection) as consultas:
+            with transaction.atomic(), bd.escritura():
+                Reporte.objects.count()
+        inicios = self._inicios(consultas)
+        self.assertEqual(inicios[0], "BEGIN")
+        self.assertTrue(inicios[1].startswith("SAVEPOINT"))
+
+    def test_error_deshace_y_restaura_el_modo(self):
+        alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        with self.assertRaises(ValueError), bd.escritura():
+            Reporte.objects.create(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                                   descripcion="Gotea", imagen="", usuario=alumno)
+            raise ValueError
+        self.assertFalse(Reporte.objects.exists())
+        self.assertIsNone(connection.transaction_mode)
+
+    def _lee_dentro(self, consultas):
+        """BEGIN IMMEDIATE antes de la primera lectura del reporte, no solo antes del UPDATE."""
+        sql = [q["sql"] for q in consultas]
+        lectura = next(i for i, s in enumerate(sql) if s.startswith("SELECT") and 'FROM "app_reporte"' in s)
+        self.assertIn("BEGIN IMMEDIATE", sql[:lectura])
+
+    def test_vistas_de_escritura(self):
+        mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        reporte = Reporte.objects.create(titulo="Fuga", categoria="Infraestructura", prioridad="Alta",
+                                         descripcion="Gotea", imagen="", usuario=alumno, asignado_a=mant)
+
+        # Las síncronas y sus versiones async (app.vistas_async)
+        for urlconf, estado in ((UrlsSync, "pausado"), (UrlsAsync, "en_proceso")):
+            with self.subTest(vista=urlconf.__name__), override_settings(ROOT_URLCONF=urlconf):
+                self.client.force_login(mant)
+                with CaptureQueriesContext(connection) as consultas:
+                    response = self.client.post(reverse("actualizar_estado_reporte"),
+                                                {"reporte_id": reporte.pk, "nuevo_estado": estado})
+                self.assertEqual(response.status_code, 200)
+                self._lee_dentro(consultas)
+
+                self.client.force_login(admin)
+                with CaptureQueriesContext(connection) as consultas:
+                    response = self.client.post(reverse("asignar-mantenedor", args=[reporte.pk]),
+                                                {"asignado_a": mant.pk})
+                self.assertEqual(response.status_code, 200)
+                self._lee_dentro(consultas)
+
+
+# ===========================================
+# PostgreSQL: búsqueda con trigramas y asignación con SKIP LOCKED
+# ===========================================
+@skipUnless(connection.vendor == "postgresql", "Solo con POSTGRES_DB")
+class PostgresTests(TransactionTestCase):
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user("admin", "admin@duocuc.cl", "x", nombre_rol="administracion")
+        self.mant = Usuario.objects.create_user("mant", "mant@duocuc.cl", "x", nombre_rol="mantenimiento")
+        alumno = Usuario.objects.create_user("alumno", "alumno@duocuc.cl", "x")
+        edificio = Edificio.objects.create(nombre="Edificio Norte", codigo="norte")
+        sala = Sala.objects.create(piso=Piso.objects.create(edificio=edificio, numero=1), codigo="N101", nombre="Auditorio")
+        datos = dict(prioridad="Alta", imagen="", usuario=alumno)
+        self.fuga = Reporte.objects.create(titulo="Fuga de agua", descripcion="Gotea el techo",
+                                           categoria="Infraestructura", **datos)
+        self.luz = Reporte.objects.create(titulo="Luz quemada", descripcion="Sin luz en el pasillo", sala=sala,
+                                          categoria="Electricidad", **datos)
+        cache.clear()
+
+    def test_busqueda_con_trigramas(self):
+        sql, params = busqueda.buscar_trigramas(Reporte.objects.all(), "techo").query.sql_with_params()
+        # Con dos filas el planificador prefiere recorrer la tabla: se le quita esa opción
+        # para ver si los índices sirven para lo que compila icontains
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = "\n".join(fila[0] for fila in cursor.fetchall())
+        self.assertIn("reporte_titulo_upper_trgm_idx", plan)
+        self.assertIn("reporte_descripcion_upper_trgm_idx", plan)
+        self.assertIn("reporte_categoria_upper_trgm_idx", plan)
+        self.assertNotIn("Seq Scan on app_reporte", plan)
+
+        reportes, orden = busqueda.buscar(Reporte.objects.all(), "techo agua")
+        self.assertEqual((list(reportes), orden), ([self.fuga], "rank"))
+        reportes, _ = busqueda.buscar(Reporte.objects.all(), "auditorio norte")
+        self.assertEqual(list(reportes), [self.luz])
+        # La categoría también cuenta, como en FTS5 y en el camino LIKE
+        reportes, _ = busqueda.buscar(Reporte.objects.all(), "infraestructura")
+        self.assertEqual(list(reportes), [self.fuga])
+        reportes, _ = busqueda.buscar(Reporte.objects.all(), "electricidad pasillo")
+        self.assertEqual(list(reportes), [self.luz])
+
+    def test_asignacion_salta_el_reporte_tomado(self):
+        tomado, liberar = threading.Event(), threading.Event()
+
+        def otro_administrador():
+            with transaction.atomic():
+                list(Reporte.objects.select_for_update().filter(pk=self.fuga.pk))
+                tomado.set()
+                liberar.wait(10)
+            connection.close()
+
+        hilo = threading.Thread(target=otro_administrador)
+        hilo.start()
+        try:
+            tomado.wait(10)
+            self.client.force_login(self.admin)
+            response = self.client.post(reverse("asignar-mantenedor", args=[self.fuga.pk]), {"asignado_a": self.mant.pk})
+            self.assertEqual((response.status_code, response.json()["error"]), (409, views.REPORTE_OCUPADO))
+
+            response = self.client.post(reverse("asignar-mantenedor-masivo"),
+                                        {"ids": f"{self.fuga.pk},{self.luz.pk}", "asignado_a": self.mant.pk})
+            resultados = response.json()["resultados"]
+            self.assertEqual(resultados[str(self.fuga.pk)]["error"], views.REPORTE_OCUPADO)
+            self.assertTrue(resultados[str(self.luz.pk)]["ok"])
+
+            # La versión async comparte la lectura con SKIP LOCKED (views._asignar)
+            with override_settings(ROOT_URLCONF=UrlsAsync):
+                response = self.client.post(reverse("asignar-mantenedor", args=[self.fuga.pk]), {"asignado_a": self.mant.pk})
+            self.assertEqual((response.status_code, response.json()["error"]), (409, views.REPORTE_OCUPADO))
+        finally:
+            liberar.set()
+            hilo.join()
@@ -0,0 +1,163 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.template.backends import django as backend_django
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# Tiempos por petición: SQL, plantillas y total (Server-Timing)
+# ===========================================
+# TiemposMiddleware (app/middleware.py) abre una Medicion por petición en un ContextVar;
+# el ContextVar viaja con la petición a los hilos de sync_to_async, así que también
+# sirve para las vistas async. Lo que mide:
+#   - SQL: un execute_wrapper instalado en cada conexión al crearse (connection_created).
+#     Cuenta el execute; en SQLite la lectura de las filas siguientes queda en "python".
+#   - plantillas: el backend DjangoTemplatesMedidas (settings.TEMPLATES) cronometra cada
+#     render de nivel superior (los {% include %} van dentro del render que los incluye).
+#   - total: desde que entra hasta que sale la respuesta. En respuestas streaming no
+#     incluye la generación del contenido, que ocurre después.
+#
+# Costo fijo: dos perf_counter y un append por consulta y un ContextVar por petición.
+# El análisis (SQL repetida, más lentas) solo corre cuando la petición supera el umbral.
+
+# Sentencias guardadas por petición para el log (las demás solo suman tiempo y conteo)
+MAX_SENTENCIAS = 500
+
+_medicion = ContextVar("medicion_tiempos", default=None)
+
+
+class Medicion:
+    __slots__ = ("inicio", "sql", "consultas", "sentencias", "plantillas")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.sql = 0.0
+        self.consultas = 0
+        self.sentencias = []
+        self.plantillas = 0.0
+
+
+def iniciar():
+    medicion = Medicion()
+    return medicion, _medicion.set(medicion)
+
+
+def terminar(token):
+    _medicion.reset(token)
+
+
+# ===========================================
+# SQL
+# ===========================================
+def _medir_sql(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = time.perf_counter() - inicio
+        medicion.sql += duracion
+        medicion.consultas += 1
+        if len(medicion.sentencias) < MAX_SENTENCIAS:
+            medicion.sentencias.append((sql, duracion))
+
+
+def instalar(connection):
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_sql)
+
+
+def _al_conectar(sender, connection, **kwargs):
+    instalar(connection)
+
+
+connection_created.connect(_al_conectar, dispatch_uid="app.tiempos")
+
+
+# ===========================================
+# Plantillas
+# ===========================================
+class _PlantillaMedida:
+    def __init__(self, plantilla):
+        self._plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self._plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        medicion = _medicion.get()
+        if medicion is None:
+            return self._plantilla.render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return self._plantilla.render(context, request)
+        finally:
+            medicion.plantillas += time.perf_counter() - inicio
+
+
+class DjangoTemplatesMedidas(backend_django.DjangoTemplates):
+    """Backend de plantillas de Django que informa el tiempo de render a la Medicion."""
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name))
+
+
+# ===========================================
+# Informe: cabecera y log de peticiones lentas
+# ===========================================
+def _rol(request):
+    """Rol del usuario si ya se cargó en la petición (sin provocar una consulta)."""
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    user = user or getattr(request, "_acached_user", None)
+    if user is None:
+        return None
+    return getattr(user, "nombre_rol", None) if user.is_authenticated else "anonimo"
+
+
+def _detalle(request, response, medicion, total):
+    repetidas = Counter(sql for sql, _ in medicion.sentencias).most_common(1)
+    lentas = sorted(medicion.sentencias, key=lambda s: s[1], reverse=True)[:getattr(settings, "TIEMPOS_SQL_LENTAS", 5)]
+    match = request.resolver_match
+    return {
+        "ruta": match.view_name if match else None,
+        "metodo": request.method,
+        "path": request.path,
+        "estado": response.status_code,
+        "rol": _rol(request),
+        "total_ms": round(total * 1000, 1),
+        "sql_ms": round(medicion.sql * 1000, 1),
+        "plantillas_ms": round(medicion.plantillas * 1000, 1),
+        "consultas": medicion.consultas,
+        "sql_repetida": {"sql": repetidas[0][0], "veces": repetidas[0][1]} if repetidas and repetidas[0][1] > 1 else None,
+        "sql_lentas": [{"sql": sql, "ms": round(duracion * 1000, 2)} for sql, duracion in lentas],
+    }
+
+
+def reportar(request, response, medicion):
+    total = time.perf_counter() - medicion.inicio
+    if getattr(settings, "TIEMPOS_SERVER_TIMING", True):
+        python = max(total - medicion.sql - medicion.plantillas, 0)
+        response["Server-Timing"] = (
+            f'db;dur={medicion.sql * 1000:.1f};desc="SQL ({medicion.consultas})", '
+            f'tpl;dur={medicion.plantillas * 1000:.1f};desc="Plantillas", '
+            f'app;dur={python * 1000:.1f};desc="Python", '
+            f"total;dur={total * 1000:.1f}"
+        )
+    umbral = getattr(settings, "TIEMPOS_LENTO_MS", 500)
+    if umbral is not None and total * 1000 >= umbral:
+        logger.warning("peticion_lenta %s", json.dumps(_detalle(request, response, medicion, total), ensure_ascii=False))
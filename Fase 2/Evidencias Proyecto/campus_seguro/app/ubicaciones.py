@@ -0,0 +1,137 @@
+import json
+import time
+
+from django.core.cache import cache
+
+from app.models import Edificio, Piso, Sala
+
+
+# ===========================================
+# Árbol Edificio → Piso → Sala en caché
+# ===========================================
+# Se arma con tres consultas y se guarda bajo "ubicaciones:arbol:<versión>".
+# Las señales de Edificio/Piso/Sala suben la versión (invalidar), así que una
+# entrada vieja nunca se vuelve a leer. El ETag de /api/ubicaciones/ es la versión:
+# un 304 cuesta un solo cache.get. Con varios procesos la caché debe ser
+# compartida (Redis, Memcached, base de datos) para que todos vean la versión nueva.
+#
+# JSON compacto, listas en vez de objetos:
+#   {"v": versión, "edificios": [[id, nombre, codigo, [[piso_id, numero, etiqueta,
+#       [[sala_id, codigo, nombre], ...]], ...]], ...]}
+
+CLAVE_VERSION = "ubicaciones:version"
+
+
+def version():
+    # Inicial en milisegundos: si se vacía la caché no se repite un ETag ya entregado
+    cache.add(CLAVE_VERSION, int(time.time() * 1000), timeout=None)
+    return cache.get(CLAVE_VERSION)
+
+
+async def aversion():
+    await cache.aadd(CLAVE_VERSION, int(time.time() * 1000), timeout=None)
+    return await cache.aget(CLAVE_VERSION)
+
+
+def invalidar():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        version()
+
+
+def etag():
+    return f'"ubicaciones-{version()}"'
+
+
+def _consultas():
+    return (
+        Sala.objects.order_by("codigo").values_list("id", "piso_id", "codigo", "nombre"),
+        Piso.objects.order_by("numero").values_list("id", "edificio_id", "numero", "etiqueta"),
+        Edificio.objects.order_by("nombre").values_list("id", "nombre", "codigo"),
+    )
+
+
+def _construir(v, filas_salas, filas_pisos, filas_edificios):
+    salas = {}
+    for sala_id, piso_id, codigo, nombre in filas_salas:
+        salas.setdefault(piso_id, []).append([sala_id, codigo, nombre])
+
+    pisos = {}
+    for piso_id, edificio_id, numero, etiqueta in filas_pisos:
+        pisos.setdefault(edificio_id, []).append([piso_id, numero, etiqueta, salas.get(piso_id, [])])
+
+    edificios = [
+        [edificio_id, nombre, codigo, pisos.get(edificio_id, [])]
+        for edificio_id, nombre, codigo in filas_edificios
+    ]
+    return {"v": v, "edificios": edificios}
+
+
+def _empaquetar(datos):
+    return (datos, json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+def arbol():
+    """Devuelve (datos, json_bytes) del árbol de la versión vigente."""
+    v = version()
+    clave = f"ubicaciones:arbol:{v}"
+    guardado = cache.get(clave)
+    if guardado is None:
+        guardado = _empaquetar(_construir(v, *_consultas()))
+        cache.set(clave, guardado, timeout=24 * 3600)
+    return guardado
+
+
+async def aarbol():
+    """arbol() para vistas async."""
+    v = await aversion()
+    clave = f"ubicaciones:arbol:{v}"
+    guardado = await cache.aget(clave)
+    if guardado is None:
+        filas = []
+        for consulta in _consultas():
+            filas.append([fila async for fila in consulta])
+        guardado = _empaquetar(_construir(v, *filas))
+        await cache.aset(clave, guardado, timeout=24 * 3600)
+    return guardado
+
+
+# ===========================================
+# Consultas sobre el árbol (sin ir a la BD)
+# ===========================================
+def texto_piso(numero, etiqueta):
+    return f"Piso {numero} {('(' + etiqueta + ')') if etiqueta else ''}"
+
+
+def texto_sala(codigo, codigo_edificio):
+    return f"{codigo} — {codigo_edificio.upper()}"
+
+
+def opciones_edificios():
+    return [(e[0], e[1]) for e in arbol()[0]["edificios"]]
+
+
+# `datos` permite pasar un árbol ya obtenido (p. ej. con aarbol() en una vista async)
+def opciones_pisos(edificio_id, datos=None):
+    for e in (datos or arbol()[0])["edificios"]:
+        if e[0] == edificio_id:
+            return [(p[0], texto_piso(p[1], p[2])) for p in e[3]]
+    return []
+
+
+def opciones_salas(piso_id, datos=None):
+    for e in (datos or arbol()[0])["edificios"]:
+        for p in e[3]:
+            if p[0] == piso_id:
+                return [(s[0], texto_sala(s[1], e[2])) for s in p[3]]
+    return []
+
+
+def ubicar_sala(sala_id):
+    """(edificio_id, piso_id) de la sala, o (None, None) si no existe."""
+    for e in arbol()[0]["edificios"]:
+        for p in e[3]:
+            if any(s[0] == sala_id for s in p[3]):
+                return e[0], p[0]
+    return None, None
@@ -1,6 +1,7 @@
-from django.urls import path
-from . import views
-from app.views import home, usuario_principal, formulario_reporte, admin, asignar_mantenedor, ver_historial_asignacion, panel_admin, panel_admin_ubicacion, ReporteListView, ReporteCreateView, ReporteUpdateView, ReporteDeleteView, UsuarioListView, UsuarioCreateView, UsuarioUpdateView, UsuarioDeleteView, CategoriaListView, CategoriaCreateView, CategoriaUpdateView, CategoriaDeleteView, PrioridadListView, PrioridadCreateView, PrioridadUpdateView, PrioridadDeleteView, RolListView, RolCreateView, RolUpdateView, RolDeleteView, GeneroListView, GeneroCreateView, GeneroUpdateView, GeneroDeleteView, EdificioListView, EdificioCreateView, EdificioUpdateView, EdificioDeleteView, PisoListView, PisoCreateView, PisoUpdateView, PisoDeleteView, SalaListView, SalaCreateView, SalaUpdateView, SalaDeleteView, cargar_pisos, cargar_salas
+from django.conf import settings
+from django.urls import URLPattern, path
+from . import views, vistas_async
+from app.views import home, usuario_principal, formulario_reporte, admin, asignar_mantenedor, ver_historial_asignacion, panel_admin, panel_admin_ubicacion, ReporteListView, ReporteCreateView, ReporteUpdateView, ReporteDeleteView, UsuarioListView, UsuarioCreateView, UsuarioUpdateView, UsuarioDeleteView, CategoriaListView, CategoriaCreateView, CategoriaUpdateView, CategoriaDeleteView, PrioridadListView, PrioridadCreateView, PrioridadUpdateView, PrioridadDeleteView, RolListView, RolCreateView, RolUpdateView, RolDeleteView, GeneroListView, GeneroCreateView, GeneroUpdateView, GeneroDeleteView, EdificioListView, EdificioCreateView, EdificioUpdateView, EdificioDeleteView, PisoListView, PisoCreateView, PisoUpdateView, PisoDeleteView, SalaListView, SalaCreateView, SalaUpdateView, SalaDeleteView, cargar_pisos, cargar_salas, api_ubicaciones
 
 urlpatterns = [
     # 1. Página inicial → LOGIN
@@ -18,6 +19,9 @@ urlpatterns = [
 
     # 5. NUEVO: Actualizar estado de reporte (para el formulario en el template)
     path("mantenimiento/actualizar-estado/", views.actualizar_estado_reporte, name="actualizar_estado_reporte"),
+    path("mantenimiento/contadores/", views.obtener_contadores_dashboard, name="contadores-dashboard"),
+    path("mantenimiento/actualizar-estados/", views.actualizar_estados_reportes, name="actualizar_estados_reportes"),
+    path("eventos/", views.eventos_dashboard, name="eventos-dashboard"),
 
     # 4. Cierre de sesión
     path("logout/", views.logout_view, name="logout"),
@@ -33,10 +37,20 @@ urlpatterns = [
     
     path('administrador/reportes/<int:pk>/asignar/', asignar_mantenedor, name="asignar-mantenedor"),
     
+    path('administrador/reportes/asignar/', views.asignar_mantenedor_masivo, name="asignar-mantenedor-masivo"),
+
+    path('administrador/reportes/exportar/', views.exportar_reportes, name="exportar-reportes"),
+    
     path('administrador/panel/', panel_admin, name="panel-admin"),
     
     path('administrador/panel/ubicacion', panel_admin_ubicacion, name="panel-admin-ubicacion"),
 
+    path('administrador/panel/ubicacion/importar/', views.importar_ubicaciones, name="importar-ubicaciones"),
+
+    path('administrador/panel/analitica/', views.panel_analitica, name="panel-analitica"),
+
+    path('administrador/panel/perfiles/', views.perfiles, name="perfiles"),
+
     # Configuración de géneros
     path("administrador/panel/generos/", GeneroListView.as_view(), name="genero-list"),
     path("administrador/panel/generos/nuevo/", GeneroCreateView.as_view(), name="genero-create"),
@@ -93,4 +107,24 @@ urlpatterns = [
     
     path("api/pisos/", cargar_pisos, name="cargar-pisos"),
     path("api/salas/", cargar_salas, name="cargar-salas"),
+    path("api/ubicaciones/", api_ubicaciones, name="api-ubicaciones"),
 ]
+
+
+# ===========================================
+# Endpoints JSON calientes: async bajo ASGI (VISTAS_ASYNC)
+# ===========================================
+RUTAS_JSON = {"actualizar_estado_reporte", "contadores-dashboard", "asignar-mantenedor", "cargar-pisos", "cargar-salas"}
+
+
+def con_vistas(modulo):
+    """urlpatterns con los endpoints de RUTAS_JSON tomados de `modulo` (views o vistas_async)."""
+    return [
+        URLPattern(p.pattern, getattr(modulo, p.callback.__name__), p.default_args, p.name)
+        if p.name in RUTAS_JSON else p
+        for p in urlpatterns
+    ]
+
+
+if settings.VISTAS_ASYNC:
+    urlpatterns = con_vistas(vistas_async)
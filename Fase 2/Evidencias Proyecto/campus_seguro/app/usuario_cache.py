@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import constant_time_compare
+
+
+# ===========================================
+# Usuario autenticado en caché
+# ===========================================
+# AuthenticationMiddleware lee la fila de Usuario en cada petición, aunque la vista
+# solo mire nombre_rol. Aquí se guarda una foto de los campos que usan la app y
+# los templates ("usuario:<id>", USUARIO_CACHE_SEGUNDOS) y con ella se arma un
+# Usuario de verdad con el resto de campos diferidos: sirve para rol_requerido,
+# los templates y para asignarlo a una ForeignKey; si algo pide otro campo, Django
+# lo carga de la BD en ese momento.
+#
+# Los signals de Usuario borran la foto al guardar o eliminar: un cambio de rol,
+# una desactivación o un cambio de contraseña rigen desde la petición siguiente.
+# Los .update() masivos sobre Usuario no pasan por los signals: deben llamar a invalidar().
+
+CAMPOS = ("id", "username", "email", "first_name", "last_name", "nombre_rol",
+          "is_active", "is_staff", "is_superuser")
+
+
+def segundos():
+    """USUARIO_CACHE_SEGUNDOS en settings; 0 desactiva la caché."""
+    return getattr(settings, "USUARIO_CACHE_SEGUNDOS", 60)
+
+
+def clave(user_id):
+    return f"usuario:{user_id}"
+
+
+def invalidar(user_id):
+    cache.delete(clave(user_id))
+
+
+def _campos():
+    # from_db espera los valores en el orden de los campos del modelo
+    return [f.attname for f in get_user_model()._meta.concrete_fields if f.attname in CAMPOS]
+
+
+def _foto(user):
+    return {
+        "valores": [getattr(user, campo) for campo in _campos()],
+        # Mismo hash que guarda la sesión: si cambia la contraseña, ya no coincide
+        "hash": user.get_session_auth_hash(),
+    }
+
+
+def _desde_foto(foto, session_hash, backend_path):
+    """Usuario armado con la foto, o None si no sirve para esta sesión."""
+    if foto is None or not constant_time_compare(session_hash or "", foto["hash"]):
+        return None
+    user = get_user_model().from_db(DEFAULT_DB_ALIAS, _campos(), foto["valores"])
+    user.backend = backend_path
+    return user
+
+
+def obtener_usuario(request):
+    """Como django.contrib.auth.get_user, pero leyendo la foto en caché cuando existe."""
+    if not segundos():
+        return auth.get_user(request)
+
+    try:
+        user_id = get_user_model()._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+
+    user = _desde_foto(cache.get(clave(user_id)), request.session.get(HASH_SESSION_KEY), backend_path)
+    if user is None:
+        # Camino normal de Django: valida la sesión (y la cierra si no corresponde)
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            cache.set(clave(user.pk), _foto(user), segundos())
+    return user
+
+
+async def aobtener_usuario(request):
+    """Versión async (request.auser()): sesión y caché con las APIs async de Django."""
+    if not segundos():
+        return await auth.aget_user(request)
+
+    user_id = await request.session.aget(SESSION_KEY)
+    backend_path = await request.session.aget(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path is None:
+        return await auth.aget_user(request)
+
+    user_id = get_user_model()._meta.pk.to_python(user_id)
+    foto = await cache.aget(clave(user_id))
+    user = _desde_foto(foto, await request.session.aget(HASH_SESSION_KEY), backend_path)
+    if user is None:
+        user = await auth.aget_user(request)
+        if user.is_authenticated:
+            await cache.aset(clave(user.pk), _foto(user), segundos())
+    return user
@@ -1,19 +1,31 @@
+import io
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import iscoroutinefunction
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
-from app.models import Usuario, Genero, Prioridad, Rol, Categoria, Edificio, Piso, Sala, Reporte, HistorialAsignacion
-from django.core.paginator import Paginator
+from app.models import Usuario, Genero, Prioridad, Rol, Categoria, Edificio, Piso, Sala, Reporte, HistorialAsignacion, HistorialEstado, ContadorEstado, MarcaResumen, ResumenDiario
+from app import analitica, bd, eventos, exportacion, importacion, perfilador, ubicaciones
+from app.busqueda import buscar
+from app.condicional import pagina_condicional
+from app.paginacion import KeysetPaginator
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Q
+from django.db import connection
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from app.forms import PisoForm, ReporteForm, RegistroUsuarioForm, CategoriaForm, PrioridadForm, RolForm, GeneroForm, EdificioForm, SalaForm
+from app.forms import PisoForm, ReporteForm, RegistroUsuarioForm, CategoriaForm, PrioridadForm, RolForm, GeneroForm, EdificioForm, SalaForm, ImportarUbicacionesForm
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from functools import wraps
-from django.http import JsonResponse, HttpResponseForbidden
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.utils.decorators import method_decorator
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import etag, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.core.exceptions import ValidationError
 
 User = get_user_model()
 
@@ -21,41 +33,61 @@ User = get_user_model()
 # DECORADOR DE CONTROL DE ROLES (CORREGIDO)
 # ===========================================
 def rol_requerido(roles_permitidos):
+    def rechazo(request, user):
+        """Redirección si el usuario no puede entrar, o None."""
+        if not user.is_authenticated:
+            messages.warning(request, "Debes iniciar sesión.")
+            return redirect("login")
+
+        if user.nombre_rol not in roles_permitidos:
+            messages.error(request, "Acceso denegado: no tienes permiso para ver esta página.")
+            if user.nombre_rol == "mantenimiento":
+                return redirect("mantenimiento")
+            elif user.nombre_rol == "administracion":
+                return redirect("admin")
+            else:
+                return redirect("usuario_principal")
+        return None
+
     def decorador(view_func):
+        # Vistas async (app.vistas_async): el usuario se obtiene con request.auser()
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper_async(request, *args, **kwargs):
+                respuesta = rechazo(request, await request.auser())
+                if respuesta is not None:
+                    return respuesta
+                return await view_func(request, *args, **kwargs)
+            return wrapper_async
+
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            if not request.user.is_authenticated:
-                messages.warning(request, "Debes iniciar sesión.")
-                return redirect("login")
-
-            if request.user.nombre_rol not in roles_permitidos:
-                messages.error(request, "Acceso denegado: no tienes permiso para ver esta página.")
-                if request.user.nombre_rol == "mantenimiento":
-                    return redirect("mantenimiento")
-                elif request.user.nombre_rol == "administracion":
-                    return redirect("admin")
-                else:
-                    return redirect("usuario_principal")
-
+            respuesta = rechazo(request, request.user)
+            if respuesta is not None:
+                return respuesta
             return view_func(request, *args, **kwargs)
         return wrapper
     return decorador
 
 
+def _contar_por_estado(reportes):
+    """Los cinco contadores del dashboard en una sola pasada sobre un queryset filtrado."""
+    return reportes.order_by().aggregate(
+        total=Count('id'),
+        pendientes=Count('id', filter=Q(estado='pendiente')),
+        en_proceso=Count('id', filter=Q(estado='en_proceso')),
+        pausados=Count('id', filter=Q(estado='pausado')),
+        completados=Count('id', filter=Q(estado='completado')),
+    )
+
+
 # 👇 NUEVA VISTA: Obtener contadores para el dashboard de mantenimiento
 @login_required
 def obtener_contadores_dashboard(request):
     if request.user.nombre_rol != "mantenimiento":
         return JsonResponse({"error": "No autorizado"}, status=403)
     
-    reportes = Reporte.objects.filter(asignado_a=request.user)
-    contadores = {
-        "total": reportes.count(),
-        "pendientes": reportes.filter(estado="pendiente").count(),
-        "en_proceso": reportes.filter(estado="en_proceso").count(),
-        "pausados": reportes.filter(estado="pausado").count(),
-        "completados": reportes.filter(estado="completado").count(),
-    }
+    contadores = ContadorEstado.objects.resumen(mantenedor=request.user)
     return JsonResponse({"success": True, "contadores": contadores})
 
 
@@ -63,6 +95,7 @@ def obtener_contadores_dashboard(request):
 # 👇 CORREGIDA: El reporte_id viene del POST, no de la URL
 @require_POST
 @login_required
+@bd.escritura()
 def actualizar_estado_reporte(request):  # ← Sin reporte_id aquí
     if request.user.nombre_rol != "mantenimiento":
         return JsonResponse({"error": "No autorizado"}, status=403)
@@ -72,76 +105,247 @@ def actualizar_estado_reporte(request):  # ← Sin reporte_id aquí
     if not reporte_id:
         return JsonResponse({"error": "ID de reporte no proporcionado."}, status=400)
 
+    datos, status = _cambiar_estado(request.user, reporte_id, request.POST.get("nuevo_estado"))
+    return JsonResponse(datos, status=status)
+
+
+def _cambiar_estado(mantenedor, reporte_id, nuevo_estado):
+    """
+    Lee el reporte del mantenedor, lo valida y le cambia el estado. Devuelve (JSON, status).
+    Debe correr dentro de la transacción de escritura, lectura incluida: Reporte.save toma
+    el estado anterior (historial y contadores) de lo que se leyó aquí. La comparten
+    actualizar_estado_reporte y su versión async (app.vistas_async).
+    """
     try:
-        reporte = Reporte.objects.get(id=reporte_id, asignado_a=request.user)
-    except Reporte.DoesNotExist:
-        return JsonResponse({"error": "Reporte no encontrado o no tienes permiso."}, status=404)
+        # FOR UPDATE: en PostgreSQL otro cambio de estado espera a que este termine
+        reporte = Reporte.objects.select_for_update().get(id=reporte_id, asignado_a=mantenedor)
+    except (Reporte.DoesNotExist, ValueError):
+        return {"error": "Reporte no encontrado o no tienes permiso."}, 404
 
-    nuevo_estado = request.POST.get("nuevo_estado")
     if nuevo_estado not in dict(Reporte.ESTADO_CHOICES):
-        return JsonResponse({"error": "Estado no válido."}, status=400)
+        return {"error": "Estado no válido."}, 400
 
     reporte.estado = nuevo_estado
-    reporte.save()
-
-    # Obtener los contadores actualizados
-    reportes = Reporte.objects.filter(asignado_a=request.user)
-    contadores = {
-        "total": reportes.count(),
-        "pendientes": reportes.filter(estado="pendiente").count(),
-        "en_proceso": reportes.filter(estado="en_proceso").count(),
-        "pausados": reportes.filter(estado="pausado").count(),
-        "completados": reportes.filter(estado="completado").count(),
-    }
+    try:
+        reporte.save(update_fields=["estado", "updated"])
+    except ValidationError as e:
+        return {"error": e.messages[0]}, 409
 
-    return JsonResponse({
+    return {
         "success": True,
         "nuevo_estado": reporte.get_estado_display(),
-        "contadores": contadores,
+        # Obtener los contadores actualizados (una sola lectura de la tabla materializada)
+        "contadores": ContadorEstado.objects.resumen(mantenedor=mantenedor),
         "reporte_id": reporte_id,
-    })
+    }, 200
 
 
-# 👇 VISTA CORREGIDA: Dashboard de Mantenimiento
-@rol_requerido(["mantenimiento"])
+# ===========================================
+# CAMBIOS DE ESTADO EN LOTE (cola offline del mantenedor)
+# ===========================================
+MAX_CAMBIOS_LOTE = 200
+
+
+def _instante_cliente(valor):
+    """
+    client_timestamp en UTC, o None si no viene o no se entiende. Acepta ISO 8601
+    (con Z, con offset o sin zona: hora local de TIME_ZONE) y epoch en segundos o ms.
+    """
+    if isinstance(valor, str):
+        try:
+            instante = datetime.fromisoformat(valor.strip())
+        except ValueError:
+            try:
+                valor = float(valor)
+            except ValueError:
+                return None
+        else:
+            if timezone.is_naive(instante):
+                instante = timezone.make_aware(instante)
+            return instante.astimezone(dt_timezone.utc)
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        # Date.now() del navegador viene en milisegundos
+        segundos = valor / 1000 if abs(valor) >= 1e11 else valor
+        try:
+            return datetime.fromtimestamp(segundos, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    return None
+
+@require_POST
 @login_required
-def mantenimiento(request):
-    # ✅ Elimina la validación manual: el decorador ya la hace
-    reportes = Reporte.objects.filter(asignado_a=request.user).order_by('-created')
+@bd.escritura()
+def actualizar_estados_reportes(request):
+    """
+    Body JSON: [{"reporte_id": 1, "nuevo_estado": "pausado", "client_timestamp": "…"}, …]
+    (o {"cambios": [...]}). Los cambios se aplican en el orden de client_timestamp
+    (ver _instante_cliente), así varios cambios encolados sobre un mismo reporte quedan
+    en el historial; uno sin timestamp conserva su lugar detrás del anterior del envío.
+    Devuelve un resultado por cambio, en el orden recibido, y los contadores una vez.
+    """
+    if request.user.nombre_rol != "mantenimiento":
+        return JsonResponse({"error": "No autorizado"}, status=403)
 
+    try:
+        cambios = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "JSON inválido."}, status=400)
+    if isinstance(cambios, dict):
+        cambios = cambios.get("cambios")
+    if not isinstance(cambios, list) or not cambios:
+        return JsonResponse({"error": "Se esperaba una lista de cambios."}, status=400)
+    if len(cambios) > MAX_CAMBIOS_LOTE:
+        return JsonResponse({"error": f"Máximo {MAX_CAMBIOS_LOTE} cambios por envío."}, status=400)
+
+    estados_validos = dict(Reporte.ESTADO_CHOICES)
+    resultados = [None] * len(cambios)
+    validos = []
+    # Sin timestamp (o ilegible), un cambio va justo detrás del anterior del envío
+    instante = datetime.min.replace(tzinfo=dt_timezone.utc)
+    for i, cambio in enumerate(cambios):
+        if not isinstance(cambio, dict):
+            resultados[i] = {"success": False, "error": "Cambio mal formado."}
+            continue
+        try:
+            reporte_id = int(cambio.get("reporte_id"))
+        except (TypeError, ValueError):
+            resultados[i] = {"success": False, "error": "ID de reporte no proporcionado."}
+            continue
+        if cambio.get("nuevo_estado") not in estados_validos:
+            resultados[i] = {"reporte_id": reporte_id, "success": False, "error": "Estado no válido."}
+            continue
+        instante = _instante_cliente(cambio.get("client_timestamp")) or instante
+        validos.append((instante, i, reporte_id, cambio["nuevo_estado"]))
+
+    # Una sola consulta: solo los reportes asignados a este mantenedor
+    inicial = dict(
+        Reporte.objects.select_for_update()
+        .filter(pk__in={v[2] for v in validos}, asignado_a=request.user)
+        .values_list('id', 'estado')
+    )
+    actual = dict(inicial)
+    historial = []
+    aplicados = {}  # reporte_id → índices de sus cambios aceptados
+
+    # Por instante en UTC; a igual instante, en el orden de envío
+    for _, i, reporte_id, nuevo_estado in sorted(validos, key=lambda v: v[:2]):
+        if reporte_id not in actual:
+            resultados[i] = {"reporte_id": reporte_id, "success": False,
+                             "error": "Reporte no encontrado o no tienes permiso."}
+            continue
+        if actual[reporte_id] == 'completado' and nuevo_estado != 'completado':
+            resultados[i] = {"reporte_id": reporte_id, "success": False,
+                             "error": "Reporte completado: no se pueden modificar estado ni mantenedor."}
+            continue
+        if nuevo_estado != actual[reporte_id]:
+            historial.append(HistorialEstado(
+                reporte_id=reporte_id, estado_anterior=actual[reporte_id],
+                estado_nuevo=nuevo_estado, cambiado_por=request.user,
+            ))
+            actual[reporte_id] = nuevo_estado
+        aplicados.setdefault(reporte_id, []).append(i)
+        resultados[i] = {"reporte_id": reporte_id, "success": True,
+                         "nuevo_estado": estados_validos[nuevo_estado]}
+
+    # Un UPDATE por estado final
+    grupos = {}
+    for reporte_id, estado in actual.items():
+        if estado != inicial[reporte_id]:
+            grupos.setdefault(estado, []).append(reporte_id)
+    now = timezone.now()
+    escritos = 0
+    for estado, pks in grupos.items():
+        escritos += Reporte.objects.filter(pk__in=pks, asignado_a=request.user).exclude(estado='completado') \
+            .update(estado=estado, updated=now)
+
+    # Historial y contadores solo de las filas que el UPDATE cambió
+    cambiados = {pk: estado for estado, pks in grupos.items() for pk in pks}
+    if escritos < len(cambiados):
+        # Otro proceso lo completó, reasignó o borró después de la lectura
+        filas = {
+            pk: (estado, asignado_id, updated)
+            for pk, estado, asignado_id, updated in Reporte.objects.filter(pk__in=cambiados)
+            .values_list('id', 'estado', 'asignado_a_id', 'updated')
+        }
+        omitidos = {pk for pk in cambiados if pk not in filas or filas[pk][2] != now}
+        for pk in omitidos:
+            del cambiados[pk]
+            error = ("Reporte completado: no se pueden modificar estado ni mantenedor."
+                     if pk in filas and filas[pk][:2] == ('completado', request.user.pk)
+                     else "Reporte no encontrado o no tienes permiso.")
+            for i in aplicados[pk]:
+                resultados[i] = {"reporte_id": pk, "success": False, "error": error}
+        historial = [h for h in historial if h.reporte_id not in omitidos]
+
+    HistorialEstado.objects.bulk_create(historial)
+    ContadorEstado.objects.registrar_cambios([
+        ((request.user.pk, inicial[pk]), (request.user.pk, estado))
+        for pk, estado in cambiados.items()
+    ])
+    # update() y bulk_create no pasan por los signals: los eventos en vivo se publican aquí
+    for pk, estado in cambiados.items():
+        eventos.publicar(eventos.evento(
+            "actualizado", pk, (request.user.pk, inicial[pk]), (request.user.pk, estado)
+        ))
+
+    return JsonResponse({
+        "success": True,
+        "resultados": resultados,
+        "contadores": ContadorEstado.objects.resumen(mantenedor=request.user),
+    })
+
+# 👇 VISTA CORREGIDA: Dashboard de Mantenimiento
+def _filtrar_reportes(request, reportes):
+    """Búsqueda y filtros de los dashboards: (reportes, orden, busqueda, estado, prioridad)."""
     busqueda = request.GET.get('busqueda', '').strip()
     estado_filtro = request.GET.get('estado', 'todos')
     prioridad_filtro = request.GET.get('prioridad', 'todas')
 
-    if busqueda:
-        reportes = reportes.filter(
-            Q(titulo__icontains=busqueda) |
-            Q(descripcion__icontains=busqueda) |
-            Q(ubicacion__icontains=busqueda)
-        )
+    reportes, orden = buscar(reportes, busqueda)
     if estado_filtro != 'todos':
         reportes = reportes.filter(estado=estado_filtro)
     if prioridad_filtro != 'todas':
         reportes = reportes.filter(prioridad=prioridad_filtro)
+    return reportes, orden, busqueda, estado_filtro, prioridad_filtro
+
 
-    total = reportes.count()
-    pendientes = reportes.filter(estado='pendiente').count()
-    en_proceso = reportes.filter(estado='en_proceso').count()
-    pausados = reportes.filter(estado='pausado').count()
-    completados = reportes.filter(estado='completado').count()
+def _sonda_reportes(reportes):
+    """Frescura de un listado: último updated y cantidad (borrados o que salen del filtro)."""
+    datos = reportes.order_by().aggregate(ultimo=Max('updated'), cantidad=Count('id'))
+    # Las salas se muestran por nombre: también cuenta la versión del árbol de ubicaciones
+    return [datos["ultimo"], datos["cantidad"], ubicaciones.version()], datos["ultimo"]
+
+
+def _sonda_mantenimiento(request):
+    reportes = Reporte.objects.filter(asignado_a=request.user)
+    return _sonda_reportes(_filtrar_reportes(request, reportes)[0])
 
-    paginator = Paginator(reportes, 10)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+
+@rol_requerido(["mantenimiento"])
+@login_required
+@pagina_condicional(_sonda_mantenimiento)
+def mantenimiento(request):
+    # ✅ Elimina la validación manual: el decorador ya la hace
+    reportes = Reporte.objects.filter(asignado_a=request.user).order_by('-created')
+    reportes, orden, busqueda, estado_filtro, prioridad_filtro = _filtrar_reportes(request, reportes)
+
+    # Sin filtros: tabla materializada; con filtros: un único COUNT agrupado
+    if busqueda or estado_filtro != 'todos' or prioridad_filtro != 'todas':
+        contadores = _contar_por_estado(reportes)
+    else:
+        contadores = ContadorEstado.objects.resumen(mantenedor=request.user)
+
+    paginator = KeysetPaginator(reportes.select_related('usuario', 'sala', 'asignado_a'), 10, total=contadores["total"], orden=orden)
+    page_obj = paginator.get_page(request.GET)
 
     context = {
         "reportes": page_obj,
         "page_obj": page_obj,
-        "total": total,
-        "pendientes": pendientes,
-        "en_proceso": en_proceso,
-        "pausados": pausados,
-        "completados": completados,
+        "total": contadores["total"],
+        "pendientes": contadores["pendientes"],
+        "en_proceso": contadores["en_proceso"],
+        "pausados": contadores["pausados"],
+        "completados": contadores["completados"],
         "busqueda": busqueda,
         "estado_filtro": estado_filtro,
         "prioridad_filtro": prioridad_filtro,
@@ -191,11 +395,8 @@ def login_view(request):
     if request.method == "POST":
         identificador = (request.POST.get("email") or "").strip().lower()
         password = request.POST.get("password") or ""
-        user = None
-
-        u = Usuario.objects.filter(email__iexact=identificador).first()
-        if u:
-            user = authenticate(request, username=u.username, password=password)
+        # app.autenticacion.EmailBackend: una consulta y un hash por intento
+        user = authenticate(request, email=identificador, password=password)
 
         if user is not None and user.is_active:
             login(request, user)
@@ -214,13 +415,17 @@ def login_view(request):
 
 
 # 3 PANEL PRINCIPAL (usuario_principal.html)
+def _sonda_usuario_principal(request):
+    return _sonda_reportes(Reporte.objects.filter(usuario=request.user))
+
+
 @rol_requerido(["usuario"])
 @login_required
+@pagina_condicional(_sonda_usuario_principal)
 def usuario_principal(request):
-    reportes = Reporte.objects.filter(usuario=request.user).order_by('-created')
-    paginator = Paginator(reportes, 4)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    reportes = Reporte.objects.filter(usuario=request.user).select_related('sala')
+    paginator = KeysetPaginator(reportes, 4)
+    page_obj = paginator.get_page(request.GET)
 
     return render(request, "app/usuario_principal.html", {
         "reportes": page_obj,
@@ -229,17 +434,38 @@ def usuario_principal(request):
 
 # 👇 NUEVA VISTA: Ver el historial de estados de un reporte
 # ✅ CORREGIDO: Ahora permite el acceso a "usuario" y "mantenimiento"
+def _reportes_visibles(user):
+    # El mantenedor ve el reporte si está asignado a él, el usuario si lo creó.
+    if user.nombre_rol == "mantenimiento":
+        return Reporte.objects.filter(asignado_a=user)
+    return Reporte.objects.filter(usuario=user)
+
+
+def _sonda_historial(reportes, reporte_id, relacion, campo_fecha):
+    """Frescura de una página de historial: el reporte y la última entrada, en una consulta."""
+    datos = reportes.filter(id=reporte_id).aggregate(
+        existe=Max('id'),  # NULL si el reporte no existe o no es visible
+        updated=Max('updated'),
+        ultimo=Max(f'{relacion}__{campo_fecha}'),
+        entradas=Count(relacion),
+    )
+    if datos["existe"] is None:
+        return None  # la vista responde 404
+    return list(datos.values()), max(f for f in (datos["updated"], datos["ultimo"]) if f is not None)
+
+
+def _sonda_historial_reporte(request, reporte_id):
+    return _sonda_historial(_reportes_visibles(request.user), reporte_id, 'historial_estados', 'fecha_cambio')
+
+
 @rol_requerido(["usuario", "mantenimiento"])  # <-- Esta es la línea clave corregida
 @login_required
+@pagina_condicional(_sonda_historial_reporte)
 def ver_historial_reporte(request, reporte_id):
     """
     Vista para mostrar el historial de cambios de estado de un reporte.
     """
-    # El mantenedor ve el reporte si está asignado a él, el usuario si lo creó.
-    if request.user.nombre_rol == "mantenimiento":
-        reporte = get_object_or_404(Reporte, id=reporte_id, asignado_a=request.user)
-    else: # rol "usuario"
-        reporte = get_object_or_404(Reporte, id=reporte_id, usuario=request.user)
+    reporte = get_object_or_404(_reportes_visibles(request.user), id=reporte_id)
     
     historial = reporte.historial_estados.select_related('cambiado_por').order_by('-fecha_cambio')
     
@@ -249,8 +475,13 @@ def ver_historial_reporte(request, reporte_id):
         'tipo_historial': 'estado',
     })
 
+def _sonda_historial_asignacion(request, reporte_id):
+    return _sonda_historial(Reporte.objects.all(), reporte_id, 'historial_asignaciones', 'creado_en')
+
+
 @rol_requerido(["administracion"])
 @login_required
+@pagina_condicional(_sonda_historial_asignacion)
 def ver_historial_asignacion(request, reporte_id):
     reporte = get_object_or_404(Reporte, id=reporte_id)
 
@@ -291,32 +522,48 @@ def formulario_reporte(request):
 
     return render(request, "app/form_reporte.html", {"form": form})
 
+# ===========================================
+# Ubicaciones: árbol Edificio ➜ Piso ➜ Sala
+# ===========================================
+# El formulario pide el árbol completo una vez y filtra en el navegador.
+# ETag = versión del árbol en caché: si no cambió, responde 304 sin tocar la BD.
+@login_required
+@rol_requerido(["usuario", "administracion"])
+@etag(lambda request: ubicaciones.etag())
+def api_ubicaciones(request):
+    _, contenido = ubicaciones.arbol()
+    response = HttpResponse(contenido, content_type="application/json")
+    # Privada y siempre revalidada: el navegador la guarda y pregunta con If-None-Match
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 @login_required
 @rol_requerido(["usuario", "administracion"])
 def cargar_pisos(request):
-    edificio_id = request.GET.get("edificio_id")
-    pisos = Piso.objects.filter(edificio_id=edificio_id).order_by("numero")
-    data = [
-        {"id": p.id, "texto": f"Piso {p.numero} {('(' + p.etiqueta + ')') if p.etiqueta else ''}"}
-        for p in pisos
-    ]
+    try:
+        edificio_id = int(request.GET.get("edificio_id"))
+    except (ValueError, TypeError):
+        edificio_id = None
+    data = [{"id": pk, "texto": texto} for pk, texto in ubicaciones.opciones_pisos(edificio_id)]
     return JsonResponse({"pisos": data})
 
 @login_required
 @rol_requerido(["usuario", "administracion"])
 def cargar_salas(request):
-    piso_id = request.GET.get("piso_id")
-    salas = Sala.objects.filter(piso_id=piso_id).order_by("codigo")
-    data = [
-        {"id": s.id, "texto": f"{s.codigo} — {s.edificio.codigo.upper()}"}
-        for s in salas
-    ]
+    try:
+        piso_id = int(request.GET.get("piso_id"))
+    except (ValueError, TypeError):
+        piso_id = None
+    data = [{"id": pk, "texto": texto} for pk, texto in ubicaciones.opciones_salas(piso_id)]
     return JsonResponse({"salas": data})
 
 
 # ===========================================
 # Vistas de administración protegidas
 # ===========================================
+# Asignaciones: otro administrador tiene tomado el reporte (SKIP LOCKED, solo PostgreSQL)
+REPORTE_OCUPADO = "Otro usuario está modificando este reporte. Intenta de nuevo en unos segundos."
+
 def _qs_mantenedores():
     return User.objects.filter(nombre_rol__iexact='mantenimiento', is_active=True).order_by('first_name', 'last_name')
 
@@ -324,40 +571,26 @@ def _qs_mantenedores():
 @login_required
 def admin(request): 
     reportes = Reporte.objects.all().order_by('-created')
-    busqueda = request.GET.get('busqueda', '').strip()
-    estado_filtro = request.GET.get('estado', 'todos')
-    prioridad_filtro = request.GET.get('prioridad', 'todas')
+    reportes, orden, busqueda, estado_filtro, prioridad_filtro = _filtrar_reportes(request, reportes)
     mantenedores = _qs_mantenedores()
 
-    if busqueda:
-        reportes = reportes.filter(
-            Q(titulo__icontains=busqueda) |
-            Q(descripcion__icontains=busqueda) |
-            Q(ubicacion__icontains=busqueda)
-        )
-    if estado_filtro != 'todos':
-        reportes = reportes.filter(estado=estado_filtro)
-    if prioridad_filtro != 'todas':
-        reportes = reportes.filter(prioridad=prioridad_filtro)
-
-    total = reportes.count()
-    pendientes = reportes.filter(estado='pendiente').count()
-    en_proceso = reportes.filter(estado='en_proceso').count()
-    pausados = reportes.filter(estado='pausado').count()
-    completados = reportes.filter(estado='completado').count()
+    # Sin filtros: tabla materializada; con filtros: un único COUNT agrupado
+    if busqueda or estado_filtro != 'todos' or prioridad_filtro != 'todas':
+        contadores = _contar_por_estado(reportes)
+    else:
+        contadores = ContadorEstado.objects.resumen()
 
-    paginator = Paginator(reportes, 10)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(reportes.select_related('usuario', 'sala', 'asignado_a'), 10, total=contadores["total"], orden=orden)
+    page_obj = paginator.get_page(request.GET)
 
     context = {
         "reportes": page_obj,
         "page_obj": page_obj,
-        "total": total,
-        "pendientes": pendientes,
-        "en_proceso": en_proceso,
-        "pausados": pausados,
-        "completados": completados,
+        "total": contadores["total"],
+        "pendientes": contadores["pendientes"],
+        "en_proceso": contadores["en_proceso"],
+        "pausados": contadores["pausados"],
+        "completados": contadores["completados"],
         "busqueda": busqueda,
         "estado_filtro": estado_filtro,
         "prioridad_filtro": prioridad_filtro,
@@ -365,34 +598,84 @@ def admin(request):
     }
     return render(request, "app/admin.html", context)
 
+FORMATOS_EXPORTACION = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
 @rol_requerido(["administracion"])
 @login_required
+def exportar_reportes(request):
+    """Listado del admin (mismos filtros) como CSV o XLSX, generado fila a fila."""
+    formato = request.GET.get("formato", "csv")
+    if formato not in FORMATOS_EXPORTACION:
+        return HttpResponse("Formato no soportado.", status=400)
+
+    reportes = Reporte.objects.all().order_by('-created')
+    reportes, orden, *_ = _filtrar_reportes(request, reportes)
+    # El orden del listado ('-created' o 'rank'), con el id como desempate igual que KeysetPaginator
+    filas = exportacion.filas(reportes.order_by(orden, '-id' if orden.startswith('-') else 'id'))
+    generador = exportacion.xlsx_stream(filas) if formato == "xlsx" else exportacion.csv_stream(filas)
+
+    response = StreamingHttpResponse(generador, content_type=FORMATOS_EXPORTACION[formato])
+    nombre = f"reportes-{timezone.localtime():%Y%m%d-%H%M}.{formato}"
+    response["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    return response
+
+@rol_requerido(["administracion"])
+@login_required
+@bd.escritura()
 def asignar_mantenedor(request, pk):
     if not (request.user.is_staff or request.user.is_superuser or request.user.nombre_rol == "administracion"):
         return HttpResponseForbidden("No autorizado")
 
-    reporte = get_object_or_404(Reporte, pk=pk)
+    datos, status = _asignar(pk, request.POST.get('asignado_a'), request.user)
+    return JsonResponse(datos, status=status)
+
+
+def _asignar(pk, asignado_id, cambiado_por):
+    """
+    Lee el reporte, valida y aplica la asignación. Devuelve (JSON, status); Http404 si
+    no existe. Debe correr dentro de la transacción de escritura, lectura incluida; la
+    comparten asignar_mantenedor y su versión async (app.vistas_async).
+    """
+    # PostgreSQL: SKIP LOCKED, si otro administrador está asignando este reporte se avisa
+    # en vez de esperarlo y pisar su cambio. SQLite ignora FOR UPDATE (BEGIN IMMEDIATE ya
+    # deja un solo escritor)
+    reporte = Reporte.objects.select_for_update(skip_locked=True).filter(pk=pk).first()
+    if reporte is None:
+        get_object_or_404(Reporte, pk=pk)
+        return {"ok": False, "error": REPORTE_OCUPADO}, 409
 
     # 🚫 No permitir gestionar un reporte completado
     if reporte.estado == 'completado':
-        return JsonResponse(
-            {"ok": False, "error": "Este reporte está completado y no admite cambios."},
-            status=409
-        )
+        return {"ok": False, "error": "Este reporte está completado y no admite cambios."}, 409
 
-    asignado_id = request.POST.get('asignado_a')
-    mantenedores = _qs_mantenedores()
+    mantenedor = None
+    if asignado_id not in (None, "", "null"):
+        try:
+            mantenedor = _qs_mantenedores().get(pk=asignado_id)
+        except (User.DoesNotExist, ValueError):
+            return {"ok": False, "error": "Mantenedor inválido."}, 400
+
+    return _aplicar_asignacion(reporte, mantenedor, cambiado_por), 200
 
+def _aplicar_asignacion(reporte, mantenedor, cambiado_por):
+    """
+    Asigna (o desasigna, con mantenedor=None) un reporte no completado y registra el
+    historial. Devuelve el JSON de respuesta. Debe correr dentro de una transacción
+    (la de _asignar).
+    """
     # Valores previos para historial
     asignado_de = reporte.asignado_a
     estado_de = reporte.estado
     prev_id = reporte.asignado_a_id
 
     # ---- DESASIGNAR ----
-    if asignado_id in (None, "", "null"):
+    if mantenedor is None:
         # Si ya está sin asignación y en pendiente, no hay cambios
         if prev_id is None and reporte.estado == 'pendiente' and reporte.fecha_asignacion is None:
-            return JsonResponse({
+            return {
                 "ok": True,
                 "reporte_id": reporte.pk,
                 "asignado_nombre": "Sin asignar",
@@ -400,7 +683,7 @@ def asignar_mantenedor(request, pk):
                 "estado_slug": reporte.estado,
                 "fecha_asignacion": None,
                 "sin_cambios": True,
-            })
+            }
 
         # Desasignar y regresar a 'pendiente'
         reporte.asignado_a = None
@@ -418,7 +701,7 @@ def asignar_mantenedor(request, pk):
             asignado_a=None,
             estado_de=estado_de,
             estado_a=reporte.estado,
-            cambiado_por=request.user,
+            cambiado_por=cambiado_por,
             motivo="Desasignación",
         )
 
@@ -426,23 +709,17 @@ def asignar_mantenedor(request, pk):
 
     # ---- ASIGNAR / REASIGNAR ----
     else:
-        try:
-            mantenedor = mantenedores.get(pk=asignado_id)
-        except User.DoesNotExist:
-            return JsonResponse({"ok": False, "error": "Mantenedor inválido."}, status=400)
-
         # Si el mantenedor no cambia y el estado no cambiará, evita escritura
         proximo_estado = 'en_proceso' if reporte.estado == 'pendiente' else reporte.estado
         if prev_id == mantenedor.id and proximo_estado == reporte.estado:
-            asignado_nombre = (f"{mantenedor.first_name} {mantenedor.last_name}").strip() or mantenedor.username
-            return JsonResponse({
+            return {
                 "ok": True,
                 "reporte_id": reporte.pk,
-                "asignado_nombre": asignado_nombre,
+                "asignado_nombre": _nombre_mantenedor(mantenedor),
                 "estado": reporte.get_estado_display(),
                 "fecha_asignacion": reporte.fecha_asignacion.isoformat() if reporte.fecha_asignacion else None,
                 "sin_cambios": True,
-            })
+            }
 
         reporte.asignado_a = mantenedor
         now = timezone.now()
@@ -470,30 +747,334 @@ def asignar_mantenedor(request, pk):
             asignado_a=mantenedor,
             estado_de=estado_de,
             estado_a=reporte.estado,
-            cambiado_por=request.user,
+            cambiado_por=cambiado_por,
             motivo=("Asignación" if prev_id is None else "Reasignación"),
         )
 
-        asignado_nombre = (f"{mantenedor.first_name} {mantenedor.last_name}").strip() or mantenedor.username
+        asignado_nombre = _nombre_mantenedor(mantenedor)
 
-    return JsonResponse({
+    return {
         "ok": True,
         "reporte_id": reporte.pk,
         "asignado_nombre": asignado_nombre,
         "estado": reporte.get_estado_display(),
         "fecha_asignacion": reporte.fecha_asignacion.isoformat() if reporte.fecha_asignacion else None,
+    }
+
+def _nombre_mantenedor(mantenedor):
+    return (f"{mantenedor.first_name} {mantenedor.last_name}").strip() or mantenedor.username
+
+# ===========================================
+# ASIGNACIÓN MASIVA
+# ===========================================
+MAX_ASIGNACION_MASIVA = 500
+
+@rol_requerido(["administracion"])
+@login_required
+@require_POST
+@bd.escritura()
+def asignar_mantenedor_masivo(request):
+    """
+    Asigna, reasigna o desasigna varios reportes a la vez.
+    POST: ids (repetido o separado por comas) y asignado_a ("" para desasignar).
+    Mismas reglas que asignar_mantenedor, pero con un UPDATE por estado de destino,
+    un bulk_create por historial y un único ajuste de contadores.
+    """
+    if not (request.user.is_staff or request.user.is_superuser or request.user.nombre_rol == "administracion"):
+        return HttpResponseForbidden("No autorizado")
+
+    try:
+        ids = list(dict.fromkeys(
+            int(i) for valor in request.POST.getlist('ids') for i in valor.split(',') if i.strip()
+        ))
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "Lista de reportes inválida."}, status=400)
+    if not ids:
+        return JsonResponse({"ok": False, "error": "No se seleccionaron reportes."}, status=400)
+    if len(ids) > MAX_ASIGNACION_MASIVA:
+        return JsonResponse(
+            {"ok": False, "error": f"Máximo {MAX_ASIGNACION_MASIVA} reportes por operación."},
+            status=400
+        )
+
+    asignado_id = request.POST.get('asignado_a')
+    mantenedor = None
+    if asignado_id not in (None, "", "null"):
+        try:
+            mantenedor = _qs_mantenedores().get(pk=asignado_id)
+        except (User.DoesNotExist, ValueError):
+            return JsonResponse({"ok": False, "error": "Mantenedor inválido."}, status=400)
+    nuevo_id = mantenedor.id if mantenedor else None
+    asignado_nombre = _nombre_mantenedor(mantenedor) if mantenedor else "Sin asignar"
+
+    # SKIP LOCKED como en asignar_mantenedor: los reportes que otro está asignando se
+    # informan como ocupados y el resto del lote sigue
+    filas = {
+        f['id']: f for f in Reporte.objects.select_for_update(skip_locked=True)
+        .filter(pk__in=ids).values('id', 'asignado_a_id', 'estado', 'fecha_asignacion')
+    }
+    ocupados = set()
+    if len(filas) < len(ids) and connection.features.has_select_for_update_skip_locked:
+        ocupados = set(Reporte.objects.filter(pk__in=set(ids) - set(filas)).values_list('id', flat=True))
+
+    now = timezone.now()
+    resultados = {}
+    grupos = {}          # estado de destino → ids (None = conserva su estado)
+    cambios = []         # para los contadores
+    historial_estado = []
+    historial_asignacion = []
+    eventos_lote = []    # update() y bulk_create no pasan por los signals
+
+    for pk in ids:
+        fila = filas.get(pk)
+        if fila is None:
+            resultados[pk] = {"ok": False, "error": REPORTE_OCUPADO if pk in ocupados else "El reporte no existe."}
+            continue
+        # 🚫 No permitir gestionar un reporte completado
+        if fila['estado'] == 'completado':
+            resultados[pk] = {"ok": False, "error": "Este reporte está completado y no admite cambios."}
+            continue
+
+        prev_id, estado_de = fila['asignado_a_id'], fila['estado']
+        if mantenedor is None:
+            estado_a = 'pendiente'
+            fecha = None
+            sin_cambios = prev_id is None and estado_de == 'pendiente' and fila['fecha_asignacion'] is None
+            motivo = "Desasignación"
+        else:
+            estado_a = 'en_proceso' if estado_de == 'pendiente' else estado_de
+            mismo = prev_id == nuevo_id
+            fecha = fila['fecha_asignacion'] if mismo and fila['fecha_asignacion'] else now
+            sin_cambios = mismo and estado_a == estado_de
+            motivo = "Asignación" if prev_id is None else "Reasignación"
+
+        resultados[pk] = {
+            "ok": True,
+            "asignado_nombre": asignado_nombre,
+            "estado": dict(Reporte.ESTADO_CHOICES)[estado_a],
+            "estado_slug": estado_a,
+            "fecha_asignacion": fecha.isoformat() if fecha else None,
+        }
+        if sin_cambios:
+            resultados[pk]["sin_cambios"] = True
+            continue
+
+        grupos.setdefault(estado_a if estado_a != estado_de else None, []).append(pk)
+        cambios.append(((prev_id, estado_de), (nuevo_id, estado_a)))
+        eventos_lote.append(eventos.evento(
+            "actualizado", pk, (prev_id, estado_de), (nuevo_id, estado_a),
+            fecha_asignacion=resultados[pk]["fecha_asignacion"],
+        ))
+        if estado_a != estado_de:
+            historial_estado.append(HistorialEstado(
+                reporte_id=pk, estado_anterior=estado_de, estado_nuevo=estado_a, cambiado_por_id=nuevo_id,
+            ))
+        historial_asignacion.append(HistorialAsignacion(
+            reporte_id=pk, asignado_de_id=prev_id, asignado_a_id=nuevo_id,
+            estado_de=estado_de, estado_a=estado_a, cambiado_por=request.user, motivo=motivo,
+        ))
+
+    # Conserva la fecha si el mantenedor no cambia y ya tenía una
+    if mantenedor is None:
+        fecha_asignacion = Value(None, output_field=Reporte._meta.get_field('fecha_asignacion'))
+    else:
+        fecha_asignacion = Case(
+            When(Q(asignado_a_id=nuevo_id, fecha_asignacion__isnull=False), then=F('fecha_asignacion')),
+            default=Value(now),
+        )
+    for estado_a, pks in grupos.items():
+        valores = {'asignado_a_id': nuevo_id, 'fecha_asignacion': fecha_asignacion, 'updated': now}
+        if estado_a is not None:
+            valores['estado'] = estado_a
+        Reporte.objects.filter(pk__in=pks).exclude(estado='completado').update(**valores)
+
+    HistorialEstado.objects.bulk_create(historial_estado)
+    HistorialAsignacion.objects.bulk_create(historial_asignacion)
+    ContadorEstado.objects.registrar_cambios(cambios)
+    for evento in eventos_lote:
+        eventos.publicar(evento)
+
+    return JsonResponse({
+        "ok": True,
+        "actualizados": len(cambios),
+        "resultados": resultados,
     })
 
+# ===========================================
+# EVENTOS EN VIVO (Server-Sent Events, solo ASGI)
+# ===========================================
+LATIDO_EVENTOS = 15
+
+async def eventos_dashboard(request):
+    """
+    text/event-stream con los cambios de reportes que le tocan al usuario (ver
+    app.eventos.visible_para). El navegador reconecta solo y manda Last-Event-ID.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Bajo WSGI la respuesta infinita bloquearía un worker: 204 hace que
+        # EventSource deje de reintentar y el dashboard sigue como antes
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    if not user.is_authenticated or user.nombre_rol not in ("administracion", "mantenimiento"):
+        return HttpResponseForbidden("No autorizado")
+
+    try:
+        ultimo_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        ultimo_id = None
+
+    async def flujo():
+        yield "retry: 5000\n\n"
+        async for item in eventos.broker().escuchar(ultimo_id, latido=LATIDO_EVENTOS):
+            if item is None:
+                yield ": latido\n\n"
+                continue
+            evento_id, evento = item
+            if eventos.visible_para(evento, user):
+                datos = json.dumps(evento, separators=(",", ":"))
+                yield f"id: {evento_id}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+    response = StreamingHttpResponse(flujo(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # sin buffer en nginx
+    return response
+
 @rol_requerido(["administracion"])
 @login_required
 def panel_admin(request):
     return render(request, "app/panel_admin.html")
 
+# ===========================================
+# Analítica (solo lee ResumenDiario)
+# ===========================================
+DIMENSIONES_ANALITICA = {
+    "categoria": "Categoría",
+    "prioridad": "Prioridad",
+    "edificio": "Edificio",
+    "mantenedor": "Mantenedor",
+}
+
+
+def _fecha(valor, defecto):
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        return defecto
+
+
+def _etiquetas(por, valores):
+    if por == "edificio":
+        nombres = {pk: e.nombre for pk, e in Edificio.objects.in_bulk([v for v in valores if v]).items()}
+        return {v: nombres.get(v, "Sin edificio") for v in valores}
+    if por == "mantenedor":
+        nombres = {pk: u.get_full_name() or u.username for pk, u in User.objects.in_bulk([v for v in valores if v]).items()}
+        return {v: nombres.get(v, "Sin asignar") for v in valores}
+    return {v: v for v in valores}
+
+
+@rol_requerido(["administracion"])
+@login_required
+def panel_analitica(request):
+    hasta = _fecha(request.GET.get("hasta"), timezone.localdate())
+    desde = _fecha(request.GET.get("desde"), hasta - timedelta(days=29))
+    desde, hasta = min(desde, hasta), max(desde, hasta)
+    por = request.GET.get("por") if request.GET.get("por") in DIMENSIONES_ANALITICA else "categoria"
+
+    resumenes = ResumenDiario.objects.filter(dia__range=(desde, hasta))
+    serie = list(
+        resumenes.values("dia")
+        .annotate(creados=Sum("creados"), completados=Sum("completados"), backlog=Sum("backlog"))
+        .order_by("dia")
+    )
+    ultimo_dia = serie[-1]["dia"] if serie else None
+
+    # Por dimensión: sumas del período, backlog del último día y percentiles del histograma combinado
+    grupos = {}
+    campo = f"{por}_id" if por in ("edificio", "mantenedor") else por
+    for valor, dia, creados, completados, backlog, hist in resumenes.values_list(
+        campo, "dia", "creados", "completados", "backlog", "resolucion_hist"
+    ):
+        grupo = grupos.setdefault(valor, {"creados": 0, "completados": 0, "backlog": 0, "hist": []})
+        grupo["creados"] += creados
+        grupo["completados"] += completados
+        if dia == ultimo_dia:
+            grupo["backlog"] += backlog
+        grupo["hist"].append(hist)
+
+    etiquetas = _etiquetas(por, list(grupos))
+    filas = []
+    for valor, grupo in grupos.items():
+        hist = analitica.sumar_histogramas(grupo.pop("hist"))
+        filas.append({
+            "nombre": etiquetas[valor],
+            **grupo,
+            "p50": analitica.formatear_minutos(analitica.percentil_histograma(hist, 0.5)),
+            "p90": analitica.formatear_minutos(analitica.percentil_histograma(hist, 0.9)),
+        })
+    filas.sort(key=lambda f: (-f["creados"], str(f["nombre"])))
+
+    marca = MarcaResumen.objects.filter(nombre=analitica.MARCA).first()
+    return render(request, "app/panel_analitica.html", {
+        "desde": desde,
+        "hasta": hasta,
+        "por": por,
+        "nombre_dimension": DIMENSIONES_ANALITICA[por],
+        "dimensiones": DIMENSIONES_ANALITICA,
+        "serie": serie,
+        "filas": filas,
+        "ultimo_dia": ultimo_dia,
+        "marca": marca,
+    })
+
 @rol_requerido(["administracion"])
 @login_required
 def panel_admin_ubicacion(request):
     return render(request, "app/panel_admin_ubicacion.html")
 
+@rol_requerido(["administracion"])
+@login_required
+def importar_ubicaciones(request):
+    resultado = None
+    form = ImportarUbicacionesForm(request.POST or None, request.FILES or None)
+    if request.method == "POST" and form.is_valid():
+        archivo = io.TextIOWrapper(form.cleaned_data["archivo"].file, encoding="utf-8-sig", newline="")
+        simular = form.cleaned_data["simular"]
+        try:
+            resultado = importacion.importar(archivo, guardar=not simular)
+        except UnicodeDecodeError:
+            form.add_error("archivo", "El archivo debe estar en UTF-8.")
+        else:
+            if not resultado["errores"] and not simular:
+                messages.success(
+                    request,
+                    f"Importación lista: {resultado['salas_nuevas']} sala(s) nueva(s) y "
+                    f"{resultado['salas_actualizadas']} actualizada(s).",
+                )
+                return redirect("importar-ubicaciones")
+    return render(request, "app/importar_ubicaciones.html", {
+        "form": form,
+        "resultado": resultado,
+        "columnas": ",".join(importacion.COLUMNAS),
+    })
+
+@rol_requerido(["administracion"])
+@login_required
+def perfiles(request):
+    """Perfiles guardados por el perfilador bajo demanda y la firma para pedir uno nuevo."""
+    firma = perfilador.firmar(request.user)
+    nombre = request.GET.get("perfil")
+    perfil = perfilador.cargar(nombre)
+    if nombre and perfil is None:
+        messages.error(request, "El perfil no existe o ya fue eliminado.")
+    return render(request, "app/perfiles.html", {
+        "perfiles": perfilador.recientes(),
+        "perfil": perfil,
+        "firma": firma,
+        "parametro": perfilador.PARAMETRO,
+        "validez_minutos": getattr(settings, "PERFILADOR_VALIDEZ", 3600) // 60,
+    })
+
 @method_decorator(rol_requerido(["administracion"]), name="dispatch")
 @method_decorator(login_required, name="dispatch")
 class ReporteListView(ListView):
@@ -0,0 +1,81 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_POST
+
+from app import bd, ubicaciones
+from app.models import ContadorEstado
+from app.views import _asignar, _cambiar_estado, rol_requerido
+
+
+# ===========================================
+# Endpoints JSON async (ASGI)
+# ===========================================
+# Mismas respuestas que sus pares síncronos de app.views. Las lecturas usan el ORM
+# async (aresumen, aarbol); lo que tiene que ser atómico corre completo en un
+# solo sync_to_async, porque Django no tiene transacciones async. En las escrituras
+# eso incluye leer el reporte y validarlo: el mismo helper de app.views que usa la
+# vista síncrona. VISTAS_ASYNC en settings decide cuáles enruta app.urls.
+
+@login_required
+async def obtener_contadores_dashboard(request):
+    user = await request.auser()
+    if user.nombre_rol != "mantenimiento":
+        return JsonResponse({"error": "No autorizado"}, status=403)
+
+    contadores = await ContadorEstado.objects.aresumen(mantenedor=user)
+    return JsonResponse({"success": True, "contadores": contadores})
+
+
+@require_POST
+@login_required
+async def actualizar_estado_reporte(request):
+    user = await request.auser()
+    if user.nombre_rol != "mantenimiento":
+        return JsonResponse({"error": "No autorizado"}, status=403)
+
+    reporte_id = request.POST.get("reporte_id")
+    if not reporte_id:
+        return JsonResponse({"error": "ID de reporte no proporcionado."}, status=400)
+
+    # Lectura, validación y escritura en una transacción (BEGIN IMMEDIATE en SQLite), como
+    # la vista síncrona: Reporte.save toma el estado anterior de la lectura
+    cambiar = sync_to_async(bd.escritura()(_cambiar_estado))
+    datos, status = await cambiar(user, reporte_id, request.POST.get("nuevo_estado"))
+    return JsonResponse(datos, status=status)
+
+
+@rol_requerido(["administracion"])
+@login_required
+async def asignar_mantenedor(request, pk):
+    user = await request.auser()
+    if not (user.is_staff or user.is_superuser or user.nombre_rol == "administracion"):
+        return HttpResponseForbidden("No autorizado")
+
+    # Lectura del reporte, validaciones, escritura e historial en una transacción
+    asignar = sync_to_async(bd.escritura()(_asignar))
+    datos, status = await asignar(pk, request.POST.get('asignado_a'), user)
+    return JsonResponse(datos, status=status)
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (ValueError, TypeError):
+        return None
+
+
+@login_required
+@rol_requerido(["usuario", "administracion"])
+async def cargar_pisos(request):
+    datos, _ = await ubicaciones.aarbol()
+    pisos = ubicaciones.opciones_pisos(_entero(request.GET.get("edificio_id")), datos)
+    return JsonResponse({"pisos": [{"id": pk, "texto": texto} for pk, texto in pisos]})
+
+
+@login_required
+@rol_requerido(["usuario", "administracion"])
+async def cargar_salas(request):
+    datos, _ = await ubicaciones.aarbol()
+    salas = ubicaciones.opciones_salas(_entero(request.GET.get("piso_id")), datos)
+    return JsonResponse({"salas": [{"id": pk, "texto": texto} for pk, texto in salas]})
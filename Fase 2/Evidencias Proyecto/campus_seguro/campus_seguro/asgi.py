@@ -5,6 +5,14 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Los eventos en vivo de los dashboards (/eventos/, Server-Sent Events) necesitan
+servirse por aquí, p. ej.: uvicorn campus_seguro.asgi:application
+Bajo WSGI (runserver, gunicorn sync) /eventos/ responde 204 y los dashboards
+funcionan como antes, recargando la página.
+
+Con VISTAS_ASYNC=1 en el entorno se enrutan además las versiones async de los
+endpoints JSON (app.vistas_async); ver VISTAS_ASYNC en settings.
 """
 
 import os
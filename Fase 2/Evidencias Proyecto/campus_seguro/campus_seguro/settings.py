@@ -44,20 +44,26 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: Server-Timing y log de peticiones lentas (app.tiempos)
+    'app.middleware.TiemposMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware con el usuario en caché (app.usuario_cache)
+    'app.middleware.UsuarioCacheadoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Último: perfila la vista cuando la petición trae una firma (app.perfilador)
+    'app.middleware.PerfiladorMiddleware',
 ]
 
 ROOT_URLCONF = 'campus_seguro.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que informa el tiempo de render a TiemposMiddleware
+        'BACKEND': 'app.tiempos.DjangoTemplatesMedidas',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +89,52 @@ DATABASES = {
     }
 }
 
+# PostgreSQL (varios servidores de la app) si está POSTGRES_DB: POSTGRES_USER, POSTGRES_PASSWORD,
+# POSTGRES_HOST y POSTGRES_PORT completan la conexión. Con POSTGRES_POOL_MAX > 0 (por defecto)
+# se usa el pool nativo de Django 5.1+ (psycopg[pool]); el pool ya reutiliza conexiones, así
+# que CONN_MAX_AGE queda en 0 (Django no admite ambos). Con POSTGRES_POOL_MAX=0, conexiones
+# persistentes por hilo durante POSTGRES_CONN_MAX_AGE segundos. En ambos casos
+# CONN_HEALTH_CHECKS descarta la conexión caída antes de usarla en una petición.
+# Las pruebas (manage.py test) y los bench_* corren igual contra PostgreSQL.
+# Dependencias: pip install -r requirements-postgres.txt (psycopg 3 con el pool).
+if os.environ.get('POSTGRES_DB'):
+    POSTGRES_POOL_MAX = int(os.environ.get('POSTGRES_POOL_MAX', 10))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['POSTGRES_DB'],
+            'USER': os.environ.get('POSTGRES_USER', ''),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if POSTGRES_POOL_MAX else int(os.environ.get('POSTGRES_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+                    'max_size': POSTGRES_POOL_MAX,
+                    # Segundos que una petición espera una conexión libre antes de fallar
+                    'timeout': int(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+                },
+            } if POSTGRES_POOL_MAX else {},
+        }
+    }
+
+# PRAGMA para cada conexión SQLite (app.bd; no aplican a PostgreSQL): WAL para que las
+# lecturas no esperen a las escrituras, synchronous=NORMAL (seguro con WAL), espera de hasta
+# 5 s por el candado de escritura, 256 MB de mmap, ~20 MB de caché de páginas por conexión y
+# temporales en memoria
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+# Las vistas que escriben abren la transacción con BEGIN IMMEDIATE (app.bd.escritura)
+SQLITE_ESCRITURA_INMEDIATA = True
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -149,5 +201,58 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Imágenes de reportes: un archivo por contenido (SHA-256), ver app/almacenamiento.py
+    "imagenes": {"BACKEND": "app.almacenamiento.AlmacenamientoPorContenido"},
+}
+
+# Procesos para generar miniaturas de las imágenes (0 = en la misma petición)
+IMAGENES_PROCESOS = 2
 
-AUTH_USER_MODEL = 'app.Usuario'
\ No newline at end of file
+# Subida de imágenes: el campo "imagen" pasa primero por el handler propio
+FILE_UPLOAD_HANDLERS = [
+    'app.subidas.ImagenUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGEN_LADO_MAXIMO = 1920
+IMAGEN_MAX_PIXELES = 30_000_000
+
+# Segundos que vive la foto del usuario autenticado en caché (0 = sin caché)
+USUARIO_CACHE_SEGUNDOS = 60
+
+# Broker de los eventos en vivo (app.eventos). En memoria: un solo proceso ASGI
+EVENTOS_BROKER = 'app.eventos.BrokerEnMemoria'
+
+# Endpoints JSON calientes en su versión async (app.vistas_async). Solo tiene sentido bajo
+# ASGI y con una BD que responde lento (ver bench_async): con el MIDDLEWARE actual, todo
+# síncrono, la vista async cambia de hilo en cada middleware y sale más cara que la síncrona
+VISTAS_ASYNC = os.environ.get('VISTAS_ASYNC') == '1'
+
+# Tiempos por petición (app.tiempos): cabecera Server-Timing (db / tpl / app / total) y
+# log "peticion_lenta" (logger app.tiempos) con la ruta, el rol, las consultas, la SQL más
+# repetida y las TIEMPOS_SQL_LENTAS más lentas cuando la petición tarda TIEMPOS_LENTO_MS
+# o más (None = sin log)
+TIEMPOS_SERVER_TIMING = True
+TIEMPOS_LENTO_MS = int(os.environ.get('TIEMPOS_LENTO_MS', 500))
+TIEMPOS_SQL_LENTAS = 5
+
+# Perfilador bajo demanda (app.perfilador): ?perfilar=<firma> o cabecera X-Perfilar con una
+# firma generada en Panel → Perfiles. La firma vale PERFILADOR_VALIDEZ segundos; se
+# guardan los PERFILADOR_MAX perfiles más recientes, con PERFILADOR_FILAS funciones y
+# sitios de asignación en el resumen
+PERFILADOR_DIR = BASE_DIR / 'perfiles'
+PERFILADOR_VALIDEZ = 3600
+PERFILADOR_MAX = 50
+PERFILADOR_FILAS = 25
+
+
+AUTH_USER_MODEL = 'app.Usuario'
+
+# Login por correo (app.autenticacion); ModelBackend queda para el admin de Django
+AUTHENTICATION_BACKENDS = [
+    'app.autenticacion.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]